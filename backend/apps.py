@@ -7,34 +7,55 @@ import eventlet
 from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, send_file, current_app, session, send_from_directory
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_mail import Mail, Message
-from backend.models import db, User, Product, Category, Cart, CartItem, Order, OrderItem, ShopSettings, AccessRequest, Deliverer, DeliveryAssignment, ForumMessage, ActivityLog
+from backend.models import db, User, Product, Category, Cart, CartItem, Order, OrderItem, ShopSettings, AccessRequest, Deliverer, DeliveryAssignment, ForumMessage, ActivityLog, ServerSession, ExchangeRate, StatsSnapshot, SalesDaily, SalesDailyTotal, DeliveriesDaily, DemandZoneDaily, RollupState
 from flask_migrate import Migrate
-from backend.utils import generate_invoice_pdf, generate_products_pdf
 from backend.utils.helpers import get_first_image_url
 from backend.utils.storage import upload_media
+from backend.utils.dataset import seed_dataset_command
+from backend.utils.page_cache import init_page_cache, cached_page
+from backend.utils.http_cache import init_catalog_versioning, conditional_page, user_conditional_page
+from backend.utils.compression import init_compression
+from backend.utils.assets import init_assets
+from backend.utils.sessions import init_sessions
+from backend.utils import cart_service
+from backend.utils import workers
+from backend.utils.idempotency import idempotent
+from backend.utils import currency
+from backend.utils import stats as stats_snapshot
+from backend.utils import analytics
+from backend.utils import ledger
+from backend.utils import deliverer_sync
+from backend.utils import dispatch
+from backend.utils import routing
+from backend.utils import activity_log
+from backend.utils.commissions import (
+    week_bounds as _week_bounds,
+    assignment_commission as _assignment_commission,
+)
+from backend.utils.importers import (
+    normalize_row as _normalize_row,
+    row_get as _row_get,
+    parse_int as _parse_int,
+    parse_float as _parse_float,
+    parse_bool as _parse_bool,
+    read_rows_from_file as _read_rows_from_file,
+)
 import logging
 from logging.handlers import RotatingFileHandler
 from flask_wtf import CSRFProtect
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from datetime import datetime, timedelta
-import csv
 import json
 import re
 import secrets
-from io import StringIO, TextIOWrapper
+from io import StringIO
 from werkzeug.utils import secure_filename
 from functools import wraps
-from sqlalchemy import create_engine, or_, text
+from sqlalchemy import create_engine, or_, text, inspect as sa_inspect
 from sqlalchemy.orm import joinedload
-import requests
 from threading import Timer
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from urllib.parse import urljoin
-from collections import defaultdict
-from types import SimpleNamespace
-from openpyxl import load_workbook
-from PyPDF2 import PdfReader
-from docx import Document
 
 # Patch standard eventlet après avoir configuré ENV
 eventlet.monkey_patch()
@@ -90,10 +111,11 @@ def create_app():
         uri = app.config.get('SQLALCHEMY_DATABASE_URI')
         env_name = str(os.getenv('FLASK_ENV', 'development')).lower()
         allow_fallback_env = os.getenv('ALLOW_SQLITE_FALLBACK')
+        # Opt-in uniquement : la sonde ouvre un moteur jetable et rallonge le démarrage à froid.
+        # Jamais en production (évite une DB locale fantôme).
         allow_fallback = (allow_fallback_env is not None and str(allow_fallback_env).lower() in ('1', 'true', 'yes'))
-        # Par défaut, on autorise le fallback uniquement en dev pour éviter une DB locale fantôme en prod.
-        if allow_fallback_env is None:
-            allow_fallback = env_name != 'production'
+        if env_name == 'production' and allow_fallback_env is None:
+            allow_fallback = False
         if not allow_fallback or not uri or uri.startswith('sqlite:'):
             return
 
@@ -117,16 +139,63 @@ def create_app():
     Migrate(app, db)
     socketio.init_app(app, manage_session=True)
 
-    # Ensure DB tables exist (create missing tables at startup)
-    with app.app_context():
-        try:
+    # Commandes CLI (flask --app wsgi seed-dataset ...)
+    app.cli.add_command(seed_dataset_command)
+
+    # Le schéma relève des migrations (`flask --app wsgi init-db`) ; création auto au démarrage seulement sur demande
+    if app.config.get('AUTO_CREATE_TABLES'):
+        with app.app_context():
+            try:
+                db.create_all()
+            except Exception as e:
+                app.logger.warning(f"Impossible de créer les tables DB automatiquement: {e}")
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crée le schéma sur une base vide (puis stamp head), sinon applique les migrations."""
+        from flask_migrate import stamp, upgrade
+        import click
+        tables = set(sa_inspect(db.engine).get_table_names())
+        if 'users' not in tables:
+            # La migration racine suppose des tables existantes : base neuve => create_all + stamp
             db.create_all()
-        except Exception as e:
-            app.logger.warning(f"Impossible de créer les tables DB automatiquement: {e}")
+            stamp()
+            click.echo("✅ Schéma créé et marqué à la dernière migration")
+        else:
+            upgrade()
+            click.echo("✅ Migrations appliquées")
+
+    # Session côté serveur : le cookie ne contient qu'un identifiant opaque
+    init_sessions(app, db, ServerSession)
 
     # CSRF protection
     csrf = CSRFProtect()
     csrf.init_app(app)
+
+    # Cache de pages publiques (visiteurs anonymes), invalidé à chaque modification catalogue/paramètres
+    init_page_cache(app, {Product: 'catalog', Category: 'catalog', ShopSettings: 'settings', ExchangeRate: 'settings'})
+    # Compteur de version catalogue (ETag des pages liste)
+    init_catalog_versioning((Product, Category), ShopSettings)
+    # Compression gzip/Brotli des réponses et statiques pré-compressés
+    init_compression(app)
+    # URLs statiques empreintées (hash du contenu) + cache navigateur immuable
+    init_assets(app)
+    # Taux de change persistés (instantané mémoire, rafraîchissement optionnel)
+    currency.init_currency(app, db, ExchangeRate)
+    # Statistiques admin : ligne unique tenue à jour par les hooks ORM + réconciliation périodique
+    stats_snapshot.init_stats(app, db, StatsSnapshot, Product, Order, User)
+    # Cumuls journaliers ventes / livraisons (séries des graphiques admin)
+    analytics.init_analytics(app, db, RollupState, SalesDaily, SalesDailyTotal, DeliveriesDaily, DemandZoneDaily,
+                             Order, OrderItem, Product, DeliveryAssignment)
+    # Grand livre des commissions livreurs (instantanés mensuels périodiques)
+    ledger.init_ledger(app)
+    # Affectation automatique au livreur disponible le plus proche (grille des positions en mémoire)
+    dispatch.init_dispatch(app)
+    # Journal d'activité : file mémoire écrite par lots en tâche de fond (débordement JSONL sur disque)
+    activity_spill = app.config.get('ACTIVITY_LOG_SPILL_PATH') or os.path.join('logs', 'activity_spill.jsonl')
+    if not os.path.isabs(activity_spill):
+        activity_spill = os.path.join(project_root, activity_spill)
+    activity_log.init_activity_log(app, db, ActivityLog, spill_path=activity_spill)
     
     # Login Manager principal
     login_manager = LoginManager()
@@ -150,81 +219,31 @@ def create_app():
     
     mail = Mail(app)
 
-    def _week_bounds(ref_dt=None):
-        """Retourne le début et la fin (UTC) de la semaine courante (lundi -> lundi)."""
-        ref_dt = ref_dt or datetime.utcnow()
-        start = datetime(ref_dt.year, ref_dt.month, ref_dt.day) - timedelta(days=ref_dt.weekday())
-        end = start + timedelta(days=7)
-        return start, end
-
-    def _commission_for_amount(total_amount: float) -> float:
-        """Calcule la commission de base selon le montant de commande."""
-        try:
-            total = float(total_amount or 0)
-        except Exception:
-            total = 0.0
-        if total <= 25:
-            return 3.0
-        if total < 80:
-            return 4.0
-        return 4.0 + (0.02 * total)
-
     def _apply_commission(assignment: DeliveryAssignment):
-        """Crédite la commission de base (+ bonus dimanche) pour une livraison terminée."""
-        if assignment.commission_recorded or not assignment.deliverer or not assignment.order:
-            return 0.0
-
-        now = datetime.utcnow()
-        commission = _commission_for_amount(assignment.order.total_amount)
-        completed_dt = assignment.completed_at or now
-        # Bonus 5% si livraison finalisée un dimanche
-        try:
-            if completed_dt.weekday() == 6:  # 0=lundi ... 6=dimanche
-                commission += 0.05 * float(assignment.order.total_amount or 0)
-        except Exception:
-            pass
-        assignment.commission_recorded = True
-        assignment.completed_at = assignment.completed_at or now
-        assignment.payout_status = assignment.payout_status or 'pending'
-        assignment.deliverer.commission_due = (assignment.deliverer.commission_due or 0) + commission
-        return commission
-
-    def _assignment_commission(a: DeliveryAssignment):
-        """Renvoie la commission (base + dimanche) pour une affectation livrée."""
-        if not a.order:
-            return 0.0
-        base = _commission_for_amount(a.order.total_amount)
-        sunday_bonus = 0.0
-        try:
-            ref = a.completed_at or a.order.delivered_at or datetime.utcnow()
-            if ref.weekday() == 6:
-                sunday_bonus = 0.05 * float(a.order.total_amount or 0)
-        except Exception:
-            sunday_bonus = 0.0
-        return base + sunday_bonus
-
-    def _weekly_bonus_total(assignments):
-        """Calcule le total des bonus hebdomadaires (5$ par bloc de 8 livraisons) pour une liste d'affectations livrées."""
-        weekly_counts = defaultdict(int)
-        for a in assignments:
-            if not a.completed_at:
-                continue
-            week_start, _ = _week_bounds(a.completed_at)
-            weekly_counts[week_start] += 1
-        total = 0.0
-        for count in weekly_counts.values():
-            total += (count // 8) * 5.0
-        return total
-
-    def _weekly_bonus_state(deliverer: Deliverer):
-        """Calcule le nombre de livraisons de la semaine et les bonus disponibles/non payés."""
+        """Crédite la commission de base (+ bonus dimanche) pour une livraison terminée (grand livre)."""
+        return ledger.credit_assignment(assignment)
+
+    def _weekly_delivery_counts(deliverer_ids=None):
+        """Livraisons de la semaine par livreur {id: n} (une requête groupée, livreurs sans livraison absents)."""
         week_start, week_end = _week_bounds()
-        delivered_this_week = (DeliveryAssignment.query
-                               .filter(DeliveryAssignment.deliverer_id == deliverer.id)
-                               .filter(DeliveryAssignment.status == 'delivered')
-                               .filter(DeliveryAssignment.completed_at >= week_start)
-                               .filter(DeliveryAssignment.completed_at < week_end)
-                               .count())
+        query = (db.session.query(DeliveryAssignment.deliverer_id, db.func.count(DeliveryAssignment.id))
+                 .filter(DeliveryAssignment.status == 'delivered')
+                 .filter(DeliveryAssignment.completed_at >= week_start)
+                 .filter(DeliveryAssignment.completed_at < week_end))
+        if deliverer_ids is not None:
+            if not deliverer_ids:
+                return {}
+            query = query.filter(DeliveryAssignment.deliverer_id.in_(deliverer_ids))
+        return dict(query.group_by(DeliveryAssignment.deliverer_id).all())
+
+    def _weekly_bonus_state(deliverer: Deliverer, delivered_this_week=None):
+        """Calcule le nombre de livraisons de la semaine et les bonus disponibles/non payés.
+
+        `delivered_this_week` : compte déjà obtenu via `_weekly_delivery_counts` (sinon une requête).
+        """
+        week_start, _ = _week_bounds()
+        if delivered_this_week is None:
+            delivered_this_week = _weekly_delivery_counts([deliverer.id]).get(deliverer.id, 0)
         bonuses_earned = delivered_this_week // 8
         paid_count = deliverer.weekly_bonus_paid_count if deliverer.last_bonus_week_start == week_start.date() else 0
         outstanding = max(0, bonuses_earned - paid_count)
@@ -237,6 +256,11 @@ def create_app():
             'current_block_count': delivered_this_week % 8,
         }
 
+    def _weekly_bonus_states(deliverers):
+        """États de bonus hebdo {id: état} pour une liste de livreurs (une seule requête)."""
+        counts = _weekly_delivery_counts()
+        return {d.id: _weekly_bonus_state(d, counts.get(d.id, 0)) for d in deliverers}
+
     # Logging: fichier rotatif
     logs_dir = os.path.join(project_root, 'logs')
     os.makedirs(logs_dir, exist_ok=True)
@@ -273,7 +297,6 @@ def create_app():
         return dict(media_url=media_url)
     
     # === UTILITAIRES ===
-    _rate_cache = {'data': {}, 'timestamp': 0}
     CATEGORY_ICON_CHOICES = [
         ("fas fa-heartbeat", "Santé / Général"),
         ("fas fa-flask", "Complément / Détox"),
@@ -481,8 +504,9 @@ def create_app():
         if not address:
             return None, None, None
         try:
+            import requests  # import paresseux: inutile au démarrage
             resp = requests.get(
-                "https://nominatim.openstreetmap.org/search",
+                app.config.get('GEOCODER_URL') or "https://nominatim.openstreetmap.org/search",
                 params={"q": address, "format": "json", "limit": 1},
                 headers={"User-Agent": "MangaStore rdc"},
                 timeout=5
@@ -589,47 +613,29 @@ def create_app():
         threshold = cutoff or revenue_cutoff()
         return ref <= threshold
 
-    def compute_recognized_revenue():
-        """Calcule le CA reconnu (commandes livrées depuis au moins 1h)."""
-        cutoff = revenue_cutoff()
+    def read_dashboard_stats():
+        """Compteurs admin (une ligne `stats_snapshot`) ; CA reconnu = livrées depuis au moins 1h."""
         try:
-            revenue = (
-                db.session.query(db.func.coalesce(db.func.sum(Order.total_amount), 0))
-                .filter(
-                    Order.status == 'delivered',
-                    Order.delivered_at.isnot(None),
-                    Order.delivered_at <= cutoff
-                )
-                .scalar()
-            )
-            return revenue or 0
+            row = stats_snapshot.read(db)
+            return {
+                'total_products': row.total_products,
+                'total_orders': row.total_orders,
+                'total_users': row.total_users,
+                'pending_orders': row.pending_orders,
+                'total_revenue': row.recognized_revenue or 0,
+            }
         except Exception as e:
-            app.logger.error(f"Erreur calcul chiffre d'affaires: {e}")
-            return 0
+            db.session.rollback()
+            app.logger.error(f"Erreur lecture statistiques: {e}")
+            return {'total_products': 0, 'total_orders': 0, 'total_users': 0, 'pending_orders': 0, 'total_revenue': 0}
 
     def get_cart_for_user(user_id):
-        """Récupère ou crée un panier pour l'utilisateur"""
-        cart = Cart.query.filter_by(user_id=user_id).first()
-        if not cart:
-            cart = Cart(user_id=user_id)
-            db.session.add(cart)
-            db.session.commit()
-        return cart
+        """Récupère ou crée un panier pour l'utilisateur (chemins d'écriture uniquement, sans commit)."""
+        return cart_service.get_or_create_cart(user_id)
 
     def get_cart_items_count(user_id):
-        """Retourne le nombre d'articles dans le panier (agrégat SQL pour éviter le stale state)."""
-        cart = Cart.query.filter_by(user_id=user_id).first()
-        if not cart:
-            return 0
-        try:
-            from sqlalchemy import func
-            total_q = (db.session.query(func.coalesce(func.sum(CartItem.quantity), 0))
-                       .filter_by(cart_id=cart.id)
-                       .scalar())
-            return int(total_q or 0)
-        except Exception:
-            # Fallback
-            return sum(item.quantity for item in cart.items)
+        """Retourne le nombre d'articles dans le panier (colonne dénormalisée `Cart.item_count`)."""
+        return cart_service.item_count(user_id)
 
     def get_guest_cart():
         """Panier pour les visiteurs stocké en session: [{product_id, quantity}]."""
@@ -652,7 +658,9 @@ def create_app():
             return []
 
     def set_guest_cart(items):
-        """Enregistre le panier invité et met à jour le badge."""
+        """Enregistre le panier invité (sans produits inactifs, quantités bornées au stock) et met à jour le badge."""
+        if items:
+            items = cart_service.clean_guest_entries(items, cart_service.guest_cart_lines(items))
         try:
             session['guest_cart'] = items
             session['cart_count'] = sum(int(i.get('quantity', 0)) for i in items)
@@ -661,41 +669,19 @@ def create_app():
             session['guest_cart'] = []
             session['cart_count'] = 0
 
-    def build_guest_cart_items():
-        """Construit les items de panier pour l'affichage invité avec les objets produit."""
-        items = []
-        total = 0
-        guest_cart = get_guest_cart()
-        if not guest_cart:
-            return items, total
-
-        try:
-            product_ids = [entry['product_id'] for entry in guest_cart]
-            products = Product.query.filter(Product.id.in_(product_ids)).all()
-            product_map = {p.id: p for p in products}
-        except Exception:
-            product_map = {}
-
-        cleaned = []
-        for entry in guest_cart:
-            product = product_map.get(entry.get('product_id'))
-            if not product or not product.is_active:
-                continue
-            qty = min(entry.get('quantity', 1), max(product.quantity or 0, 0)) or 0
-            if qty <= 0:
-                continue
-            cleaned.append({'product_id': product.id, 'quantity': qty})
-            items.append(SimpleNamespace(id=product.id, product=product, quantity=qty))
-            try:
-                total += float(product.price) * qty
-            except Exception:
-                pass
-
-        # Nettoyer le panier si des articles ont été supprimés ou ajustés
-        if cleaned != guest_cart:
-            set_guest_cart(cleaned)
+    def build_cart_summary():
+        """Panier courant (client ou invité) avec totaux, livraison et alertes de stock.
 
-        return items, total
+        Lecture seule : aucun panier n'est créé et la session n'est pas réécrite.
+        Retourne (résumé, panier client ou None).
+        """
+        settings = ShopSettings.query.first()
+        if current_user.is_authenticated and not getattr(current_user, 'is_admin', False) and not getattr(current_user, 'is_deliverer', False):
+            cart_obj = cart_service.load_cart(current_user.id)
+            lines = list(cart_obj.items) if cart_obj else []
+            return cart_service.summarize(lines, settings), cart_obj
+        lines = cart_service.guest_cart_lines(get_guest_cart())
+        return cart_service.summarize(lines, settings), None
 
     def merge_guest_cart_into_user(user):
         """Fusionne le panier invité dans le panier client après connexion."""
@@ -722,6 +708,7 @@ def create_app():
                     cart_item.quantity = min(cart_item.quantity + qty, max(product.quantity or 0, 0) or qty)
                 else:
                     db.session.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=qty))
+            cart_service.refresh_totals(cart.id)
             db.session.commit()
             set_guest_cart([])
             sync_cart_count()
@@ -731,6 +718,7 @@ def create_app():
 
     def sync_cart_count():
         """Met à jour le compteur panier dans la session pour l'utilisateur courant."""
+        cart_service.forget_item_count()
         try:
             if current_user.is_authenticated and not getattr(current_user, 'is_admin', False) and not getattr(current_user, 'is_deliverer', False):
                 session['cart_count'] = get_cart_items_count(current_user.id)
@@ -739,6 +727,73 @@ def create_app():
         except Exception:
             session['cart_count'] = session.get('cart_count', 0)
 
+    def cart_add_product(product, quantity):
+        """Ajoute `quantity` exemplaires au panier courant (client ou invité) ; lève `CartError`."""
+        if quantity <= 0:
+            raise cart_service.CartError('invalid_quantity', 'Quantité invalide')
+        if product.quantity < quantity:
+            raise cart_service.CartError('insufficient_stock', 'Stock insuffisant', status=409)
+
+        if current_user.is_authenticated:
+            cart = get_cart_for_user(current_user.id)
+            # Vérifier si le produit est déjà dans le panier
+            cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
+            if cart_item:
+                new_quantity = cart_item.quantity + quantity
+                if new_quantity > product.quantity:
+                    raise cart_service.CartError('insufficient_stock', 'Quantité demandée dépasse le stock disponible', status=409)
+                cart_item.quantity = new_quantity
+            else:
+                cart_item = CartItem(cart_id=cart.id, product_id=product.id, quantity=quantity)
+                db.session.add(cart_item)
+            cart_service.refresh_totals(cart.id)
+            db.session.commit()
+        else:
+            guest_cart = get_guest_cart()
+            existing = next((i for i in guest_cart if i.get('product_id') == product.id), None)
+            if existing:
+                new_quantity = existing.get('quantity', 1) + quantity
+                if new_quantity > product.quantity:
+                    raise cart_service.CartError('insufficient_stock', 'Quantité demandée dépasse le stock disponible', status=409)
+                existing['quantity'] = new_quantity
+            else:
+                guest_cart.append({'product_id': product.id, 'quantity': quantity})
+            set_guest_cart(guest_cart)
+        sync_cart_count()
+
+    def cart_set_quantity(product_id, quantity):
+        """Fixe la quantité d'un produit du panier courant (0 = retrait) ; lève `CartError`."""
+        product = db.session.get(Product, product_id)
+        if quantity > 0:
+            if product is None or not product.is_active:
+                raise cart_service.CartError('unavailable', 'Produit indisponible', status=404)
+            if quantity > product.quantity:
+                raise cart_service.CartError('insufficient_stock', 'Stock insuffisant', status=409)
+
+        if current_user.is_authenticated:
+            cart = Cart.query.filter_by(user_id=current_user.id).order_by(Cart.id).first()
+            cart_item = (CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
+                         if cart else None)
+            if cart_item is None:
+                raise cart_service.CartError('not_in_cart', 'Article introuvable dans votre panier', status=404)
+            if quantity <= 0:
+                db.session.delete(cart_item)
+            else:
+                cart_item.quantity = quantity
+            cart_service.refresh_totals(cart.id)
+            db.session.commit()
+        else:
+            guest_cart = get_guest_cart()
+            entry = next((i for i in guest_cart if i.get('product_id') == product_id), None)
+            if entry is None:
+                raise cart_service.CartError('not_in_cart', 'Article introuvable dans votre panier', status=404)
+            if quantity <= 0:
+                guest_cart = [i for i in guest_cart if i.get('product_id') != product_id]
+            else:
+                entry['quantity'] = quantity
+            set_guest_cart(guest_cart)
+        sync_cart_count()
+
     def require_permission(permission=None):
         """Decorator to require a specific permission for admin routes.
 
@@ -767,184 +822,6 @@ def create_app():
             return wrapped
         return decorator
 
-    def _normalize_key(key: str) -> str:
-        value = str(key or '').strip().lower()
-        value = re.sub(r'[^a-z0-9]+', '_', value)
-        return value.strip('_')
-
-    def _normalize_row(row: dict) -> dict:
-        normalized = {}
-        for key, value in (row or {}).items():
-            if key is None:
-                continue
-            norm = _normalize_key(key)
-            if not norm:
-                continue
-            normalized[norm] = value
-        return normalized
-
-    def _row_get(row: dict, keys: tuple[str, ...]):
-        for key in keys:
-            value = row.get(key)
-            if value is None:
-                continue
-            if isinstance(value, str) and not value.strip():
-                continue
-            return value
-        return None
-
-    def _clean_number(value):
-        if value is None:
-            return None
-        if isinstance(value, (int, float)):
-            return float(value)
-        text = str(value).strip()
-        if not text:
-            return None
-        text = text.replace(' ', '').replace(',', '.')
-        text = re.sub(r'[^0-9\\.-]', '', text)
-        if not text or text in {'.', '-', '-.'}:
-            return None
-        try:
-            return float(text)
-        except Exception:
-            return None
-
-    def _parse_int(value, default=0):
-        number = _clean_number(value)
-        if number is None:
-            return default
-        return int(number)
-
-    def _parse_float(value, default=None):
-        number = _clean_number(value)
-        if number is None:
-            return default
-        return float(number)
-
-    def _parse_bool(value, default=False):
-        if value is None:
-            return default
-        if isinstance(value, bool):
-            return value
-        text = str(value).strip().lower()
-        if text in ('1', 'true', 'yes', 'y', 'oui', 'on', 'active', 'actif'):
-            return True
-        if text in ('0', 'false', 'no', 'non', 'off', 'inactive', 'inactif'):
-            return False
-        return default
-
-    def _read_rows_from_file(file_storage):
-        if not file_storage or not file_storage.filename:
-            raise ValueError("Aucun fichier fourni.")
-        filename = secure_filename(file_storage.filename)
-        ext = os.path.splitext(filename)[1].lower()
-        def _rows_from_lines(lines):
-            if not lines:
-                return []
-            sample = "\n".join(lines[:5])
-            try:
-                dialect = csv.Sniffer().sniff(sample, delimiters=";,|\\t")
-            except Exception:
-                dialect = csv.excel
-            reader = csv.reader(lines, dialect=dialect)
-            rows = list(reader)
-            if not rows:
-                return []
-            headers = [str(h).strip() if h is not None else '' for h in rows[0]]
-            data = []
-            for row in rows[1:]:
-                if not row:
-                    continue
-                row_map = {}
-                for idx, header in enumerate(headers):
-                    if not header:
-                        continue
-                    value = row[idx] if idx < len(row) else None
-                    row_map[header] = value
-                if any(v is not None and str(v).strip() != '' for v in row_map.values()):
-                    data.append(row_map)
-            return data
-        if ext == '.csv':
-            text_stream = TextIOWrapper(file_storage.stream, encoding='utf-8-sig')
-            sample = text_stream.read(2048)
-            text_stream.seek(0)
-            try:
-                dialect = csv.Sniffer().sniff(sample)
-            except Exception:
-                dialect = csv.excel
-            reader = csv.DictReader(text_stream, dialect=dialect)
-            rows = []
-            for row in reader:
-                if not row:
-                    continue
-                if any(v is not None and str(v).strip() != '' for v in row.values()):
-                    rows.append(row)
-            return rows
-        if ext in ('.txt', '.tsv'):
-            file_storage.stream.seek(0)
-            text = file_storage.stream.read().decode('utf-8', errors='ignore')
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            return _rows_from_lines(lines)
-        if ext in ('.xlsx', '.xlsm', '.xltx', '.xltm'):
-            workbook = load_workbook(file_storage, read_only=True, data_only=True)
-            sheet = workbook.active
-            rows = list(sheet.iter_rows(values_only=True))
-            if not rows:
-                return []
-            headers = [str(h).strip() if h is not None else '' for h in rows[0]]
-            data = []
-            for row in rows[1:]:
-                if not row:
-                    continue
-                row_map = {}
-                for idx, header in enumerate(headers):
-                    if not header:
-                        continue
-                    value = row[idx] if idx < len(row) else None
-                    row_map[header] = value
-                if any(v is not None and str(v).strip() != '' for v in row_map.values()):
-                    data.append(row_map)
-            return data
-        if ext == '.docx':
-            file_storage.stream.seek(0)
-            doc = Document(file_storage)
-            data = []
-            if doc.tables:
-                for table in doc.tables:
-                    if not table.rows:
-                        continue
-                    headers = [cell.text.strip() for cell in table.rows[0].cells]
-                    for row in table.rows[1:]:
-                        row_map = {}
-                        for idx, cell in enumerate(row.cells):
-                            if idx >= len(headers):
-                                continue
-                            header = headers[idx]
-                            if not header:
-                                continue
-                            row_map[header] = cell.text.strip()
-                        if any(v is not None and str(v).strip() != '' for v in row_map.values()):
-                            data.append(row_map)
-            if not data:
-                lines = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-                return _rows_from_lines(lines)
-            return data
-        if ext == '.pdf':
-            file_storage.stream.seek(0)
-            reader = PdfReader(file_storage)
-            text_parts = []
-            for page in reader.pages:
-                content = page.extract_text() or ''
-                if content.strip():
-                    text_parts.append(content)
-            text = "\n".join(text_parts).strip()
-            if not text:
-                return []
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            return _rows_from_lines(lines)
-        raise ValueError("Format non supporte. Utilisez CSV, XLSX, DOCX, PDF, TXT ou TSV.")
-
     def deliverer_required(f):
         """Protection pour les routes livreur."""
         @wraps(f)
@@ -956,26 +833,10 @@ def create_app():
         return wrapped
 
     def record_activity(action: str, actor=None, extra: str | None = None):
-        """Enregistre une action (tâche) avec l'acteur et un complément facultatif."""
+        """Enregistre une action (tâche) avec l'acteur et un complément facultatif (écriture différée)."""
         try:
-            actor_id = getattr(actor, 'id', None)
-            actor_email = getattr(actor, 'email', None)
-            first = getattr(actor, 'first_name', '') or ''
-            last = getattr(actor, 'last_name', '') or ''
-            actor_name = f"{first} {last}".strip() or None
-            actor_phone = getattr(actor, 'phone', None)
-            log_entry = ActivityLog(
-                action=action,
-                actor_id=actor_id,
-                actor_email=actor_email,
-                actor_name=actor_name,
-                actor_phone=actor_phone,
-                extra=extra
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            activity_log.record(action, actor=actor, extra=extra)
         except Exception as exc:
-            db.session.rollback()
             try:
                 app.logger.warning(f"Impossible d'enregistrer l'activité '{action}': {exc}")
             except Exception:
@@ -983,9 +844,13 @@ def create_app():
 
     # NOTE: PDF generation functions are provided by backend.utils (generate_invoice_pdf,
     # generate_products_pdf) to avoid duplication and to centralize file path handling.
+    # They are imported inside the export routes so reportlab/qrcode stay out of cold start.
     @app.before_request
     def refresh_cart_badge():
         """Synchronise le compteur panier en session avant chaque requête pour le badge nav."""
+        if request.endpoint == 'static':
+            # Pas de badge sur les fichiers statiques : la session n'est même pas chargée
+            return
         try:
             if current_user.is_authenticated and not getattr(current_user, 'is_admin', False) and not getattr(current_user, 'is_deliverer', False):
                 session['cart_count'] = get_cart_items_count(current_user.id)
@@ -1084,17 +949,8 @@ def create_app():
             # fallback to shop default or base currency
             current_currency = shop_settings.currency if shop_settings and shop_settings.currency else app.config.get('BASE_CURRENCY', 'USD')
 
-        # Helper pour obtenir le taux de conversion entre deux devises (utilise exchangerate.host)
-        def get_rate(from_currency: str, to_currency: str) -> float:
-            if not from_currency or not to_currency or from_currency == to_currency:
-                return 1.0
-            # conversion fixe : 1 USD = 2200 CDF
-            rates = {
-                ('USD', 'CDF'): 2200.0,
-                ('CDF', 'USD'): 1/2200.0
-            }
-            key = (from_currency.upper(), to_currency.upper())
-            return rates.get(key, 1.0)
+        # Instantané des taux (aucune requête : rechargé périodiquement par le moteur de devises)
+        rates = currency.snapshot()
 
         base_currency = app.config.get('BASE_CURRENCY', 'USD')
         ice_servers = []
@@ -1107,27 +963,29 @@ def create_app():
         if turn_url and turn_user and turn_pass:
             ice_servers.append({'urls': turn_url, 'username': turn_user, 'credential': turn_pass})
 
+        def exchange_rate(from_currency: str = None, to_currency: str = None) -> float:
+            """Taux brut (non arrondi), ex: pour les conversions côté navigateur."""
+            return rates.rate(from_currency or base_currency, to_currency or current_currency or base_currency)
+
         def convert_amount(amount: float, from_currency: str = None, to_currency: str = None) -> float:
             """Retourne le montant converti (float) sans formatage."""
-            src = from_currency or base_currency
-            dest = to_currency or current_currency or base_currency
-            rate = get_rate(src, dest)
             try:
-                return round(float(amount) * rate, 2)
+                return round(float(amount) * exchange_rate(from_currency, to_currency), 2)
             except Exception:
                 return float(amount)
 
         def convert_price(amount: float, from_currency: str = None, to_currency: str = None) -> str:
+            dest = to_currency or current_currency or base_currency
             try:
-                src = from_currency or base_currency
-                dest = to_currency or current_currency or base_currency
-                rate = get_rate(src, dest)
-                converted = round(amount * rate, 2)
-                # Format simple: code + amount
-                return f"{dest} {converted:,.2f}".replace(',', ' ').replace('.', ',')
+                return currency.format_amount(round(float(amount) * exchange_rate(from_currency, dest), 2), dest)
             except Exception:
                 return f"{from_currency or base_currency} {amount:.2f}"
 
+        def display_prices(items, from_currency: str = None, to_currency: str = None, fields=('price', 'compare_price')):
+            """Prix affichés d'une page entière {id: {champ: texte}} (un seul calcul de taux)."""
+            return currency.display_prices(items, from_currency or base_currency,
+                                           to_currency or current_currency or base_currency, fields)
+
         return {
             'shop_settings': shop_settings,
             'cart_items_count': cart_items_count,
@@ -1138,6 +996,8 @@ def create_app():
             'current_currency': current_currency,
             'convert_price': convert_price,
             'convert_amount': convert_amount,
+            'exchange_rate': exchange_rate,
+            'display_prices': display_prices,
             'base_currency': base_currency,
             'status_fr': status_fr_helper,
             'permission_labels': PERMISSION_LABELS,
@@ -1239,28 +1099,74 @@ def create_app():
 
         return render_template('setup_admin.html')
     
+    # === GET CONDITIONNEL (ETag / Last-Modified) ===
+    def _with_product_counts(query, active_only=False, offset=None, limit=None):
+        """Catégories de `query` avec `product_count` (un seul SELECT : sous-requête groupée en jointure externe)."""
+        counts = db.session.query(Product.category_id.label('category_id'), db.func.count(Product.id).label('total'))
+        if active_only:
+            counts = counts.filter(Product.is_active.is_(True))
+        counts = counts.group_by(Product.category_id).subquery()
+        rows = (query.outerjoin(counts, counts.c.category_id == Category.id)
+                .add_columns(db.func.coalesce(counts.c.total, 0))
+                .offset(offset).limit(limit)
+                .all())
+        categories = []
+        for category, total in rows:
+            category.product_count = int(total or 0)
+            categories.append(category)
+        return categories
+
+    def _catalog_validators(**_):
+        """Version catalogue + paramètres boutique (layout) pour les pages liste."""
+        row = db.session.query(ShopSettings.catalog_version, ShopSettings.updated_at).order_by(ShopSettings.id).first()
+        if not row:
+            return (0,), None
+        return (row.catalog_version or 0, row.updated_at), row.updated_at
+
+    def _product_validators(product_id):
+        """Fiche produit : updated_at du produit, de sa catégorie (nom affiché) et des paramètres boutique."""
+        product = (db.session.query(Product.updated_at, Product.is_active,
+                                    Category.updated_at.label('category_updated_at'),
+                                    Category.name.label('category_name'))
+                   .outerjoin(Category, Category.id == Product.category_id)
+                   .filter(Product.id == product_id).first())
+        if not product or not product.is_active:
+            return None
+        settings = db.session.query(ShopSettings.updated_at).order_by(ShopSettings.id).first()
+        settings_updated_at = settings.updated_at if settings else None
+        stamps = [d for d in (product.updated_at, product.category_updated_at, settings_updated_at) if d]
+        parts = (product_id, product.updated_at, product.category_updated_at, product.category_name,
+                 settings_updated_at)
+        return parts, (max(stamps) if stamps else None)
+
     # === ROUTES CLIENT ===
     @app.route('/about')
+    @cached_page()
     def about():
         return render_template('client/about.html')
 
     @app.route('/mentions-legales')
+    @cached_page()
     def legal_notice():
         return render_template('client/legal.html')
 
     @app.route('/conditions-generales')
+    @cached_page()
     def terms():
         return render_template('client/terms.html')
 
     @app.route('/retours-remboursements')
+    @cached_page()
     def returns_policy():
         return render_template('client/returns.html')
 
     @app.route('/confidentialite')
+    @cached_page()
     def privacy_policy():
         return render_template('client/privacy.html')
     
     @app.route('/')
+    @cached_page('catalog')
     def index():
         featured_products = (Product.query
                              .filter_by(is_active=True, is_featured=True)
@@ -1279,6 +1185,8 @@ def create_app():
                              categories=categories)
 
     @app.route('/categories')
+    @conditional_page(_catalog_validators)
+    @cached_page('catalog', query_args=('page',))
     def client_categories():
         try:
             page = int(request.args.get('page', 1))
@@ -1289,7 +1197,7 @@ def create_app():
         per_page = 12
         query = Category.query.filter_by(is_active=True).order_by(Category.created_at.desc())
         total = query.count()
-        categories = query.offset((page - 1) * per_page).limit(per_page).all()
+        categories = _with_product_counts(query, active_only=True, offset=(page - 1) * per_page, limit=per_page)
         total_pages = (total // per_page) + (1 if total % per_page else 0)
         return render_template(
             'client/categories.html',
@@ -1300,6 +1208,8 @@ def create_app():
         )
     
     @app.route('/products')
+    @conditional_page(_catalog_validators)
+    @cached_page('catalog', query_args=('category_id',))
     def products():
         category_id = request.args.get('category_id')
         search_term = request.args.get('q', '').strip()
@@ -1320,6 +1230,8 @@ def create_app():
                              search_term=search_term)
     
     @app.route('/product/<int:product_id>')
+    @conditional_page(_product_validators)
+    @cached_page('catalog')
     def product_detail(product_id):
         product = Product.query.get_or_404(product_id)
         if not product.is_active:
@@ -1355,41 +1267,13 @@ def create_app():
             quantity = int(request.form.get('quantity', 1))
         except Exception:
             quantity = 1
-        
-        if quantity <= 0:
-            return _respond(False, 'Quantité invalide')
-            
-        if product.quantity < quantity:
-            return _respond(False, 'Stock insuffisant')
 
         try:
-            if current_user.is_authenticated:
-                cart = get_cart_for_user(current_user.id)
-                # Vérifier si le produit est déjà dans le panier
-                cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
-                if cart_item:
-                    new_quantity = cart_item.quantity + quantity
-                    if new_quantity > product.quantity:
-                        return _respond(False, 'Quantité demandée dépasse le stock disponible')
-                    cart_item.quantity = new_quantity
-                else:
-                    cart_item = CartItem(cart_id=cart.id, product_id=product_id, quantity=quantity)
-                    db.session.add(cart_item)
-                db.session.commit()
-            else:
-                guest_cart = get_guest_cart()
-                existing = next((i for i in guest_cart if i.get('product_id') == product_id), None)
-                if existing:
-                    new_quantity = existing.get('quantity', 1) + quantity
-                    if new_quantity > product.quantity:
-                        return _respond(False, 'Quantité demandée dépasse le stock disponible')
-                    existing['quantity'] = new_quantity
-                else:
-                    guest_cart.append({'product_id': product_id, 'quantity': quantity})
-                set_guest_cart(guest_cart)
-            
-            sync_cart_count()
+            cart_add_product(product, quantity)
             return _respond(True, f'{product.name} ajouté au panier ({quantity})')
+        except cart_service.CartError as e:
+            db.session.rollback()
+            return _respond(False, e.message)
         except Exception as e:
             db.session.rollback()
             app.logger.error(f"Erreur ajout panier: {e}")
@@ -1406,19 +1290,8 @@ def create_app():
             flash('Accès réservé aux clients', 'error')
             return redirect(url_for('deliverer_login_page'))
 
-        cart_items = []
-        total = 0
-
-        if current_user.is_authenticated and not getattr(current_user, 'is_admin', False) and not getattr(current_user, 'is_deliverer', False):
-            cart = Cart.query.filter_by(user_id=current_user.id).first()
-            if cart:
-                cart_items = CartItem.query.filter_by(cart_id=cart.id).all()
-                for item in cart_items:
-                    total += item.product.price * item.quantity
-        else:
-            cart_items, total = build_guest_cart_items()
-
-        return render_template('client/cart.html', cart_items=cart_items, total=total)
+        summary, _ = build_cart_summary()
+        return render_template('client/cart.html', cart_items=summary.items, total=summary.subtotal, summary=summary)
     
     @app.route('/update_cart/<int:item_id>', methods=['POST'])
     def update_cart(item_id):
@@ -1436,7 +1309,7 @@ def create_app():
             quantity = 1
 
         if current_user.is_authenticated:
-            cart_item = CartItem.query.get_or_404(item_id)
+            cart_item = cart_service.get_item_or_404(item_id)
             
             # Vérifier que l'article appartient bien à l'utilisateur
             if cart_item.cart.user_id != current_user.id:
@@ -1453,6 +1326,7 @@ def create_app():
                 cart_item.quantity = quantity
                 flash('Quantité mise à jour', 'success')
             
+            cart_service.refresh_totals(cart_item.cart_id)
             db.session.commit()
         else:
             guest_cart = get_guest_cart()
@@ -1494,14 +1368,16 @@ def create_app():
             return redirect(url_for('deliverer_login_page'))
 
         if current_user.is_authenticated:
-            cart_item = CartItem.query.get_or_404(item_id)
+            cart_item = cart_service.get_item_or_404(item_id)
             
             if cart_item.cart.user_id != current_user.id:
                 flash('Action non autorisée', 'error')
                 return redirect(url_for('cart'))
                 
             product_name = cart_item.product.name
+            cart_id = cart_item.cart_id
             db.session.delete(cart_item)
+            cart_service.refresh_totals(cart_id)
             db.session.commit()
             flash(f'{product_name} retiré du panier', 'success')
         else:
@@ -1533,6 +1409,7 @@ def create_app():
             cart = Cart.query.filter_by(user_id=current_user.id).first()
             if cart:
                 CartItem.query.filter_by(cart_id=cart.id).delete()
+                cart_service.refresh_totals(cart.id)
                 db.session.commit()
                 flash('Panier vidé', 'success')
         else:
@@ -1542,6 +1419,201 @@ def create_app():
         sync_cart_count()
         return redirect(url_for('cart'))
     
+    def checkout_details(data, defaults=None):
+        """Coordonnées de commande normalisées (formulaire HTML ou JSON de l'API)."""
+        defaults = defaults or {}
+
+        def _field(name):
+            value = data.get(name, defaults.get(name, ''))
+            return str(value).strip() if value is not None else ''
+
+        return {
+            'first_name': _field('first_name'),
+            'last_name': _field('last_name'),
+            'email': _field('email'),
+            'phone': _field('phone'),
+            'shipping_address': _field('shipping_address') or str(data.get('address') or '').strip(),
+            'shipping_latitude': data.get('shipping_latitude'),
+            'shipping_longitude': data.get('shipping_longitude'),
+            'shipping_geocoded': data.get('shipping_geocoded'),
+            'order_notes': str(data.get('order_notes') or '').strip(),
+        }
+
+    def place_order(is_client, details, cart_items, cart_obj):
+        """Crée la commande à partir du panier courant (checkout HTML et API JSON).
+
+        Lève `cart_service.CartError` (message affichable, code stable pour l'API).
+        Retourne (commande, client, compte_invité_créé).
+        """
+        first_name = details['first_name']
+        last_name = details['last_name']
+        email = details['email']
+        phone = details['phone']
+        shipping_address = details['shipping_address']
+        order_notes = details['order_notes']
+
+        if not all([first_name, last_name, email, phone, shipping_address]):
+            raise cart_service.CartError('missing_fields', 'Veuillez compléter vos informations pour finaliser la commande.')
+
+        # Vérifier le stock et recalculer le total
+        total = 0
+        for item in cart_items:
+            product = item.product
+            if not product or not product.is_active:
+                if is_client and cart_obj:
+                    try:
+                        db.session.delete(item)
+                        cart_service.refresh_totals(cart_obj.id)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                else:
+                    # Nettoyer le panier invité
+                    set_guest_cart(get_guest_cart())
+                raise cart_service.CartError('unavailable', 'Un article n’est plus disponible et a été retiré du panier.',
+                                             status=409, level='warning', back_to_cart=True)
+            if item.quantity > product.quantity:
+                if not is_client:
+                    # Panier invité ramené au stock disponible
+                    set_guest_cart(get_guest_cart())
+                raise cart_service.CartError('insufficient_stock', f'Stock insuffisant pour {product.name}',
+                                             status=409, back_to_cart=True)
+            total += product.price * item.quantity
+
+        # Déterminer l'utilisateur associé à la commande
+        order_user = current_user if is_client else None
+        created_guest_user = False
+        if not is_client:
+            existing_user = User.query.filter_by(email=email).first()
+            if existing_user and (existing_user.is_admin or existing_user.is_super_admin):
+                raise cart_service.CartError('email_reserved', 'Veuillez utiliser une adresse email dédiée aux clients.')
+            if existing_user:
+                order_user = existing_user
+                order_user.first_name = order_user.first_name or first_name
+                order_user.last_name = order_user.last_name or last_name
+                order_user.phone = order_user.phone or phone
+                order_user.address = order_user.address or shipping_address
+            else:
+                order_user = User(
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone=phone,
+                    address=shipping_address,
+                    is_admin=False,
+                    is_super_admin=False
+                )
+                order_user.set_password(secrets.token_urlsafe(12))
+                db.session.add(order_user)
+                db.session.flush()
+                created_guest_user = True
+
+        try:
+            order_number = generate_order_number()
+            order = Order(
+                order_number=order_number,
+                user_id=order_user.id,
+                total_amount=total,
+                shipping_address=shipping_address,
+                billing_address=order_user.address or shipping_address,
+                status='pending',
+                status_changed_at=datetime.utcnow(),
+                stock_deducted=False,
+                delivered_at=None,
+                notes=order_notes or None
+            )
+
+            db.session.add(order)
+            db.session.flush()
+
+            lat = lon = None
+            formatted = None
+            try:
+                if details['shipping_latitude'] and details['shipping_longitude']:
+                    lat = float(details['shipping_latitude'])
+                    lon = float(details['shipping_longitude'])
+                    formatted = details['shipping_geocoded'] or shipping_address
+            except Exception:
+                lat = lon = None
+
+            if lat is None or lon is None:
+                lat, lon, formatted = geocode_address(shipping_address)
+
+            if lat and lon:
+                order.shipping_latitude = lat
+                order.shipping_longitude = lon
+            if formatted:
+                order.shipping_geocoded = formatted
+
+            for item in cart_items:
+                product = Product.query.get(getattr(item.product, 'id', None))
+                if not product or product.quantity < item.quantity:
+                    raise ValueError(f"Stock insuffisant pour {getattr(item.product, 'name', 'Produit')}")
+
+                order_item = OrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    quantity=item.quantity,
+                    price=product.price
+                )
+                db.session.add(order_item)
+
+            if is_client and cart_obj:
+                # Lignes déjà chargées avec le panier : supprimées par cascade
+                db.session.delete(cart_obj)
+            else:
+                set_guest_cart([])
+                session.pop('guest_checkout', None)
+
+            db.session.commit()
+            sync_cart_count()
+            record_activity(
+                f"Nouvelle commande #{order.order_number}",
+                actor=order_user,
+                extra=f"Total: {total} | Statut: {order.status} | Téléphone: {order_user.phone or '-'}"
+            )
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Erreur lors de la création de la commande: {e}")
+            raise cart_service.CartError('order_failed', 'Erreur lors du traitement de la commande. Veuillez réessayer.', status=500)
+
+        # Garder une trace pour l'accès invité à la confirmation
+        try:
+            recent_orders = session.get('recent_orders', [])
+            recent_orders = [oid for oid in recent_orders if isinstance(oid, int)]
+            recent_orders.append(order.id)
+            session['recent_orders'] = recent_orders[-5:]
+            session.modified = True
+        except Exception:
+            pass
+
+        try:
+            send_email(
+                to=order_user.email,
+                subject=f'🎉 Confirmation de commande #{order.order_number}',
+                body=f"""
+                Bonjour {order_user.first_name},
+                
+                Votre commande #{order.order_number} a été enregistrée avec succès!
+                
+                📦 DÉTAILS DE LA COMMANDE:
+                Montant total: {order.total_amount} €
+                Articles: {len(order.items)}
+                Statut: En traitement
+                
+                🏠 ADRESSE DE LIVRAISON:
+                {order.shipping_address}
+                
+                Merci pour votre confiance!
+                
+                L'équipe Manga Store
+                """
+            )
+        except Exception as e:
+            print(f"⚠️ Email non envoyé: {e}")
+
+        return order, order_user, created_guest_user
+
     @app.route('/checkout', methods=['GET', 'POST'])
     def checkout():
         if current_user.is_authenticated and getattr(current_user, 'is_admin', False):
@@ -1577,218 +1649,46 @@ def create_app():
             return data
 
         def _load_cart():
+            summary, cart_obj = build_cart_summary()
             if is_client:
-                cart_obj = Cart.query.filter_by(user_id=current_user.id).first()
-                items = []
-                total_amt = 0
-                if cart_obj:
-                    items = CartItem.query.filter_by(cart_id=cart_obj.id).all()
-                    for item in items:
-                        if item.product:
-                            total_amt += item.product.price * item.quantity
-                return items, total_amt, cart_obj
-            items, total_amt = build_guest_cart_items()
-            return items, total_amt, None
+                # Les lignes indisponibles sont retirées au moment de valider (POST)
+                items = list(cart_obj.items) if cart_obj else []
+            else:
+                items = summary.items
+            return items, summary.subtotal, cart_obj, summary
 
         prefill = _prefill()
 
         if request.method == 'POST':
-            cart_items, total, cart_obj = _load_cart()
+            cart_items, total, cart_obj, summary = _load_cart()
             if not cart_items:
                 flash('Votre panier est vide', 'error')
                 return redirect(url_for('cart'))
 
-            shipping_address = request.form.get('shipping_address', prefill['shipping_address']).strip()
-            shipping_lat = request.form.get('shipping_latitude')
-            shipping_lon = request.form.get('shipping_longitude')
-            shipping_geocoded = request.form.get('shipping_geocoded')
-            first_name = request.form.get('first_name', prefill['first_name']).strip()
-            last_name = request.form.get('last_name', prefill['last_name']).strip()
-            email = request.form.get('email', prefill['email']).strip()
-            phone = request.form.get('phone', prefill['phone']).strip()
-            order_notes = request.form.get('order_notes', '').strip()
-
-            prefill.update({
-                'first_name': first_name,
-                'last_name': last_name,
-                'email': email,
-                'shipping_address': shipping_address,
-                'phone': phone
-            })
+            details = checkout_details(request.form, prefill)
+            prefill.update({key: details[key] for key in prefill})
             if not is_client:
                 session['guest_checkout'] = prefill
 
-            if not all([first_name, last_name, email, phone, shipping_address]):
-                flash('Veuillez compléter vos informations pour finaliser la commande.', 'error')
-                return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill)
-
-            # Vérifier le stock et recalculer le total
-            total = 0
-            for item in cart_items:
-                product = item.product
-                if not product or not product.is_active:
-                    flash('Un article n’est plus disponible et a été retiré du panier.', 'warning')
-                    if is_client and cart_obj:
-                        try:
-                            db.session.delete(item)
-                            db.session.commit()
-                        except Exception:
-                            db.session.rollback()
-                    else:
-                        # Nettoyer le panier invité
-                        cleaned = [i for i in get_guest_cart() if i.get('product_id') != getattr(item.product, 'id', item.id)]
-                        set_guest_cart(cleaned)
-                    return redirect(url_for('cart'))
-                if item.quantity > product.quantity:
-                    flash(f'Stock insuffisant pour {product.name}', 'error')
-                    return redirect(url_for('cart'))
-                total += product.price * item.quantity
-
-            # Déterminer l'utilisateur associé à la commande
-            order_user = current_user if is_client else None
-            created_guest_user = False
-            if not is_client:
-                existing_user = User.query.filter_by(email=email).first()
-                if existing_user and (existing_user.is_admin or existing_user.is_super_admin):
-                    flash('Veuillez utiliser une adresse email dédiée aux clients.', 'error')
-                    return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill)
-                if existing_user:
-                    order_user = existing_user
-                    order_user.first_name = order_user.first_name or first_name
-                    order_user.last_name = order_user.last_name or last_name
-                    order_user.phone = order_user.phone or phone
-                    order_user.address = order_user.address or shipping_address
-                else:
-                    order_user = User(
-                        email=email,
-                        first_name=first_name,
-                        last_name=last_name,
-                        phone=phone,
-                        address=shipping_address,
-                        is_admin=False,
-                        is_super_admin=False
-                    )
-                    order_user.set_password(secrets.token_urlsafe(12))
-                    db.session.add(order_user)
-                    db.session.flush()
-                    created_guest_user = True
-
-            try:
-                order_number = generate_order_number()
-                order = Order(
-                    order_number=order_number,
-                    user_id=order_user.id,
-                    total_amount=total,
-                    shipping_address=shipping_address,
-                    billing_address=order_user.address or shipping_address,
-                    status='pending',
-                    status_changed_at=datetime.utcnow(),
-                    stock_deducted=False,
-                    delivered_at=None,
-                    notes=order_notes or None
-                )
-
-                db.session.add(order)
-                db.session.flush()
-
-                lat = lon = None
-                formatted = None
-                try:
-                    if shipping_lat and shipping_lon:
-                        lat = float(shipping_lat)
-                        lon = float(shipping_lon)
-                        formatted = shipping_geocoded or shipping_address
-                except Exception:
-                    lat = lon = None
-
-                if lat is None or lon is None:
-                    lat, lon, formatted = geocode_address(shipping_address)
-
-                if lat and lon:
-                    order.shipping_latitude = lat
-                    order.shipping_longitude = lon
-                if formatted:
-                    order.shipping_geocoded = formatted
-
-                for item in cart_items:
-                    product = Product.query.get(getattr(item.product, 'id', None))
-                    if not product or product.quantity < item.quantity:
-                        raise ValueError(f"Stock insuffisant pour {getattr(item.product, 'name', 'Produit')}")
-
-                    order_item = OrderItem(
-                        order_id=order.id,
-                        product_id=product.id,
-                        quantity=item.quantity,
-                        price=product.price
-                    )
-                    db.session.add(order_item)
-
-                if is_client and cart_obj:
-                    CartItem.query.filter_by(cart_id=cart_obj.id).delete()
-                    db.session.delete(cart_obj)
-                else:
-                    set_guest_cart([])
-                    session.pop('guest_checkout', None)
-
-                db.session.commit()
-                sync_cart_count()
-                record_activity(
-                    f"Nouvelle commande #{order.order_number}",
-                    actor=order_user,
-                    extra=f"Total: {total} | Statut: {order.status} | Téléphone: {order_user.phone or '-'}"
-                )
-            except Exception as e:
-                db.session.rollback()
-                app.logger.error(f"Erreur lors de la création de la commande: {e}")
-                flash('Erreur lors du traitement de la commande. Veuillez réessayer.', 'error')
-                return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill)
-
-            # Garder une trace pour l'accès invité à la confirmation
             try:
-                recent_orders = session.get('recent_orders', [])
-                recent_orders = [oid for oid in recent_orders if isinstance(oid, int)]
-                recent_orders.append(order.id)
-                session['recent_orders'] = recent_orders[-5:]
-                session.modified = True
-            except Exception:
-                pass
-
-            try:
-                send_email(
-                    to=order_user.email,
-                    subject=f'🎉 Confirmation de commande #{order.order_number}',
-                    body=f"""
-                    Bonjour {order_user.first_name},
-                    
-                    Votre commande #{order.order_number} a été enregistrée avec succès!
-                    
-                    📦 DÉTAILS DE LA COMMANDE:
-                    Montant total: {order.total_amount} €
-                    Articles: {len(order.items)}
-                    Statut: En traitement
-                    
-                    🏠 ADRESSE DE LIVRAISON:
-                    {order.shipping_address}
-                    
-                    Merci pour votre confiance!
-                    
-                    L'équipe Manga Store
-                    """
-                )
-            except Exception as e:
-                print(f"⚠️ Email non envoyé: {e}")
+                order, order_user, created_guest_user = place_order(is_client, details, cart_items, cart_obj)
+            except cart_service.CartError as e:
+                flash(e.message, e.level)
+                if e.back_to_cart:
+                    return redirect(url_for('cart'))
+                return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill, summary=summary)
 
             if created_guest_user:
                 flash('Compte invité créé automatiquement pour suivre votre commande.', 'info')
             flash('Commande passée avec succès! Un email de confirmation vous a été envoyé.', 'success')
             return redirect(url_for('order_confirmation', order_id=order.id))
 
-        cart_items, total, _ = _load_cart()
+        cart_items, total, _, summary = _load_cart()
         if not cart_items:
             flash('Votre panier est vide', 'error')
             return redirect(url_for('cart'))
 
-        return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill)
+        return render_template('client/checkout.html', cart_items=cart_items, total=total, prefill=prefill, summary=summary)
     
     @app.route('/order_confirmation/<int:order_id>')
     def order_confirmation(order_id):
@@ -1814,6 +1714,151 @@ def create_app():
         
         return render_template('client/order_confirmation.html', order=order)
     
+    # === API PANIER / COMMANDE (JSON) ===
+
+    def _api_error(code, message, status=400):
+        return jsonify({'ok': False, 'error': code, 'message': message}), status
+
+    def _api_clients_only():
+        if current_user.is_authenticated and (getattr(current_user, 'is_admin', False) or getattr(current_user, 'is_deliverer', False)):
+            return _api_error('clients_only', 'Cette fonctionnalité est réservée aux clients', 403)
+        return None
+
+    def _api_scope():
+        """Portée des clés d'idempotence : le client connecté ou le visiteur (jeton de session)."""
+        if current_user.is_authenticated:
+            return f"u:{current_user.id}"
+        token = session.get('api_client')
+        if not token:
+            token = secrets.token_urlsafe(16)
+            session['api_client'] = token
+        return f"s:{token}"
+
+    def _api_payload():
+        data = request.get_json(silent=True)
+        return data if isinstance(data, dict) else request.form
+
+    def _api_quantity(data, default=None):
+        try:
+            return int(data.get('quantity', default))
+        except (TypeError, ValueError):
+            return None
+
+    def _cart_json(summary=None):
+        if summary is None:
+            summary, _ = build_cart_summary()
+        return {
+            'items': [{
+                'product_id': item.product.id,
+                'name': item.product.name,
+                'price': float(item.product.price or 0),
+                'quantity': item.quantity,
+                'stock': max(item.product.quantity or 0, 0),
+                'line_total': round(float(item.product.price or 0) * item.quantity, 2),
+                'image': get_first_image_url(item.product),
+            } for item in summary.items],
+            'item_count': summary.item_count,
+            'subtotal': round(summary.subtotal, 2),
+            'shipping': summary.shipping,
+            'shipping_out': summary.shipping_out,
+            'currency': app.config.get('BASE_CURRENCY', 'USD'),
+            'warnings': [{'level': level, 'message': message} for level, message in summary.warnings],
+        }
+
+    def _cart_mutation(action, success_message):
+        denied = _api_clients_only()
+        if denied:
+            return denied
+        try:
+            action()
+        except cart_service.CartError as e:
+            db.session.rollback()
+            return _api_error(e.code, e.message, e.status)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Erreur API panier: {e}")
+            return _api_error('server_error', "Impossible de mettre à jour le panier, veuillez réessayer.", 500)
+        cart_json = _cart_json()
+        return jsonify({'ok': True, 'message': success_message, 'cart': cart_json,
+                        'cart_count': session.get('cart_count', cart_json['item_count'])})
+
+    @app.route('/api/cart', methods=['GET'])
+    def api_cart():
+        denied = _api_clients_only()
+        if denied:
+            return denied
+        cart_json = _cart_json()
+        return jsonify({'ok': True, 'cart': cart_json, 'cart_count': cart_json['item_count']})
+
+    @app.route('/api/cart/items', methods=['POST'])
+    @idempotent(_api_scope)
+    def api_cart_add():
+        data = _api_payload()
+        quantity = _api_quantity(data, 1)
+        try:
+            product_id = int(data.get('product_id'))
+        except (TypeError, ValueError):
+            return _api_error('invalid_product', 'Produit invalide')
+        if quantity is None:
+            return _api_error('invalid_quantity', 'Quantité invalide')
+        product = db.session.get(Product, product_id)
+        if product is None or not product.is_active:
+            return _api_error('unavailable', 'Produit indisponible', 404)
+        return _cart_mutation(lambda: cart_add_product(product, quantity),
+                              f'{product.name} ajouté au panier ({quantity})')
+
+    @app.route('/api/cart/items/<int:product_id>', methods=['PATCH', 'PUT'])
+    @idempotent(_api_scope)
+    def api_cart_update(product_id):
+        quantity = _api_quantity(_api_payload())
+        if quantity is None or quantity < 0:
+            return _api_error('invalid_quantity', 'Quantité invalide')
+        message = 'Quantité mise à jour' if quantity else 'Article retiré du panier'
+        return _cart_mutation(lambda: cart_set_quantity(product_id, quantity), message)
+
+    @app.route('/api/cart/items/<int:product_id>', methods=['DELETE'])
+    @idempotent(_api_scope)
+    def api_cart_remove(product_id):
+        return _cart_mutation(lambda: cart_set_quantity(product_id, 0), 'Article retiré du panier')
+
+    @app.route('/api/checkout', methods=['POST'])
+    @idempotent(_api_scope)
+    def api_checkout():
+        denied = _api_clients_only()
+        if denied:
+            return denied
+        is_client = current_user.is_authenticated
+        summary, cart_obj = build_cart_summary()
+        cart_items = list(cart_obj.items) if (is_client and cart_obj) else summary.items
+        if not cart_items:
+            return _api_error('empty_cart', 'Votre panier est vide')
+
+        defaults = {}
+        if is_client:
+            defaults = {
+                'first_name': current_user.first_name or '',
+                'last_name': current_user.last_name or '',
+                'email': current_user.email or '',
+                'shipping_address': current_user.address or '',
+                'phone': current_user.phone or '',
+            }
+        else:
+            defaults = dict(session.get('guest_checkout') or {})
+        details = checkout_details(_api_payload(), defaults)
+        try:
+            order, _, created_guest_user = place_order(is_client, details, cart_items, cart_obj)
+        except cart_service.CartError as e:
+            return _api_error(e.code, e.message, e.status)
+        return jsonify({
+            'ok': True,
+            'order_id': order.id,
+            'order_number': order.order_number,
+            'total': float(order.total_amount or 0),
+            'guest_account_created': created_guest_user,
+            'redirect': url_for('order_confirmation', order_id=order.id),
+            'cart_count': session.get('cart_count', 0),
+        }), 201
+    
     @app.route('/orders')
     @login_required
     def client_orders():
@@ -2225,34 +2270,172 @@ def create_app():
             flash('Accès réservé aux administrateurs', 'error')
             return redirect(url_for('index'))
 
-        recognized_revenue = compute_recognized_revenue()
-
-        stats = {
-            'total_products': Product.query.count(),
-            'total_orders': Order.query.count(),
-            'total_users': User.query.filter_by(is_admin=False).count(),
-            'pending_orders': Order.query.filter_by(status='pending').count(),
-            'total_revenue': recognized_revenue
-        }
+        stats = read_dashboard_stats()
         
         # Commandes récentes
         recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
         
         return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders)
+
+    def _analytics_request():
+        """(début, fin, intervalle) depuis `start`, `end` (AAAA-MM-JJ) et `interval` (day/week/month)."""
+        start, end = analytics.parse_range(request.args.get('start'), request.args.get('end'))
+        interval = request.args.get('interval', 'day')
+        if interval not in analytics.INTERVALS:
+            raise ValueError("Intervalle inconnu")
+        return start, end, interval
+
+    def _analytics_response(payload):
+        until = analytics.rolled_until(db)
+        payload['rolled_until'] = until.isoformat() if until else None
+        response = jsonify(payload)
+        response.cache_control.private = True
+        response.cache_control.max_age = 60
+        return response
+
+    @app.route('/admin/analytics/sales.json')
+    @login_required
+    @require_permission('view_orders')
+    def admin_analytics_sales():
+        """Série CA / commandes / unités / panier moyen (filtre `category_id` ou `product_id`)."""
+        try:
+            start, end, interval = _analytics_request()
+            category_id = request.args.get('category_id', type=int)
+            product_id = request.args.get('product_id', type=int)
+        except ValueError:
+            return _api_error('invalid_range', 'Période ou intervalle invalide')
+        series = analytics.sales_series(db, start, end, interval, category_id=category_id, product_id=product_id)
+        return _analytics_response({
+            'start': start.isoformat(), 'end': end.isoformat(), 'interval': interval,
+            'category_id': category_id, 'product_id': product_id, 'series': series,
+        })
+
+    @app.route('/admin/analytics/top.json')
+    @login_required
+    @require_permission('view_orders')
+    def admin_analytics_top():
+        """Meilleurs produits (`by=product`) ou catégories (`by=category`) par CA sur la période."""
+        try:
+            start, end, _ = _analytics_request()
+        except ValueError:
+            return _api_error('invalid_range', 'Période ou intervalle invalide')
+        by = 'category' if request.args.get('by') == 'category' else 'product'
+        limit = min(max(request.args.get('limit', 10, type=int) or 10, 1), 100)
+        ranking = analytics.top_sales(db, start, end, by=by, limit=limit)
+        model = Category if by == 'category' else Product
+        ids = [row['id'] for row in ranking if row['id'] is not None]
+        names = dict(db.session.query(model.id, model.name).filter(model.id.in_(ids)).all()) if ids else {}
+        for row in ranking:
+            row['name'] = names.get(row['id'])
+        return _analytics_response({'start': start.isoformat(), 'end': end.isoformat(), 'by': by, 'items': ranking})
+
+    @app.route('/admin/analytics/deliveries.json')
+    @login_required
+    @require_permission('view_orders')
+    def admin_analytics_deliveries():
+        """Livraisons et CA livré par livreur et par période (filtre `deliverer_id`)."""
+        try:
+            start, end, interval = _analytics_request()
+            deliverer_id = request.args.get('deliverer_id', type=int)
+        except ValueError:
+            return _api_error('invalid_range', 'Période ou intervalle invalide')
+        by_deliverer = analytics.deliveries_series(db, start, end, interval, deliverer_id=deliverer_id)
+        ids = list(by_deliverer)
+        names = {
+            r.id: f"{r.first_name} {r.last_name}"
+            for r in db.session.query(Deliverer.id, Deliverer.first_name, Deliverer.last_name)
+            .filter(Deliverer.id.in_(ids)).all()
+        } if ids else {}
+        return _analytics_response({
+            'start': start.isoformat(), 'end': end.isoformat(), 'interval': interval,
+            'deliverers': [{'id': key, 'name': names.get(key), 'series': series}
+                           for key, series in sorted(by_deliverer.items())],
+        })
     
+    @app.route('/admin/analytics/zones.json')
+    @login_required
+    @require_permission('view_orders')
+    def admin_analytics_zones():
+        """Carte de la demande : commandes, CA et délai moyen par zone (géohash), `weekday`/`hour` facultatifs."""
+        try:
+            start, end, _ = _analytics_request()
+            precision = request.args.get('precision', 5, type=int)
+            weekday = request.args.get('weekday', type=int)
+            hour = request.args.get('hour', type=int)
+            if (weekday is not None and not 0 <= weekday <= 6) or (hour is not None and not 0 <= hour <= 23):
+                raise ValueError("Jour ou heure invalide")
+            hours = None
+            if weekday is not None or hour is not None:
+                days = [weekday] if weekday is not None else range(7)
+                slots = [hour] if hour is not None else range(24)
+                hours = [d * 24 + h for d in days for h in slots]
+            zones = analytics.demand_zones(db, start, end, precision=precision, hours=hours)
+        except ValueError:
+            return _api_error('invalid_range', 'Période, précision ou créneau invalide')
+        return _analytics_response({
+            'start': start.isoformat(), 'end': end.isoformat(), 'precision': precision,
+            'weekday': weekday, 'hour': hour, 'zones': zones,
+        })
+
     @app.route('/admin/products')
     @login_required
     @require_permission('view_products')
     def admin_products():
         search_term = request.args.get('q', '').strip()
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+        except Exception:
+            page = 1
+        per_page = int(app.config.get('ADMIN_PRODUCTS_PER_PAGE', 50))
         query = Product.query
         if search_term:
             like_pattern = f"%{search_term}%"
             query = query.filter(or_(Product.name.ilike(like_pattern), Product.description.ilike(like_pattern)))
 
-        products = query.order_by(Product.created_at.desc()).all()
-        categories = Category.query.all()
-        return render_template('admin/products.html', products=products, categories=categories, search_term=search_term)
+        total = query.count()
+        total_pages = max((total + per_page - 1) // per_page, 1)
+        page = min(page, total_pages)
+        # Tableau seul : les formulaires d'édition et la liste des catégories sont chargés à la demande
+        products = (query.options(joinedload(Product.category))
+                    .order_by(Product.created_at.desc(), Product.id.desc())
+                    .offset((page - 1) * per_page).limit(per_page).all())
+        return render_template(
+            'admin/products.html',
+            products=products,
+            search_term=search_term,
+            page=page,
+            total_pages=total_pages,
+            total=total,
+            catalog_version=_catalog_validators()[0][0],
+        )
+
+    @app.route('/admin/products/<int:product_id>/edit-form')
+    @login_required
+    @require_permission('manage_products')
+    def admin_product_edit_form(product_id):
+        """Fragment HTML du formulaire d'édition (ouvert depuis le tableau produits)."""
+        product = Product.query.get_or_404(product_id)
+        return render_template('admin/_product_edit_form.html', product=product)
+
+    @app.route('/admin/categories.json')
+    @login_required
+    @require_permission('view_products')
+    def admin_categories_json():
+        """Catégories pour les listes déroulantes ; versionnées par `catalog_version` (ETag)."""
+        version = _catalog_validators()[0][0]
+        etag = f"categories-{version}"
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            rows = db.session.query(Category.id, Category.name, Category.is_active).order_by(Category.name).all()
+            response = jsonify({
+                'version': version,
+                'categories': [{'id': r.id, 'name': r.name, 'is_active': bool(r.is_active)} for r in rows],
+            })
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
 
     @app.route('/admin/catalog/import', methods=['POST'])
     @login_required
@@ -2361,6 +2544,8 @@ def create_app():
                 product = Product.query.filter(db.func.lower(Product.name) == name_key).first()
                 if product:
                     updated += 1
+                    if product.price != price:
+                        repriced_ids.append(product.id)
                 else:
                     product = Product(name=name, category_id=category.id)
                     db.session.add(product)
@@ -2389,6 +2574,7 @@ def create_app():
                 featured_raw = _row_get(raw, field_map['is_featured'])
                 product.is_featured = _parse_bool(featured_raw, default=False)
 
+            cart_service.refresh_totals(cart_service.cart_ids_for_products(repriced_ids))
             db.session.commit()
             summary = (
                 f"Import catalogue: {created_categories} categorie(s) creee(s), "
@@ -2432,6 +2618,7 @@ def create_app():
 
             created = updated = skipped = 0
             errors = []
+            repriced_ids = []
 
             def _has_value(value):
                 return value is not None and (not isinstance(value, str) or value.strip() != '')
@@ -2479,6 +2666,8 @@ def create_app():
                 product = Product.query.filter(db.func.lower(Product.name) == name.lower()).first()
                 if product:
                     updated += 1
+                    if product.price != price:
+                        repriced_ids.append(product.id)
                 else:
                     product = Product(name=name, category_id=category.id)
                     db.session.add(product)
@@ -2507,6 +2696,7 @@ def create_app():
                 featured_raw = _row_get(row, field_map['is_featured'])
                 product.is_featured = _parse_bool(featured_raw, default=False)
 
+            cart_service.refresh_totals(cart_service.cart_ids_for_products(repriced_ids))
             db.session.commit()
             summary = f"Import produits: {created} cree(s), {updated} maj, {skipped} ignore(s)."
             if errors:
@@ -2649,6 +2839,7 @@ def create_app():
                     return redirect(url_for('admin_products'))
                 product.name = new_name
             product.description = request.form.get('description', product.description)
+            old_price = product.price
             product.price = float(request.form.get('price', product.price))
             product.quantity = int(request.form.get('quantity', product.quantity))
             product.category_id = int(request.form.get('category_id', product.category_id))
@@ -2737,13 +2928,17 @@ def create_app():
                 trimmed = [v for v in video_entries if v][:3]
                 product.videos = '|'.join(trimmed) if trimmed else None
 
+            if product.price != old_price:
+                # Sous-totaux dénormalisés des paniers contenant ce produit
+                cart_service.refresh_totals(cart_service.cart_ids_for_products([product.id]))
             db.session.commit()
             flash('Produit modifié avec succès', 'success')
         except Exception as e:
             flash('Erreur lors de la modification du produit', 'error')
             print(f"Erreur modification produit: {e}")
         
-        return redirect(url_for('admin_products'))
+        # Retour à la page du tableau d'où vient le formulaire
+        return redirect(request.referrer or url_for('admin_products'))
     
     @app.route('/admin/products/delete/<int:product_id>')
     @login_required
@@ -2757,7 +2952,9 @@ def create_app():
             if order_items:
                 flash('Impossible de supprimer ce produit car il est associé à des commandes', 'error')
                 return redirect(url_for('admin_products'))
+            affected_carts = cart_service.cart_ids_for_products([product_id])
             CartItem.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+            cart_service.refresh_totals(affected_carts)
             db.session.delete(product)
             db.session.commit()
             flash('Produit supprimé avec succès', 'success')
@@ -2784,7 +2981,9 @@ def create_app():
         skipped = len(locked_ids)
 
         if deletable_ids:
+            affected_carts = cart_service.cart_ids_for_products(deletable_ids)
             CartItem.query.filter(CartItem.product_id.in_(deletable_ids)).delete(synchronize_session=False)
+            cart_service.refresh_totals(affected_carts)
             Product.query.filter(Product.id.in_(deletable_ids)).delete(synchronize_session=False)
         db.session.commit()
         flash(f"Suppression groupée: {deleted} supprimé(s), {skipped} ignoré(s) (liés à des commandes).", 'success')
@@ -2985,6 +3184,13 @@ def create_app():
                 db.session.commit()
                 schedule_stock_deduction(order)
                 _deduct_stock_if_due(order.id)
+            elif new_status == 'confirmed' and old_status != 'confirmed':
+                try:
+                    if dispatch.dispatch_pending(order_ids=[order.id]):
+                        flash('Commande affectée automatiquement au livreur le plus proche', 'success')
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Affectation automatique impossible pour {order.order_number}: {e}")
             
             # Envoyer un email de mise à jour si le statut change
             if old_status != new_status:
@@ -3042,7 +3248,7 @@ def create_app():
     @login_required
     @require_permission('view_categories')
     def admin_categories():
-        categories = Category.query.all()
+        categories = _with_product_counts(Category.query.order_by(Category.id))
         return render_template('admin/categories.html', categories=categories, category_icons=CATEGORY_ICON_CHOICES)
 
     @app.route('/admin/categories/import', methods=['POST'])
@@ -3065,6 +3271,7 @@ def create_app():
 
             created = updated = skipped = 0
             errors = []
+            repriced_ids = []
 
             def _has_value(value):
                 return value is not None and (not isinstance(value, str) or value.strip() != '')
@@ -3115,6 +3322,8 @@ def create_app():
     @login_required
     @require_permission()
     def admin_tasks():
+        # Entrées encore en file : visibles dès l'affichage
+        activity_log.flush()
         logs = ActivityLog.query.order_by(ActivityLog.created_at.desc()).limit(300).all()
         return render_template('admin/tasks.html', logs=logs)
     
@@ -3192,8 +3401,8 @@ def create_app():
         category = Category.query.get_or_404(category_id)
         
         try:
-            # Vérifier si la catégorie a des produits
-            if category.products:
+            # Vérifier si la catégorie a des produits (EXISTS, sans charger la liste)
+            if db.session.query(Product.query.filter(Product.category_id == category.id).exists()).scalar():
                 flash('Impossible de supprimer cette catégorie car elle contient des produits', 'error')
                 return redirect(url_for('admin_categories'))
                 
@@ -3240,16 +3449,6 @@ def create_app():
             flash('Accès réservé aux super-administrateurs ou admins autorisés', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        def _get_rate(src: str, dest: str) -> float:
-            """Convertit entre USD et CDF selon les taux fixes définis."""
-            if not src or not dest or src == dest:
-                return 1.0
-            rates = {
-                ('USD', 'CDF'): 2200.0,
-                ('CDF', 'USD'): 1/2200.0
-            }
-            return rates.get((src.upper(), dest.upper()), 1.0)
-
         settings = ShopSettings.query.first()
         if not settings:
             settings = ShopSettings()
@@ -3265,7 +3464,7 @@ def create_app():
 
                 # Convertir les frais si la devise a changé (ex: 6000 CDF -> USD)
                 if old_currency != new_currency:
-                    rate = _get_rate(old_currency, new_currency)
+                    rate = currency.get_rate(old_currency, new_currency)
                     shipping_cost_input = round(shipping_cost_input * rate, 2)
                     shipping_cost_out_input = round(shipping_cost_out_input * rate, 2)
 
@@ -3373,7 +3572,8 @@ def create_app():
             
             return redirect(url_for('admin_settings'))
         
-        return render_template('admin/settings.html', settings=settings)
+        return render_template('admin/settings.html', settings=settings,
+                               usd_cdf_rate=currency.get_rate('USD', 'CDF'))
     
     @app.route('/admin/admins')
     @login_required
@@ -3425,8 +3625,9 @@ def create_app():
         week_start, week_end = _week_bounds()
 
         weekly_progress = {}
+        bonus_states = _weekly_bonus_states(deliverers)
         for d in deliverers:
-            state = _weekly_bonus_state(d)
+            state = bonus_states[d.id]
             count = state['deliveries']
             percent = min(100, int((state['current_block_count'] / 8) * 100)) if count else 0
             eligible = state['outstanding'] > 0
@@ -3541,32 +3742,54 @@ def create_app():
     @require_permission('manage_deliverers')
     def admin_view_deliverer(deliverer_id):
         deliverer = Deliverer.query.get_or_404(deliverer_id)
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+        except Exception:
+            page = 1
+        per_page = int(app.config.get('ADMIN_DELIVERER_ASSIGNMENTS_PER_PAGE', 50))
+        # Compteurs en une requête agrégée ; seules la page d'historique et les derniers paiements sont chargés
+        is_delivered = DeliveryAssignment.status == 'delivered'
+        counts = (db.session.query(
+                      db.func.count(DeliveryAssignment.id),
+                      db.func.count(DeliveryAssignment.id).filter(is_delivered),
+                      db.func.count(DeliveryAssignment.id).filter(
+                          is_delivered, db.func.coalesce(DeliveryAssignment.payout_status, '') != 'paid'))
+                  .filter(DeliveryAssignment.deliverer_id == deliverer.id)
+                  .one())
+        total, delivered_count, pending_payout_count = counts
+        total_pages = max((total + per_page - 1) // per_page, 1)
+        page = min(page, total_pages)
         assignments = (DeliveryAssignment.query
                        .options(joinedload(DeliveryAssignment.order))
                        .filter_by(deliverer_id=deliverer.id)
-                       .order_by(DeliveryAssignment.created_at.desc())
+                       .order_by(DeliveryAssignment.created_at.desc(), DeliveryAssignment.id.desc())
+                       .offset((page - 1) * per_page).limit(per_page)
                        .all())
-        delivered = [a for a in assignments if a.status == 'delivered']
-        pending_payout = [a for a in delivered if a.payout_status != 'paid']
-        paid_assignments = [a for a in assignments if a.payout_status == 'paid']
-        # Totaux commissions (base + bonus dimanche) hors bonus hebdo
-        base_commission_total = sum(_assignment_commission(a) for a in delivered)
-        weekly_bonus_total = _weekly_bonus_total(delivered)
-        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        delivered_month = [a for a in delivered if a.completed_at and a.completed_at >= month_start]
-        monthly_base = sum(_assignment_commission(a) for a in delivered_month)
-        monthly_weekly_bonus = _weekly_bonus_total(delivered_month)
+        paid_assignments = (DeliveryAssignment.query
+                            .options(joinedload(DeliveryAssignment.order))
+                            .filter_by(deliverer_id=deliverer.id, payout_status='paid')
+                            .order_by(DeliveryAssignment.completed_at.desc(), DeliveryAssignment.id.desc())
+                            .limit(per_page)
+                            .all())
+        # Totaux commissions depuis le grand livre (instantanés mensuels + mois en cours)
+        lifetime = ledger.lifetime_totals(deliverer.id)
+        month = ledger.month_totals(deliverer.id)
+        db.session.commit()  # instantanés des mois clos créés à la lecture
         bonus_state = _weekly_bonus_state(deliverer)
         return render_template('admin/deliverer_view.html',
                                deliverer=deliverer,
                                assignments=assignments,
-                               pending_payout=pending_payout,
+                               total=total,
+                               page=page,
+                               total_pages=total_pages,
+                               delivered_count=delivered_count,
+                               pending_payout_count=pending_payout_count,
                                paid_assignments=paid_assignments,
-                               base_commission_total=base_commission_total,
-                               weekly_bonus_total=weekly_bonus_total,
-                               monthly_base=monthly_base,
-                               monthly_weekly_bonus=monthly_weekly_bonus,
-                               monthly_deliveries=len(delivered_month),
+                               base_commission_total=lifetime['base'],
+                               weekly_bonus_total=lifetime['weekly_bonus'],
+                               monthly_base=month['base'],
+                               monthly_weekly_bonus=month['weekly_bonus'],
+                               monthly_deliveries=month['deliveries'],
                                bonus_state=bonus_state)
 
     @app.route('/admin/deliverers/<int:deliverer_id>/payout', methods=['POST'])
@@ -3574,18 +3797,9 @@ def create_app():
     @require_permission('manage_deliverers')
     def admin_payout_deliverer(deliverer_id):
         deliverer = Deliverer.query.get_or_404(deliverer_id)
-        to_pay = (DeliveryAssignment.query
-                  .filter(DeliveryAssignment.deliverer_id == deliverer.id)
-                  .filter(DeliveryAssignment.payout_status != 'paid')
-                  .all())
         try:
-            for a in to_pay:
-                a.status = a.status or 'delivered'
-                a.payout_status = 'paid'
-                a.commission_recorded = True
-                a.completed_at = a.completed_at or datetime.utcnow()
-            # Remettre à zéro le solde dû
-            deliverer.commission_due = 0.0
+            # Une écriture de paiement (solde remis à zéro) et un UPDATE des affectations
+            ledger.pay_out(deliverer.id)
             db.session.commit()
             flash('Commission payée et historique mis à jour', 'success')
         except Exception as e:
@@ -3606,7 +3820,8 @@ def create_app():
 
         try:
             payout = state['outstanding'] * 5.0
-            deliverer.commission_due = (deliverer.commission_due or 0) + payout
+            ledger.record(deliverer.id, 'weekly_bonus', payout, week_start=state['week_start'],
+                          note=f"{state['outstanding']} bonus hebdo")
             deliverer.last_bonus_week_start = state['week_start']
             deliverer.weekly_bonus_paid_count = state['bonuses_earned']
             db.session.commit()
@@ -3790,16 +4005,148 @@ def create_app():
             flash('Déconnexion livreur réussie', 'success')
         return redirect(url_for('deliverer_login_page'))
 
+    ACTIVE_ASSIGNMENT_STATUSES = ('assigned', 'in_progress', 'postponed')
+
+    def _deliverer_assignment_rows(query, limit=None):
+        """Projection légère des affectations (colonnes affichées, sans graphe ORM)."""
+        query = (query.with_entities(
+                     DeliveryAssignment.id, DeliveryAssignment.status, DeliveryAssignment.created_at,
+                     DeliveryAssignment.completed_at,
+                     Order.order_number, Order.status.label('order_status'), Order.total_amount,
+                     Order.shipping_address, Order.shipping_geocoded,
+                     Order.shipping_latitude, Order.shipping_longitude,
+                     User.first_name, User.last_name, User.phone, User.email)
+                 .join(Order, Order.id == DeliveryAssignment.order_id)
+                 .outerjoin(User, User.id == Order.user_id))
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def _deliverer_dashboard_validators(**_):
+        """Version du tableau de bord : affectations du livreur, leurs commandes, statut et paramètres."""
+        row = (db.session.query(db.func.count(DeliveryAssignment.id),
+                                db.func.max(DeliveryAssignment.updated_at),
+                                db.func.max(Order.updated_at))
+               .join(Order, Order.id == DeliveryAssignment.order_id)
+               .filter(DeliveryAssignment.deliverer_id == current_user.id)
+               .one())
+        settings = db.session.query(ShopSettings.updated_at).order_by(ShopSettings.id).first()
+        settings_at = settings.updated_at if settings else None
+        last_modified = max((d for d in (row[1], row[2], settings_at) if d), default=None)
+        # Cellule de départ de la tournée : l'ordre et les distances changent avec la position
+        origin = routing.origin_key(dispatch.current_position(current_user.id))
+        return (row[0], row[1], row[2], settings_at, current_user.status, origin), last_modified
+
+    def _deliverer_route(base):
+        """Missions en cours dans l'ordre de la tournée calculée (cache tant que les missions et la position ne changent pas)."""
+        rows = _deliverer_assignment_rows(
+            base.filter(DeliveryAssignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES))
+            .order_by(DeliveryAssignment.created_at.desc(), DeliveryAssignment.id.desc()))
+        route = routing.route_for(
+            current_user.id,
+            [(row.id, row.shipping_latitude, row.shipping_longitude) for row in rows],
+            origin=dispatch.current_position(current_user.id))
+        by_id = {row.id: row for row in rows}
+        return [by_id[key] for key in route['order']], route
+
     @app.route('/livreur/dashboard')
     @deliverer_required
+    @user_conditional_page(_deliverer_dashboard_validators)
     def deliverer_dashboard():
-        assignments = (DeliveryAssignment.query
-                       .options(joinedload(DeliveryAssignment.order).joinedload(Order.items),
-                                joinedload(DeliveryAssignment.order).joinedload(Order.customer))
-                       .filter_by(deliverer_id=current_user.id)
-                       .order_by(DeliveryAssignment.created_at.desc())
-                       .all())
-        return render_template('deliverer/dashboard.html', assignments=assignments)
+        """Missions en cours (complètes) ; historique terminé paginé par curseur (`before` = id)."""
+        tab = 'history' if request.args.get('tab') == 'history' else 'active'
+        base = DeliveryAssignment.query.filter(DeliveryAssignment.deliverer_id == current_user.id)
+        active_count = base.filter(DeliveryAssignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES)).count()
+        assignments, next_cursor, route = [], None, None
+        if tab == 'active':
+            assignments, route = _deliverer_route(base)
+        else:
+            per_page = int(app.config.get('DELIVERER_HISTORY_PER_PAGE', 20))
+            query = base.filter(DeliveryAssignment.status.notin_(ACTIVE_ASSIGNMENT_STATUSES))
+            before = request.args.get('before', type=int)
+            if before:
+                query = query.filter(DeliveryAssignment.id < before)
+            assignments = _deliverer_assignment_rows(
+                query.order_by(DeliveryAssignment.id.desc()), limit=per_page + 1)
+            if len(assignments) > per_page:
+                assignments = assignments[:per_page]
+                next_cursor = assignments[-1].id
+        return render_template('deliverer/dashboard.html', assignments=assignments, tab=tab,
+                               active_count=active_count, next_cursor=next_cursor, route=route,
+                               cursor=request.args.get('before', type=int))
+
+    def _deliverer_assignment_json(row):
+        return {
+            'id': row.id,
+            'status': row.status,
+            'status_label': status_fr_helper(row.status, 'assignment'),
+            'order_number': row.order_number,
+            'order_status': row.order_status,
+            'order_status_label': status_fr_helper(row.order_status, 'order'),
+            'total_amount': row.total_amount,
+            'address': row.shipping_geocoded or row.shipping_address,
+            'latitude': row.shipping_latitude,
+            'longitude': row.shipping_longitude,
+            'customer': ' '.join(filter(None, (row.first_name, row.last_name))),
+            'contact': row.phone or row.email,
+        }
+
+    @app.route('/livreur/api/route')
+    def deliverer_api_route():
+        """Tournée des missions en cours : étapes ordonnées, distance de chaque étape et totale (km)."""
+        if not current_user.is_authenticated or not getattr(current_user, 'is_deliverer', False):
+            return _api_error('unauthorized', 'Session livreur expirée, reconnectez-vous', 401)
+        base = DeliveryAssignment.query.filter(DeliveryAssignment.deliverer_id == current_user.id)
+        rows, route = _deliverer_route(base)
+        stops = []
+        for position, row in enumerate(rows, start=1):
+            stop = _deliverer_assignment_json(row)
+            stop.update(position=position, leg_km=route['legs'].get(row.id))
+            stops.append(stop)
+        return jsonify({
+            'ok': True,
+            'origin': route['origin'],
+            'total_km': route['total_km'],
+            'initial_km': route['initial_km'],
+            'stops': stops,
+        })
+
+    @app.route('/livreur/api/sync', methods=['POST'])
+    def deliverer_api_sync():
+        """Applique la file hors ligne du livreur (une transaction) et renvoie ses missions en cours.
+
+        Corps : `{"changes": [{"id", "type": "assignment"|"deliverer_status", "assignment_id",
+        "status", "note", "recorded_at"}]}` ; une liste vide rafraîchit seulement les missions.
+        """
+        if not current_user.is_authenticated or not getattr(current_user, 'is_deliverer', False):
+            return _api_error('unauthorized', 'Session livreur expirée, reconnectez-vous', 401)
+        payload = request.get_json(silent=True)
+        changes = payload.get('changes', []) if isinstance(payload, dict) else None
+        if not isinstance(changes, list):
+            return _api_error('invalid_payload', 'Format de synchronisation invalide')
+        limit = int(app.config.get('DELIVERER_SYNC_MAX_CHANGES', 100))
+        if len(changes) > limit:
+            return _api_error('too_many_changes', f'{limit} changements maximum par envoi', 413)
+        try:
+            results = deliverer_sync.apply_changes(current_user, changes)
+            deliverer_sync.purge_expired(float(app.config.get('DELIVERER_SYNC_LOG_TTL_HOURS', 168)))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Erreur synchronisation livreur {current_user.email}: {e}")
+            return _api_error('sync_failed', 'Synchronisation impossible, nouvel essai plus tard', 500)
+        rows = _deliverer_assignment_rows(
+            DeliveryAssignment.query
+            .filter(DeliveryAssignment.deliverer_id == current_user.id)
+            .filter(DeliveryAssignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES))
+            .order_by(DeliveryAssignment.created_at.desc(), DeliveryAssignment.id.desc()))
+        return jsonify({
+            'ok': True,
+            'results': results,
+            'deliverer_status': current_user.status,
+            'deliverer_status_label': status_fr_helper(current_user.status, 'deliverer'),
+            'assignments': [_deliverer_assignment_json(row) for row in rows],
+        })
 
     @app.route('/livreur/status', methods=['POST'])
     @deliverer_required
@@ -3875,51 +4222,15 @@ def create_app():
             flash('Profil mis à jour', 'success')
             return redirect(url_for('deliverer_profile'))
 
-        now = datetime.utcnow()
-        month_start = datetime(now.year, now.month, 1)
-        delivered_qs = (DeliveryAssignment.query
-                        .options(joinedload(DeliveryAssignment.order))
-                        .filter_by(deliverer_id=current_user.id, status='delivered')
-                        .filter(DeliveryAssignment.completed_at >= month_start)
-                        .all())
-
-        # Commission du mois (base + dimanche + bonus hebdo par tranche de 8)
-        commission_this_month = 0.0
-        weekly_counts = defaultdict(int)
-        for a in delivered_qs:
-            commission_this_month += _assignment_commission(a)
-            if a.completed_at:
-                week_start, _ = _week_bounds(a.completed_at)
-                weekly_counts[week_start] += 1
-        for week_start, count in weekly_counts.items():
-            commission_this_month += (count // 8) * 5.0
-
+        # Mois en cours et historique des paiements : agrégats du grand livre
+        history = ledger.monthly_history(current_user.id)
+        db.session.commit()  # instantanés des mois clos créés à la lecture
         monthly_stats = {
-            'deliveries_this_month': len(delivered_qs),
-            'commission_this_month': commission_this_month
+            'deliveries_this_month': history[0]['deliveries'],
+            'commission_this_month': history[0]['earned'],
         }
-
-        # Historique commissions payées par mois (base + bonus hebdo)
-        paid_assignments = (DeliveryAssignment.query
-                            .options(joinedload(DeliveryAssignment.order))
-                            .filter_by(deliverer_id=current_user.id, payout_status='paid')
-                            .order_by(DeliveryAssignment.completed_at.desc())
-                            .all())
-        commission_history = defaultdict(float)
-        weekly_paid_counts = defaultdict(int)
-        month_counts = defaultdict(int)
-        for a in paid_assignments:
-            key_month = a.completed_at.strftime('%Y-%m') if a.completed_at else 'N/A'
-            commission_history[key_month] += _assignment_commission(a)
-            month_counts[key_month] += 1
-            if a.completed_at:
-                week_start, _ = _week_bounds(a.completed_at)
-                weekly_paid_counts[(week_start, key_month)] += 1
-        for (week_start, key_month), count in weekly_paid_counts.items():
-            commission_history[key_month] += (count // 8) * 5.0
-
-        history_list = [{'month': k, 'amount': v, 'count': month_counts.get(k, 0)} for k, v in commission_history.items()]
-        history_list.sort(key=lambda x: x['month'], reverse=True)
+        history_list = [{'month': row['month'].strftime('%Y-%m'), 'amount': row['payout'], 'count': row['deliveries_paid']}
+                        for row in history if row['payout'] or row['deliveries_paid']]
 
         return render_template('deliverer/profile.html', monthly_stats=monthly_stats, commission_history=history_list)
 
@@ -3960,26 +4271,8 @@ def create_app():
 
             return redirect(url_for('admin_profile'))
 
-        # Pré-calculer les statistiques à afficher dans la vue profil
-        try:
-            product_count = Product.query.count()
-        except Exception:
-            product_count = 0
-
-        try:
-            order_count = Order.query.count()
-        except Exception:
-            order_count = 0
-
-        try:
-            user_count = User.query.filter_by(is_admin=False).count()
-        except Exception:
-            user_count = 0
-
-        try:
-            pending_count = Order.query.filter_by(status='pending').count()
-        except Exception:
-            pending_count = 0
+        # Statistiques à afficher dans la vue profil (même ligne que le tableau de bord)
+        stats = read_dashboard_stats()
 
         try:
             current_perms = set(_parse_permissions_field(current_user.permissions))
@@ -3996,10 +4289,10 @@ def create_app():
             my_requests = []
 
         return render_template('admin/profile.html', 
-                               product_count=product_count,
-                               order_count=order_count,
-                               user_count=user_count,
-                               pending_count=pending_count,
+                               product_count=stats['total_products'],
+                               order_count=stats['total_orders'],
+                               user_count=stats['total_users'],
+                               pending_count=stats['pending_orders'],
                                my_requests=my_requests,
                                missing_permissions=missing_permissions)
 
@@ -4229,6 +4522,18 @@ def create_app():
                 _active_calls.pop(peer, None)
                 emit('call:end', {'from': uid}, room=_user_room(peer))
 
+    @socketio.on('deliverer:position')
+    def socket_deliverer_position(data):
+        if not current_user.is_authenticated or not getattr(current_user, 'is_deliverer', False):
+            return
+        if not isinstance(data, dict):
+            return
+        try:
+            dispatch.report_position(current_user.id, data.get('lat'), data.get('lon'))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Position livreur {current_user.id} non enregistrée: {e}")
+
     @socketio.on('call:init')
     def socket_call_init(data):
         if not current_user.is_authenticated:
@@ -4376,6 +4681,7 @@ def create_app():
         currency_param = _normalize_currency_param(request.args.get('currency'))
         if request.args.get('currency') and not currency_param:
             flash('Devise non supportée, export dans la devise par défaut.', 'warning')
+        from backend.utils import generate_products_pdf
         pdf_buffer = generate_products_pdf(products, target_currency=currency_param)
         
         if pdf_buffer:
@@ -4403,6 +4709,7 @@ def create_app():
         currency_param = _normalize_currency_param(request.args.get('currency'))
         if request.args.get('currency') and not currency_param:
             flash('Devise non supportée, facture générée dans la devise par défaut.', 'warning')
+        from backend.utils import generate_invoice_pdf
         invoice_buffer = generate_invoice_pdf(order, target_currency=currency_param)
         
         if invoice_buffer:
@@ -4444,6 +4751,7 @@ def create_app():
         if request.args.get('currency') and not currency_param:
             flash('Devise non supportée, facture générée dans la devise par défaut.', 'warning')
 
+        from backend.utils import generate_invoice_pdf
         invoice_buffer = generate_invoice_pdf(order, target_currency=currency_param)
         if invoice_buffer:
             return send_file(
@@ -4528,4 +4836,8 @@ def create_app():
         except Exception:
             return ('', 204)
 
+    # Tâches de fond périodiques : dans ce processus, sauf préchargement gunicorn (lancées au post_fork)
+    if not workers.deferred():
+        workers.start()
+
     return app
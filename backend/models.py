@@ -62,6 +62,10 @@ class Deliverer(UserMixin, db.Model):
     last_bonus_week_start = db.Column(db.Date)  # Date du lundi de la dernière prime hebdo payée
     weekly_bonus_paid_count = db.Column(db.Integer, default=0)  # Nombre de bonus 5$ déjà payés cette semaine
     last_forum_seen_at = db.Column(db.DateTime)
+    # Dernière position signalée (Socket.IO), reprise dans la grille d'affectation au démarrage
+    last_latitude = db.Column(db.Float)
+    last_longitude = db.Column(db.Float)
+    last_position_at = db.Column(db.DateTime)
 
     assignments = db.relationship('DeliveryAssignment', backref='deliverer', lazy=True, cascade='all, delete-orphan')
 
@@ -95,6 +99,7 @@ class Category(db.Model):
     icon = db.Column(db.String(80))
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relation
     products = db.relationship('Product', backref='category', lazy=True)
@@ -113,9 +118,10 @@ class Product(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_featured = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Clés étrangères
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, index=True)
     
     # Relations
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
@@ -126,6 +132,9 @@ class Cart(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Totaux dénormalisés, recalculés à chaque écriture du panier (badge sans agrégat)
+    item_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    subtotal = db.Column(db.Float, default=0.0, nullable=False, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -148,7 +157,7 @@ class Order(db.Model):
     order_number = db.Column(db.String(20), unique=True, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, confirmed, shipped, delivered, cancelled
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, confirmed, shipped, delivered, cancelled
     shipping_address = db.Column(db.Text, nullable=False)
     billing_address = db.Column(db.Text)
     shipping_latitude = db.Column(db.Float)
@@ -157,7 +166,7 @@ class Order(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    delivered_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime, index=True)
     stock_deducted = db.Column(db.Boolean, default=False)
     status_changed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -195,6 +204,7 @@ class ShopSettings(db.Model):
     tax_rate = db.Column(db.Float, default=0.0)
     shipping_cost = db.Column(db.Float, default=0.0)
     shipping_cost_out = db.Column(db.Float, default=0.0)
+    catalog_version = db.Column(db.Integer, default=0)  # incrémenté à chaque modification produit/catégorie
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
@@ -232,6 +242,11 @@ class AccessRequest(db.Model):
 
 class DeliveryAssignment(db.Model):
     __tablename__ = 'delivery_assignments'
+    __table_args__ = (
+        db.Index('ix_delivery_assignments_deliverer_status', 'deliverer_id', 'status'),
+        db.Index('ix_delivery_assignments_deliverer_id_id', 'deliverer_id', 'id'),
+        db.Index('ix_delivery_assignments_order_status', 'order_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -259,3 +274,183 @@ class ForumMessage(db.Model):
 
     requester = db.relationship('User', foreign_keys=[user_id])
     deliverer = db.relationship('Deliverer', foreign_keys=[deliverer_id])
+
+
+class ServerSession(db.Model):
+    """Session stockée côté serveur (le cookie ne porte que l'identifiant opaque)."""
+    __tablename__ = 'server_sessions'
+
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class IdempotencyKey(db.Model):
+    """Réponse mémorisée d'une requête API rejouable (en-tête `Idempotency-Key`)."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (db.UniqueConstraint('scope', 'key', name='uq_idempotency_scope_key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(80), nullable=False)  # client (u:<id>) ou visiteur (s:<jeton>)
+    key = db.Column(db.String(128), nullable=False)
+    endpoint = db.Column(db.String(120), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL tant que la requête est en cours
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class ExchangeRate(db.Model):
+    """Taux de change : 1 `base` = `rate` `quote` (source 'manual', 'api' ou 'default')."""
+    __tablename__ = 'exchange_rates'
+    __table_args__ = (db.UniqueConstraint('base', 'quote', name='uq_exchange_rate_pair'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    base = db.Column(db.String(3), nullable=False)
+    quote = db.Column(db.String(3), nullable=False)
+    rate = db.Column(db.Float, nullable=False)
+    source = db.Column(db.String(20), default='manual')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StatsSnapshot(db.Model):
+    """Statistiques du tableau de bord admin (ligne unique id=1, tenue à jour par backend.utils.stats)."""
+    __tablename__ = 'stats_snapshot'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_products = db.Column(db.Integer, default=0, nullable=False)
+    total_orders = db.Column(db.Integer, default=0, nullable=False)
+    total_users = db.Column(db.Integer, default=0, nullable=False)  # clients (non admins)
+    pending_orders = db.Column(db.Integer, default=0, nullable=False)
+    recognized_revenue = db.Column(db.Float, default=0.0, nullable=False)
+    revenue_recognized_until = db.Column(db.DateTime)  # livraisons antérieures déjà cumulées
+    dirty = db.Column(db.Boolean, default=False, nullable=False)  # écriture en masse : recalcul complet
+    reconciled_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+
+class SalesDaily(db.Model):
+    """Ventes reconnues par jour × catégorie × produit (backend.utils.analytics).
+
+    `product_id` NULL : sous-total de la catégorie (commandes distinctes exactes).
+    """
+    __tablename__ = 'sales_daily'
+    __table_args__ = (
+        db.Index('ix_sales_daily_product_day', 'product_id', 'day'),
+        db.Index('ix_sales_daily_category_day', 'category_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)  # jour de livraison
+    category_id = db.Column(db.Integer)
+    product_id = db.Column(db.Integer)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)  # somme prix × quantité des lignes
+    units = db.Column(db.Integer, default=0, nullable=False)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+
+
+class SalesDailyTotal(db.Model):
+    """Ventes reconnues par jour (toutes catégories) : CA commandes, nombre, unités."""
+    __tablename__ = 'sales_daily_totals'
+
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)  # somme des total_amount
+    units = db.Column(db.Integer, default=0, nullable=False)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+
+
+class DeliveriesDaily(db.Model):
+    """Livraisons reconnues par jour × livreur."""
+    __tablename__ = 'deliveries_daily'
+    __table_args__ = (db.Index('ix_deliveries_daily_deliverer_day', 'deliverer_id', 'day'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    deliverer_id = db.Column(db.Integer, nullable=False)
+    deliveries = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+
+
+class DemandZoneDaily(db.Model):
+    """Demande livrée par jour × zone (géohash) × heure de la semaine de la commande (carte admin)."""
+    __tablename__ = 'demand_zones_daily'
+    __table_args__ = (db.Index('ix_demand_zones_daily_day_geohash', 'day', 'geohash'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # jour de livraison (UTC), comme les autres cumuls
+    geohash = db.Column(db.String(12), nullable=False)
+    hour_of_week = db.Column(db.SmallInteger, nullable=False)  # 0 = lundi 0h ... 167 = dimanche 23h (UTC)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+    delivery_seconds = db.Column(db.Float, default=0.0, nullable=False)  # somme commande -> livraison
+    timed_orders = db.Column(db.Integer, default=0, nullable=False)  # commandes avec délai connu
+
+
+class RollupState(db.Model):
+    """Avancement des tables de cumul (ligne unique id=1)."""
+    __tablename__ = 'rollup_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_until = db.Column(db.DateTime)  # livraisons antérieures déjà cumulées
+    stale = db.Column(db.Boolean, default=False, nullable=False)  # écriture en masse : reconstruction complète
+    rebuilt_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CommissionEntry(db.Model):
+    """Grand livre des commissions livreurs (ajout seul, backend.utils.ledger).
+
+    `amount` signé (paiement négatif), `balance` : solde du livreur après l'écriture.
+    """
+    __tablename__ = 'commission_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('assignment_id', 'kind', name='uq_commission_assignment_kind'),
+        db.Index('ix_commission_ledger_deliverer_created', 'deliverer_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    deliverer_id = db.Column(db.Integer, db.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False)
+    assignment_id = db.Column(db.Integer)  # crédit / bonus dimanche : une écriture par affectation
+    kind = db.Column(db.String(20), nullable=False)  # credit, sunday_bonus, weekly_bonus, payout, adjustment
+    amount = db.Column(db.Float, nullable=False)
+    balance = db.Column(db.Float, nullable=False)
+    deliveries = db.Column(db.Integer, default=0, nullable=False)  # livraisons créditées / payées
+    week_start = db.Column(db.Date)  # bonus hebdo : lundi de la semaine
+    note = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CommissionSnapshot(db.Model):
+    """Totaux mensuels figés d'un livreur (mois clos : le grand livre n'y change plus)."""
+    __tablename__ = 'commission_snapshots'
+    __table_args__ = (db.UniqueConstraint('deliverer_id', 'month', name='uq_commission_snapshot_month'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    deliverer_id = db.Column(db.Integer, db.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # premier jour du mois
+    credit = db.Column(db.Float, default=0.0, nullable=False)
+    sunday_bonus = db.Column(db.Float, default=0.0, nullable=False)
+    weekly_bonus = db.Column(db.Float, default=0.0, nullable=False)
+    payout = db.Column(db.Float, default=0.0, nullable=False)  # montants payés (positif)
+    adjustment = db.Column(db.Float, default=0.0, nullable=False)
+    deliveries = db.Column(db.Integer, default=0, nullable=False)
+    deliveries_paid = db.Column(db.Integer, default=0, nullable=False)
+    closing_balance = db.Column(db.Float, default=0.0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DelivererSyncLog(db.Model):
+    """Changements hors ligne déjà traités (`/livreur/api/sync`) : un renvoi n'est pas réappliqué."""
+    __tablename__ = 'deliverer_sync_log'
+    __table_args__ = (db.UniqueConstraint('deliverer_id', 'change_id', name='uq_deliverer_sync_change'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    deliverer_id = db.Column(db.Integer, db.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False)
+    change_id = db.Column(db.String(64), nullable=False)  # identifiant généré par le téléphone
+    kind = db.Column(db.String(20), nullable=False)  # assignment, deliverer_status
+    target_id = db.Column(db.Integer)  # affectation concernée
+    outcome = db.Column(db.String(20), nullable=False)  # applied, rejected, conflict
+    message = db.Column(db.String(255))
+    recorded_at = db.Column(db.DateTime)  # heure du changement sur le téléphone
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
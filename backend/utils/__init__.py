@@ -1,6 +1,18 @@
 # backend/utils/__init__.py
-# Ce fichier peut être vide ou contenir les imports des modules utils
-from .invoice_generator import generate_invoice_pdf
-from .pdf_generator import generate_products_pdf
+# Imports paresseux (PEP 562) : reportlab/qrcode ne sont chargés qu'à la première génération de PDF
+_LAZY_EXPORTS = {
+    'generate_invoice_pdf': 'backend.utils.invoice_generator',
+    'generate_products_pdf': 'backend.utils.pdf_generator',
+}
 
-__all__ = ['generate_invoice_pdf', 'generate_products_pdf']
\ No newline at end of file
+__all__ = ['generate_invoice_pdf', 'generate_products_pdf']
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,246 @@
+"""Journal d'activité (tâches admin) : écriture différée par lots, hors transaction de la requête.
+
+- `record` ne fait qu'ajouter l'entrée à une file mémoire bornée
+  (`ACTIVITY_LOG_QUEUE_SIZE`) : ni flush ni commit dans la session de l'appelant,
+  une erreur d'écriture ne peut plus annuler la transaction en cours ;
+- un fil de fond (greenlet sous eventlet) vide la file par lots
+  (`ACTIVITY_LOG_BATCH_SIZE`, au plus toutes les `ACTIVITY_LOG_FLUSH_INTERVAL` s)
+  en un INSERT multi-lignes sur sa propre connexion ;
+- file pleine ou base indisponible : les entrées sont ajoutées (fsync) au fichier
+  JSONL `ACTIVITY_LOG_SPILL_PATH`, rejoué à la passe suivante qui réussit ;
+- sans fil de fond dans ce processus (TESTING, commande CLI, maître gunicorn
+  avant le fork), chaque entrée est écrite aussitôt.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import click
+from sqlalchemy.exc import DataError, IntegrityError
+
+from backend.utils import workers
+
+_logger = logging.getLogger(__name__)
+
+_config = {}
+_queue = deque()
+_lock = threading.Lock()
+_spill_lock = threading.Lock()
+_replay_lock = threading.Lock()
+_wake = threading.Event()
+_worker_pid = None  # processus où tourne le fil de fond (un fil ne survit pas au fork)
+
+
+def _entry(action, actor=None, extra=None):
+    first = getattr(actor, 'first_name', '') or ''
+    last = getattr(actor, 'last_name', '') or ''
+    return {
+        'action': (action or '')[:255],
+        'actor_id': getattr(actor, 'id', None),
+        'actor_email': getattr(actor, 'email', None),
+        'actor_name': f"{first} {last}".strip() or None,
+        'actor_phone': getattr(actor, 'phone', None),
+        'extra': extra,
+        'created_at': datetime.utcnow(),
+    }
+
+
+def record(action, actor=None, extra=None):
+    """Ajoute une action au journal (file mémoire) ; ne touche pas à la session de la requête."""
+    entry = _entry(action, actor, extra)
+    with _lock:
+        overflow = len(_queue) >= _config.get('queue_size', 1000)
+        if not overflow:
+            _queue.append(entry)
+            wake = len(_queue) >= _config.get('batch_size', 100)
+    if overflow:
+        _spill([entry])
+        return
+    if _worker_pid != os.getpid():
+        flush()
+    elif wake:
+        _wake.set()
+
+
+def pending():
+    """Entrées encore en mémoire."""
+    return len(_queue)
+
+
+def _encode(entry):
+    return json.dumps({**entry, 'created_at': entry['created_at'].isoformat()}, ensure_ascii=False)
+
+
+def _decode(line):
+    entry = json.loads(line)
+    entry['created_at'] = datetime.fromisoformat(entry['created_at'])
+    return entry
+
+
+def _spill(entries):
+    """Ajoute les entrées au fichier de débordement (écriture synchronisée sur disque)."""
+    path = _config.get('spill_path')
+    if not path:
+        _logger.warning("Journal d'activité : %d entrée(s) perdue(s) (pas de fichier de débordement)", len(entries))
+        return
+    lines = []
+    for entry in entries:
+        try:
+            lines.append(_encode(entry) + '\n')
+        except (TypeError, ValueError) as exc:
+            # `extra` non sérialisable : l'entrée est écartée, jamais l'erreur remontée à `record`
+            _logger.error("Journal d'activité : entrée '%s' non sérialisable écartée: %s", entry.get('action'), exc)
+    if not lines:
+        return
+    try:
+        with _spill_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.writelines(lines)
+                handle.flush()
+                os.fsync(handle.fileno())
+    except OSError as exc:
+        _logger.error("Journal d'activité : débordement impossible (%d entrée(s)): %s", len(lines), exc)
+
+
+def _insert(entries):
+    """INSERT multi-lignes sur une connexion dédiée ; ligne refusée par la base : écartée seule."""
+    db = _config['db']
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(_config['table'].insert(), entries)
+    except (IntegrityError, DataError):
+        # Une entrée invalide (acteur supprimé, texte trop long) ne bloque pas tout le lot
+        for entry in entries:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(_config['table'].insert(), [entry])
+            except (IntegrityError, DataError) as exc:
+                _logger.warning("Journal d'activité : entrée '%s' écartée: %s", entry.get('action'), exc)
+
+
+def _replay_spill():
+    """Réinsère le fichier de débordement puis le supprime ; nombre d'entrées rejouées.
+
+    Un seul rejeu à la fois (fil de fond, `flush` d'une requête) : si un autre est en
+    cours, celui-ci est sauté plutôt que de réinsérer les mêmes entrées.
+    """
+    path = _config.get('spill_path')
+    if not path or not (os.path.exists(path) or os.path.exists(path + '.replay')):
+        return 0
+    if not _replay_lock.acquire(blocking=False):
+        return 0
+    try:
+        return _replay_locked(path)
+    finally:
+        _replay_lock.release()
+
+
+def _replay_locked(path):
+    with _spill_lock:
+        replaying = path + '.replay'
+        if not os.path.exists(replaying):
+            os.replace(path, replaying)
+    entries = []
+    with open(replaying, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(_decode(line))
+            except (ValueError, KeyError):
+                _logger.warning("Journal d'activité : ligne de débordement illisible ignorée")
+    batch_size = _config.get('batch_size', 100)
+    for start in range(0, len(entries), batch_size):
+        try:
+            _insert(entries[start:start + batch_size])
+        except Exception:
+            # Ne garder que le reste : les lots déjà écrits ne sont pas rejoués deux fois
+            with open(replaying, 'w', encoding='utf-8') as handle:
+                handle.writelines(_encode(entry) + '\n' for entry in entries[start:])
+            raise
+    os.remove(replaying)
+    return len(entries)
+
+
+def flush():
+    """Écrit la file (et le débordement éventuel) par lots ; nombre d'entrées écrites."""
+    if 'table' not in _config:
+        return 0
+    written = 0
+    batch_size = _config.get('batch_size', 100)
+    while True:
+        with _lock:
+            batch = [_queue.popleft() for _ in range(min(batch_size, len(_queue)))]
+        if not batch:
+            break
+        try:
+            _insert(batch)
+            written += len(batch)
+        except Exception as exc:
+            _logger.warning("Journal d'activité : écriture impossible, %d entrée(s) sur disque: %s", len(batch), exc)
+            _spill(batch)
+            return written
+    try:
+        written += _replay_spill()
+    except Exception as exc:
+        _logger.warning("Journal d'activité : rejeu du débordement impossible: %s", exc)
+    return written
+
+
+def _start_worker(app, interval):
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+
+    def _run():
+        while True:
+            _wake.wait(interval)
+            _wake.clear()
+            try:
+                with app.app_context():
+                    flush()
+            except Exception as exc:
+                _logger.warning("Journal d'activité : passe impossible: %s", exc)
+
+    threading.Thread(target=_run, name='activity-log', daemon=True).start()
+    _worker_pid = os.getpid()
+    atexit.unregister(_drain_on_exit)
+    atexit.register(_drain_on_exit)
+
+
+def _drain_on_exit():
+    app = _config.get('app')
+    if app is None or not _queue:
+        return
+    try:
+        with app.app_context():
+            flush()
+    except Exception:
+        with _lock:
+            remaining = list(_queue)
+            _queue.clear()
+        _spill(remaining)
+
+
+def init_activity_log(app, db, model, spill_path=None):
+    """Installe l'écriture différée du journal `model` et la commande `flask flush-activity`."""
+    _config.update(
+        app=app, db=db, table=model.__table__, spill_path=spill_path,
+        queue_size=int(app.config.get('ACTIVITY_LOG_QUEUE_SIZE', 1000)),
+        batch_size=max(int(app.config.get('ACTIVITY_LOG_BATCH_SIZE', 100)), 1),
+    )
+
+    @app.cli.command('flush-activity')
+    def flush_activity_command():
+        """Écrit les entrées en attente et rejoue le fichier de débordement."""
+        click.echo(f"✅ {flush()} entrée(s) du journal d'activité écrite(s)")
+
+    interval = float(app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2) or 0)
+    if interval > 0 and not app.config.get('TESTING'):
+        workers.register('activity-log', lambda: _start_worker(app, interval))
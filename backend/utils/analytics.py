@@ -0,0 +1,495 @@
+"""Cumuls journaliers des ventes et livraisons reconnues, séries pour les graphiques admin.
+
+- `sales_daily` (jour × catégorie × produit, plus une ligne de sous-total par
+  catégorie), `sales_daily_totals` (jour), `deliveries_daily` (jour × livreur) et
+  `demand_zones_daily` (jour × géohash de l'adresse × heure de la semaine) ;
+- une commande entre dans les cumuls quand son CA est reconnu (livrée depuis
+  `REVENUE_DELAY`, cf. `stats.revenue_cutoff`), au jour de `delivered_at` (UTC) ;
+- avancement incrémental : seuls les jours couverts par la nouvelle fenêtre
+  (`rolled_until`, nouveau seuil] sont recalculés (index sur `orders.delivered_at`) ;
+- une commande déjà cumulée qui change (annulation, montant, date, suppression),
+  ou dont l'affectation change de statut ou de livreur, fait recalculer son jour
+  dans la même transaction (`after_flush`) ;
+- écritures en masse (jeu de données, update/delete ORM) : `stale`, reconstruction
+  complète à la passe suivante ; les `ANALYTICS_REBUILD_DAYS` derniers jours sont
+  recalculés périodiquement, `flask rebuild-rollups` reconstruit tout.
+
+Les séries (`sales_series`, `top_sales`, `deliveries_series`, `demand_zones`) ne lisent que les
+tables de cumul : quelques centaines de lignes quelle que soit la taille de `orders`.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import and_, event, func, inspect as sa_inspect, literal, null, select
+from sqlalchemy.orm import Session
+
+from backend.utils import workers
+from backend.utils.geo import geohash_bounds, geohash_encode, valid_point
+from backend.utils.stats import UNKNOWN, old_value, revenue_cutoff
+
+_logger = logging.getLogger(__name__)
+
+STATE_ID = 1
+INTERVALS = ('day', 'week', 'month')
+ZONE_PRECISION = 6
+ZONE_MIN_PRECISION = 4
+
+_config = {}
+_listeners_installed = False
+
+
+def _tables():
+    return _config['tables']
+
+
+def _window(order, start_day, end_day, until):
+    lo = datetime.combine(start_day, datetime.min.time())
+    hi = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+    return and_(order.status == 'delivered', order.delivered_at >= lo,
+                order.delivered_at < hi, order.delivered_at <= until)
+
+
+def _rebuild(conn, start_day, end_day, until):
+    """Remplace les cumuls des jours [start_day, end_day] (livraisons jusqu'à `until`)."""
+    t = _tables()
+    order, item, product, assignment = t['order'], t['order_item'], t['product'], t['assignment']
+    sales, totals, deliveries = t['sales'], t['totals'], t['deliveries']
+    window = _window(order.c, start_day, end_day, until)
+    day = func.date(order.c.delivered_at)
+
+    for table in (sales, totals, deliveries, t['zones']):
+        conn.execute(table.delete().where(table.c.day >= start_day, table.c.day <= end_day))
+
+    lines = item.join(order, order.c.id == item.c.order_id).outerjoin(product, product.c.id == item.c.product_id)
+    measures = (func.sum(item.c.price * item.c.quantity), func.sum(item.c.quantity),
+                func.count(func.distinct(order.c.id)))
+    columns = ['day', 'category_id', 'product_id', 'revenue', 'units', 'orders']
+    conn.execute(sales.insert().from_select(columns, select(
+        day, product.c.category_id, item.c.product_id, *measures
+    ).select_from(lines).where(window).group_by(day, product.c.category_id, item.c.product_id)))
+    # Sous-totaux catégorie : commandes distinctes exactes (une commande à deux produits compte une fois)
+    conn.execute(sales.insert().from_select(columns, select(
+        day, product.c.category_id, null(), *measures
+    ).select_from(lines).where(window).group_by(day, product.c.category_id)))
+
+    conn.execute(totals.insert().from_select(['day', 'revenue', 'units', 'orders'], select(
+        day, func.sum(order.c.total_amount), literal(0), func.count(order.c.id)
+    ).where(window).group_by(day)))
+    units = (select(func.coalesce(func.sum(sales.c.units), 0))
+             .where(sales.c.day == totals.c.day, sales.c.product_id.is_(None))
+             .scalar_subquery())
+    conn.execute(totals.update().where(totals.c.day >= start_day, totals.c.day <= end_day).values(units=units))
+
+    conn.execute(deliveries.insert().from_select(['day', 'deliverer_id', 'deliveries', 'revenue'], select(
+        day, assignment.c.deliverer_id, func.count(func.distinct(order.c.id)), func.sum(order.c.total_amount)
+    ).select_from(
+        order.join(assignment, and_(assignment.c.order_id == order.c.id, assignment.c.status == 'delivered'))
+    ).where(window).group_by(day, assignment.c.deliverer_id)))
+
+    _rebuild_zones(conn, window)
+
+
+def _rebuild_zones(conn, window):
+    """Regroupe les livraisons géolocalisées de la fenêtre par (jour, géohash, heure de la semaine)."""
+    t = _tables()
+    order = t['order'].c
+    rows = conn.execute(
+        select(order.delivered_at, order.created_at, order.total_amount,
+               order.shipping_latitude, order.shipping_longitude)
+        .where(window, order.shipping_latitude.isnot(None), order.shipping_longitude.isnot(None))
+    )
+    cells = {}
+    for delivered_at, created_at, total, lat, lon in rows:
+        point = valid_point(lat, lon)
+        if point is None:
+            continue
+        placed = created_at or delivered_at
+        key = (delivered_at.date(), geohash_encode(point[0], point[1], ZONE_PRECISION),
+               placed.weekday() * 24 + placed.hour)
+        cell = cells.setdefault(key, [0, 0.0, 0.0, 0])
+        cell[0] += 1
+        cell[1] += float(total or 0)
+        if created_at is not None and delivered_at >= created_at:
+            cell[2] += (delivered_at - created_at).total_seconds()
+            cell[3] += 1
+    if cells:
+        conn.execute(t['zones'].insert(), [
+            {'day': day, 'geohash': code, 'hour_of_week': hour, 'orders': values[0],
+             'revenue': round(values[1], 2), 'delivery_seconds': values[2], 'timed_orders': values[3]}
+            for (day, code, hour), values in cells.items()
+        ])
+
+
+def _rebuild_all(conn, until):
+    t = _tables()
+    order = t['order']
+    for table in (t['sales'], t['totals'], t['deliveries'], t['zones']):
+        conn.execute(table.delete())
+    first = conn.execute(select(func.min(order.c.delivered_at)).where(
+        order.c.status == 'delivered', order.c.delivered_at <= until)).scalar()
+    if first is not None:
+        _rebuild(conn, first.date(), until.date(), until)
+
+
+def _write_state(conn, until, since=None, rebuilt=False):
+    """Avance `rolled_until` ; False si une autre passe l'a déjà déplacé depuis `since`."""
+    state = _tables()['state']
+    now = datetime.utcnow()
+    values = {'rolled_until': until, 'updated_at': now}
+    if rebuilt:
+        values.update(stale=False, rebuilt_at=now)
+    exists = conn.execute(select(state.c.id).where(state.c.id == STATE_ID)).first()
+    if exists is None:
+        conn.execute(state.insert().values(id=STATE_ID, **values))
+        return True
+    query = state.update().where(state.c.id == STATE_ID)
+    if since is not None:
+        query = query.where(state.c.rolled_until == since, state.c.stale.is_(False))
+    return conn.execute(query.values(**values)).rowcount > 0
+
+
+def rebuild(db, now=None, days=None):
+    """Reconstruit tous les cumuls (ou les `days` derniers jours) jusqu'au seuil courant."""
+    until = revenue_cutoff(now)
+    with db.engine.begin() as conn:
+        if days:
+            state = _tables()['state']
+            row = conn.execute(select(state.c.rolled_until, state.c.stale).where(state.c.id == STATE_ID)).first()
+            if row is not None and not row.stale and row.rolled_until is not None:
+                # Remonte au dernier seuil si la passe périodique a pris du retard
+                start_day = min(until.date() - timedelta(days=days - 1), row.rolled_until.date())
+                _rebuild(conn, start_day, until.date(), until)
+                _write_state(conn, until)
+                return until
+        _rebuild_all(conn, until)
+        _write_state(conn, until, rebuilt=True)
+    return until
+
+
+def advance(db, now=None):
+    """Cumule les livraisons passées sous le seuil depuis la dernière passe."""
+    state = _tables()['state']
+    until = revenue_cutoff(now)
+    with db.engine.begin() as conn:
+        row = conn.execute(select(state.c.rolled_until, state.c.stale).where(state.c.id == STATE_ID)).first()
+        if row is None or row.stale or row.rolled_until is None:
+            _rebuild_all(conn, until)
+            _write_state(conn, until, rebuilt=True)
+            return until
+        since = row.rolled_until
+        if until <= since:
+            return since
+        # La mise à jour conditionnelle réserve la fenêtre (verrou de ligne) avant le recalcul
+        if not _write_state(conn, until, since=since):
+            return None
+        _rebuild(conn, since.date(), until.date(), until)
+    return until
+
+
+def rolled_until(db):
+    state = _tables()['state']
+    return db.session.execute(select(state.c.rolled_until).where(state.c.id == STATE_ID)).scalar()
+
+
+# --- Hooks ORM -------------------------------------------------------------
+
+def _watermark(session_):
+    if 'rollup_until' not in session_.info:
+        state = _tables()['state']
+        row = session_.connection().execute(
+            select(state.c.rolled_until, state.c.stale).where(state.c.id == STATE_ID)
+        ).first()
+        # Cumuls absents ou déjà à reconstruire : rien à corriger ici
+        session_.info['rollup_until'] = row.rolled_until if row is not None and not row.stale else None
+    return session_.info['rollup_until']
+
+
+def _mark_stale(session_):
+    state = _tables()['state']
+    session_.connection().execute(state.update().where(state.c.id == STATE_ID).values(stale=True))
+
+
+def _assignment_orders(session_):
+    """Commandes dont une affectation est créée, supprimée ou change de statut / livreur / commande."""
+    assignment_model = _config.get('assignment_model')
+    order_ids = set()
+    for obj in list(session_.new) + list(session_.deleted) + list(session_.dirty):
+        if not isinstance(obj, assignment_model):
+            continue
+        state = sa_inspect(obj)
+        if obj in session_.dirty and not any(state.attrs[a].history.has_changes()
+                                             for a in ('status', 'deliverer_id', 'order_id')):
+            continue
+        order_ids.add(obj.order_id)
+        order_ids.update(state.attrs['order_id'].history.deleted or ())
+    order_ids.discard(None)
+    return order_ids
+
+
+def _after_flush(session_, flush_context):
+    order_model = _config.get('order_model')
+    if order_model is None:
+        return
+    attrs = ('status', 'delivered_at')
+    moments = []
+    unknown = False
+
+    for obj in session_.new:
+        if isinstance(obj, order_model) and obj.status == 'delivered':
+            moments.append(obj.delivered_at)
+    for obj in list(session_.deleted) + list(session_.dirty):
+        if not isinstance(obj, order_model):
+            continue
+        state = sa_inspect(obj)
+        deleted = obj in session_.deleted
+        if not deleted and not any(state.attrs[a].history.has_changes()
+                                   for a in attrs + ('total_amount', 'shipping_latitude', 'shipping_longitude')):
+            continue
+        old = {attr: old_value(state, attr) for attr in attrs}
+        if UNKNOWN in old.values():
+            unknown = True
+        elif old['status'] == 'delivered':
+            moments.append(old['delivered_at'])
+        if not deleted and obj.status == 'delivered':
+            moments.append(obj.delivered_at)
+
+    order_ids = _assignment_orders(session_)
+    if order_ids:
+        # Livreur ou statut d'affectation modifié : `deliveries_daily` du jour de livraison à refaire
+        order = _tables()['order'].c
+        moments += session_.connection().execute(
+            select(order.delivered_at).where(order.id.in_(order_ids), order.status == 'delivered')
+        ).scalars().all()
+
+    moments = [m for m in moments if m is not None]
+    if not moments and not unknown:
+        return
+    until = _watermark(session_)
+    if until is None:
+        return
+    if unknown:
+        _mark_stale(session_)
+        return
+    conn = session_.connection()
+    for day in sorted({m.date() for m in moments if m <= until}):
+        _rebuild(conn, day, day, until)
+
+
+def _do_orm_execute(orm_state):
+    watched = _config.get('watched')
+    if not watched or not (orm_state.is_insert or orm_state.is_update or orm_state.is_delete):
+        return
+    target = getattr(orm_state.statement, 'table', None)
+    if target is not None and target.name in watched:
+        _mark_stale(orm_state.session)
+
+
+def _reset(session_):
+    session_.info.pop('rollup_until', None)
+
+
+# --- Lecture -------------------------------------------------------------------
+
+def parse_range(start=None, end=None, default_days=30, today=None):
+    """Bornes (date, date) depuis 'AAAA-MM-JJ' ; ValueError si invalides."""
+    end_day = date.fromisoformat(end) if end else (today or datetime.utcnow().date())
+    start_day = date.fromisoformat(start) if start else end_day - timedelta(days=default_days - 1)
+    if start_day > end_day:
+        raise ValueError("Début après la fin")
+    return start_day, end_day
+
+
+def _period(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _periods(start_day, end_day, interval):
+    periods = []
+    current = _period(start_day, interval)
+    while current <= end_day:
+        periods.append(current)
+        if interval == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if interval == 'week' else 1)
+    return periods
+
+
+def _bucket(rows, start_day, end_day, interval, fields):
+    """Lignes (jour, *mesures) regroupées par période, périodes vides à zéro."""
+    if interval not in INTERVALS:
+        raise ValueError("Intervalle inconnu")
+    buckets = {p: dict.fromkeys(fields, 0) for p in _periods(start_day, end_day, interval)}
+    for row in rows:
+        values = buckets[_period(row[0], interval)]
+        for field, value in zip(fields, row[1:]):
+            values[field] += value or 0
+    series = []
+    for period, values in buckets.items():
+        point = {'period': period.isoformat(), **values}
+        if 'revenue' in point:
+            point['revenue'] = round(float(point['revenue']), 2)
+        series.append(point)
+    return series
+
+
+def sales_series(db, start_day, end_day, interval='day', category_id=None, product_id=None):
+    """CA, commandes, unités et panier moyen par période (tous produits, une catégorie ou un produit)."""
+    t = _tables()
+    if product_id is None and category_id is None:
+        table = t['totals']
+        query = select(table.c.day, table.c.revenue, table.c.orders, table.c.units)
+    else:
+        table = t['sales']
+        query = select(table.c.day, func.sum(table.c.revenue), func.sum(table.c.orders), func.sum(table.c.units))
+        if product_id is not None:
+            query = query.where(table.c.product_id == product_id)
+        else:
+            query = query.where(table.c.category_id == category_id, table.c.product_id.is_(None))
+        query = query.group_by(table.c.day)
+    rows = db.session.execute(
+        query.where(table.c.day >= start_day, table.c.day <= end_day).order_by(table.c.day)
+    ).all()
+    series = _bucket(rows, start_day, end_day, interval, ('revenue', 'orders', 'units'))
+    for point in series:
+        point['average_basket'] = round(point['revenue'] / point['orders'], 2) if point['orders'] else 0.0
+    return series
+
+
+def top_sales(db, start_day, end_day, by='product', limit=10):
+    """Classement par CA des produits ou catégories sur la période."""
+    sales = _tables()['sales']
+    key = sales.c.product_id if by == 'product' else sales.c.category_id
+    level = sales.c.product_id.isnot(None) if by == 'product' else sales.c.product_id.is_(None)
+    revenue = func.sum(sales.c.revenue)
+    rows = db.session.execute(
+        select(key, revenue, func.sum(sales.c.units), func.sum(sales.c.orders))
+        .where(sales.c.day >= start_day, sales.c.day <= end_day, level)
+        .group_by(key).order_by(revenue.desc()).limit(limit)
+    ).all()
+    return [{'id': row[0], 'revenue': round(float(row[1] or 0), 2), 'units': int(row[2] or 0),
+             'orders': int(row[3] or 0)} for row in rows]
+
+
+def deliveries_series(db, start_day, end_day, interval='day', deliverer_id=None):
+    """Livraisons et CA livré par période : {livreur: série}."""
+    deliveries = _tables()['deliveries']
+    query = (select(deliveries.c.deliverer_id, deliveries.c.day, deliveries.c.deliveries, deliveries.c.revenue)
+             .where(deliveries.c.day >= start_day, deliveries.c.day <= end_day))
+    if deliverer_id is not None:
+        query = query.where(deliveries.c.deliverer_id == deliverer_id)
+    by_deliverer = {}
+    for row in db.session.execute(query.order_by(deliveries.c.day)).all():
+        by_deliverer.setdefault(row[0], []).append(row[1:])
+    if deliverer_id is not None:
+        by_deliverer.setdefault(deliverer_id, [])
+    return {key: _bucket(rows, start_day, end_day, interval, ('deliveries', 'revenue'))
+            for key, rows in by_deliverer.items()}
+
+
+def demand_zones(db, start_day, end_day, precision=5, hours=None):
+    """Demande livrée par zone (préfixe de géohash de `precision` caractères) sur la période.
+
+    `precision` : de `ZONE_MIN_PRECISION` (≈ 39 km × 20 km) à `ZONE_PRECISION` (≈ 1,2 km × 0,6 km).
+    `hours` : heures de la semaine retenues (0 = lundi 0h). Chaque zone porte sa
+    cellule (sud, ouest, nord, est), ses totaux et la répartition par heure.
+    """
+    if not ZONE_MIN_PRECISION <= precision <= ZONE_PRECISION:
+        raise ValueError("Précision invalide")
+    zones = _tables()['zones']
+    prefix = func.substr(zones.c.geohash, 1, precision)
+    query = (select(prefix, zones.c.hour_of_week, func.sum(zones.c.orders), func.sum(zones.c.revenue),
+                    func.sum(zones.c.delivery_seconds), func.sum(zones.c.timed_orders))
+             .where(zones.c.day >= start_day, zones.c.day <= end_day))
+    if hours is not None:
+        query = query.where(zones.c.hour_of_week.in_(list(hours)))
+    by_zone = {}
+    for code, hour, orders, revenue, seconds, timed in db.session.execute(query.group_by(prefix, zones.c.hour_of_week)):
+        zone = by_zone.setdefault(code, {'orders': 0, 'revenue': 0.0, 'seconds': 0.0, 'timed': 0, 'hours': []})
+        zone['orders'] += int(orders or 0)
+        zone['revenue'] += float(revenue or 0)
+        zone['seconds'] += float(seconds or 0)
+        zone['timed'] += int(timed or 0)
+        zone['hours'].append([hour, int(orders or 0)])
+    result = []
+    for code, zone in sorted(by_zone.items(), key=lambda item: -item[1]['orders']):
+        result.append({
+            'geohash': code,
+            'bounds': [round(value, 5) for value in geohash_bounds(code)],
+            'orders': zone['orders'],
+            'revenue': round(zone['revenue'], 2),
+            'avg_delivery_minutes': round(zone['seconds'] / zone['timed'] / 60, 1) if zone['timed'] else None,
+            'hours': sorted(zone['hours']),
+        })
+    return result
+
+
+# --- Installation --------------------------------------------------------------
+
+def _start_worker(app, db, interval, rebuild_interval, rebuild_days):
+    def _run():
+        last_rebuild = time.monotonic()
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    if rebuild_days and time.monotonic() - last_rebuild >= rebuild_interval:
+                        rebuild(db, days=rebuild_days)
+                        last_rebuild = time.monotonic()
+                    else:
+                        advance(db)
+            except Exception as exc:
+                _logger.warning("Mise à jour des cumuls de ventes impossible: %s", exc)
+
+    threading.Thread(target=_run, name='sales-rollups', daemon=True).start()
+
+
+def init_analytics(app, db, state_model, sales_model, totals_model, deliveries_model, zones_model,
+                   order_model, order_item_model, product_model, assignment_model):
+    """Installe les cumuls journaliers (hooks ORM, passe périodique, `flask rebuild-rollups`).
+
+    À appeler après `stats.init_stats` (anciennes valeurs des commandes chargées avant affectation).
+    """
+    global _listeners_installed
+    _config['order_model'] = order_model
+    _config['assignment_model'] = assignment_model
+    _config['tables'] = {
+        'state': state_model.__table__,
+        'sales': sales_model.__table__,
+        'totals': totals_model.__table__,
+        'deliveries': deliveries_model.__table__,
+        'zones': zones_model.__table__,
+        'order': order_model.__table__,
+        'order_item': order_item_model.__table__,
+        'product': product_model.__table__,
+        'assignment': assignment_model.__table__,
+    }
+    _config['watched'] = {m.__tablename__ for m in (order_model, order_item_model, assignment_model)}
+    if not _listeners_installed:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _reset)
+        event.listen(Session, 'after_rollback', _reset)
+        _listeners_installed = True
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--days', type=int, default=None, help='Seulement les N derniers jours.')
+    def rebuild_rollups_command(days):
+        """Reconstruit les cumuls journaliers des ventes et livraisons."""
+        started = time.perf_counter()
+        until = rebuild(db, days=days)
+        click.echo(f"✅ Cumuls reconstruits jusqu'au {until:%Y-%m-%d %H:%M} ({time.perf_counter() - started:.1f}s)")
+
+    interval = int(app.config.get('ANALYTICS_ROLLUP_INTERVAL', 60) or 0)
+    if interval > 0 and not app.config.get('TESTING'):
+        rebuild_interval = int(app.config.get('ANALYTICS_REBUILD_INTERVAL', 3600))
+        rebuild_days = int(app.config.get('ANALYTICS_REBUILD_DAYS', 7) or 0)
+        workers.register('sales-rollups',
+                         lambda: _start_worker(app, db, interval, rebuild_interval, rebuild_days))
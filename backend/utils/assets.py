@@ -0,0 +1,195 @@
+"""URLs statiques empreintées (hash du contenu) servies avec un cache navigateur immuable.
+
+`url_for('static', filename='js/cart.js')` (et donc `media_url`) produit
+`/static/js/cart.<hash>.js`. La vue statique retire l'empreinte, sert le fichier
+(variantes pré-compressées comprises) et, si l'empreinte correspond au contenu
+actuel, répond `Cache-Control: public, max-age=31536000, immutable` : une page
+revisitée ne refait aucune requête pour ses ressources.
+
+Le manifeste (chemin -> empreinte) est incrémental : une entrée n'est recalculée
+que si la taille ou le mtime du fichier ont changé, vérifiés au plus toutes les
+`ASSET_MANIFEST_CHECK_INTERVAL` secondes par fichier.
+
+Les uploads (`uploads/`) et les fichiers de plus de `ASSET_HASH_MAX_SIZE` octets
+(vidéos…) ne sont jamais lus : leur empreinte dérive du mtime et de la taille, et
+le préchauffage ne parcourt pas `uploads/`. Le préchauffage hache les ressources
+du thème dans un thread natif (`eventlet.tpool`), hors de la boucle eventlet.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from flask import current_app
+from werkzeug.security import safe_join
+
+from backend.utils.compression import run_native, send_static_file, PRECOMPRESS_EXTENSIONS
+from backend.utils.media import is_protected
+
+_logger = logging.getLogger(__name__)
+
+IMMUTABLE_MAX_AGE = 31536000
+HASH_LENGTH = 12
+_FINGERPRINT_RE = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+# Variantes générées par la pré-compression : jamais référencées directement
+_SKIP_SUFFIXES = tuple(ext + suffix for ext in PRECOMPRESS_EXTENSIONS for suffix in ('.gz', '.br'))
+# Fichiers empreintés par mtime/taille (jamais lus pour calculer l'empreinte)
+STAT_ONLY_PREFIX = 'uploads/'
+
+
+def _file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def _stat_hash(stat):
+    raw = f"{stat.st_mtime_ns}:{stat.st_size}".encode('ascii')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(filename, digest):
+    """'js/cart.js' + 'abc…' -> 'js/cart.abc….js' (fichier sans extension : suffixe simple)."""
+    head, tail = os.path.split(filename)
+    stem, ext = os.path.splitext(tail)
+    if not ext or not stem:
+        return None
+    return f"{head}/{stem}.{digest}{ext}" if head else f"{stem}.{digest}{ext}"
+
+
+def split_fingerprint(filename):
+    """'js/cart.abc….js' -> ('js/cart.js', 'abc…') ; (filename, None) si non empreinté."""
+    head, tail = os.path.split(filename)
+    match = _FINGERPRINT_RE.match(tail)
+    if not match:
+        return filename, None
+    original = match.group('stem') + match.group('ext')
+    return (f"{head}/{original}" if head else original), match.group('hash')
+
+
+class AssetManifest:
+    """Manifeste chemin relatif -> empreinte, recalculé fichier par fichier sur changement."""
+
+    def __init__(self, folder, check_interval=5, hash_max_size=1024 * 1024):
+        self.folder = folder
+        self.check_interval = check_interval
+        self.hash_max_size = hash_max_size
+        self._entries = {}  # chemin relatif -> (mtime, taille, empreinte, vérifié_le)
+        self._lock = threading.Lock()
+
+    def digest(self, filename):
+        """Empreinte actuelle de `filename`, ou None si absent/illisible."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry and now - entry[3] < self.check_interval:
+            return entry[2]
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(filename, None)
+            return None
+        if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            digest = entry[2]
+        elif filename.startswith(STAT_ONLY_PREFIX) or stat.st_size > self.hash_max_size:
+            digest = _stat_hash(stat)
+        else:
+            try:
+                digest = _file_hash(path)
+            except OSError:
+                return None
+        with self._lock:
+            self._entries[filename] = (stat.st_mtime, stat.st_size, digest, now)
+        return digest
+
+    def build(self):
+        """Parcourt le dossier hors `uploads/` (préchauffage) ; seuls les fichiers modifiés sont re-hashés."""
+        count = 0
+        uploads = os.path.join(self.folder, STAT_ONLY_PREFIX.rstrip('/'))
+        for root, dirs, files in os.walk(self.folder):
+            if root == self.folder:
+                dirs[:] = [d for d in dirs if os.path.join(root, d) != uploads]
+            for name in files:
+                if name.startswith('.') or name.endswith(_SKIP_SUFFIXES):
+                    continue
+                rel = os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/')
+                if self.digest(rel):
+                    count += 1
+        return count
+
+    def as_dict(self):
+        with self._lock:
+            return {name: entry[2] for name, entry in self._entries.items()}
+
+
+def _asset_url_defaults(endpoint, values):
+    if endpoint != 'static':
+        return
+    filename = values.get('filename')
+    manifest = current_app.extensions.get('asset_manifest')
+    if not filename or manifest is None or filename.endswith(_SKIP_SUFFIXES):
+        return
+    filename = str(filename).lstrip('/')
+    if split_fingerprint(filename)[1]:
+        return
+    digest = manifest.digest(filename)
+    if digest:
+        values['filename'] = fingerprinted_name(filename, digest) or filename
+
+
+def _static_view(filename):
+    app = current_app
+    original, requested = split_fingerprint(filename)
+    if requested is None:
+        return send_static_file(app.static_folder, filename, max_age=app.get_send_file_max_age(filename))
+    current = app.extensions['asset_manifest'].digest(original)
+    if current is None:
+        # Un vrai fichier dont le nom ressemble à une empreinte
+        return send_static_file(app.static_folder, filename, max_age=app.get_send_file_max_age(filename))
+    if current != requested:
+        # Ancienne empreinte (page en cache) : contenu actuel, sans cache immuable
+        return send_static_file(app.static_folder, original, max_age=app.get_send_file_max_age(original))
+    response = send_static_file(app.static_folder, original, max_age=IMMUTABLE_MAX_AGE)
+    if response.status_code not in (200, 206, 304):
+        return response
+    if is_protected(original):
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
+
+def init_assets(app):
+    """Active les URLs statiques empreintées (à appeler après `init_compression`)."""
+    if not app.config.get('ASSET_FINGERPRINT_ENABLED', True) or not app.static_folder:
+        return None
+    manifest = AssetManifest(
+        app.static_folder,
+        check_interval=float(app.config.get('ASSET_MANIFEST_CHECK_INTERVAL', 5)),
+        hash_max_size=int(app.config.get('ASSET_HASH_MAX_SIZE', 1024 * 1024)),
+    )
+    app.extensions['asset_manifest'] = manifest
+    app.url_defaults(_asset_url_defaults)
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = _static_view
+
+    def _warm():
+        try:
+            count = run_native(manifest.build)
+            _logger.info("Manifeste des ressources statiques: %s fichier(s)", count)
+        except Exception as exc:
+            _logger.warning("Construction du manifeste statique échouée: %s", exc)
+
+    threading.Thread(target=_warm, name='asset-manifest', daemon=True).start()
+    return manifest
@@ -0,0 +1,193 @@
+"""Service panier : chargement en une requête, totaux en une passe, aucune écriture en lecture.
+
+- `load_cart` : panier client + lignes + produits en une seule requête jointe
+  (plus de `item.product` chargé paresseusement ligne par ligne) ;
+- `guest_cart_lines` : panier invité (session) résolu en une requête `IN` ;
+- `summarize` : sous-total, nombre d'articles, frais de livraison
+  (`shipping_cost` / `shipping_cost_out`) et alertes de stock en un seul parcours ;
+- `CartError` : refus métier partagé par les vues HTML et l'API JSON ;
+- `refresh_totals` : recalcul SQL de `Cart.item_count` / `Cart.subtotal`, appelé par
+  les chemins d'écriture (ajout, mise à jour, suppression, fusion) et quand l'admin
+  change le prix d'un produit ; le badge panier lit ensuite une seule colonne.
+"""
+from types import SimpleNamespace
+
+from flask import g
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager
+
+from backend.models import db, Cart, CartItem, Product
+
+
+class CartError(Exception):
+    """Refus métier (stock, produit indisponible, champs manquants…).
+
+    `code` est stable pour l'API JSON, `message` est affiché tel quel à l'utilisateur.
+    """
+
+    def __init__(self, code, message, status=400, level='error', back_to_cart=False):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+        self.level = level
+        self.back_to_cart = back_to_cart
+
+
+def load_cart(user_id):
+    """Panier du client avec lignes et produits (une requête) ; None s'il n'existe pas."""
+    carts = (
+        Cart.query
+        .outerjoin(Cart.items)
+        .outerjoin(CartItem.product)
+        .options(contains_eager(Cart.items).contains_eager(CartItem.product))
+        .filter(Cart.user_id == user_id)
+        .order_by(Cart.id, CartItem.id)
+        .populate_existing()
+        .all()
+    )
+    return carts[0] if carts else None
+
+
+def get_or_create_cart(user_id):
+    """Panier du client, créé (flush, sans commit) si absent — chemins d'écriture uniquement."""
+    cart = Cart.query.filter_by(user_id=user_id).first()
+    if cart is None:
+        cart = Cart(user_id=user_id, item_count=0, subtotal=0.0)
+        db.session.add(cart)
+        db.session.flush()
+    return cart
+
+
+def get_item_or_404(item_id):
+    """Ligne de panier avec son panier et son produit (une requête)."""
+    return (
+        CartItem.query
+        .join(CartItem.cart)
+        .outerjoin(CartItem.product)
+        .options(contains_eager(CartItem.cart), contains_eager(CartItem.product))
+        .filter(CartItem.id == item_id)
+        .first_or_404()
+    )
+
+
+def guest_cart_lines(entries):
+    """Lignes d'affichage du panier invité `[{product_id, quantity}]` (une requête).
+
+    Les produits introuvables sont omis ; les quantités ne sont pas modifiées ici :
+    `summarize` signale les écarts et `clean_guest_entries` corrige le panier à
+    chaque écriture (ajout, mise à jour, retrait, checkout).
+    """
+    if not entries:
+        return []
+    ids = {entry['product_id'] for entry in entries}
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()}
+    lines = []
+    for entry in entries:
+        product = products.get(entry['product_id'])
+        if product is not None:
+            lines.append(SimpleNamespace(id=product.id, product=product, quantity=entry['quantity']))
+    return lines
+
+
+def clean_guest_entries(entries, lines):
+    """Panier invité sans produits inactifs/supprimés, quantités bornées au stock."""
+    by_id = {line.product.id: line.product for line in lines}
+    cleaned = []
+    for entry in entries:
+        product = by_id.get(entry['product_id'])
+        if product is None or not product.is_active:
+            continue
+        qty = min(entry['quantity'], max(product.quantity or 0, 0))
+        if qty > 0:
+            cleaned.append({'product_id': product.id, 'quantity': qty})
+    return cleaned
+
+
+def summarize(lines, settings=None):
+    """Totaux et alertes en un parcours.
+
+    Retourne un objet avec `items` (lignes disponibles), `subtotal`, `item_count`,
+    `shipping`, `shipping_out` et `warnings` [(niveau, message)]. Les lignes dont le
+    produit est inactif sont exclues des totaux ; une quantité supérieure au stock
+    est comptée telle quelle mais signalée (le contrôle bloquant reste au checkout).
+    """
+    items = []
+    warnings = []
+    subtotal = 0.0
+    item_count = 0
+    for line in lines:
+        product = line.product
+        if product is None or not product.is_active:
+            warnings.append(('warning', f"{getattr(product, 'name', 'Un article')} n'est plus disponible."))
+            continue
+        stock = max(product.quantity or 0, 0)
+        if stock <= 0:
+            warnings.append(('warning', f"{product.name} est en rupture de stock."))
+            continue
+        if line.quantity > stock:
+            warnings.append(('error', f"Stock insuffisant pour {product.name} ({stock} disponible(s))."))
+        items.append(line)
+        item_count += line.quantity
+        try:
+            subtotal += float(product.price) * line.quantity
+        except (TypeError, ValueError):
+            pass
+    shipping = float(getattr(settings, 'shipping_cost', 0) or 0)
+    shipping_out = float(getattr(settings, 'shipping_cost_out', 0) or 0) or shipping
+    return SimpleNamespace(
+        items=items,
+        subtotal=subtotal,
+        item_count=item_count,
+        shipping=shipping,
+        shipping_out=shipping_out,
+        warnings=warnings,
+    )
+
+
+def refresh_totals(cart_ids):
+    """Recalcule `item_count` / `subtotal` des paniers donnés (UPDATE ensembliste, sans commit)."""
+    if isinstance(cart_ids, int):
+        cart_ids = [cart_ids]
+    cart_ids = [cid for cid in cart_ids if cid is not None]
+    if not cart_ids:
+        return
+    db.session.flush()
+    count_q = (select(func.coalesce(func.sum(CartItem.quantity), 0))
+               .where(CartItem.cart_id == Cart.id)
+               .scalar_subquery())
+    subtotal_q = (select(func.coalesce(func.sum(CartItem.quantity * Product.price), 0))
+                  .join(Product, Product.id == CartItem.product_id)
+                  .where(CartItem.cart_id == Cart.id)
+                  .scalar_subquery())
+    db.session.execute(
+        Cart.__table__.update()
+        .where(Cart.id.in_(cart_ids))
+        .values(item_count=count_q, subtotal=subtotal_q)
+    )
+
+
+def cart_ids_for_products(product_ids):
+    """Paniers contenant l'un des produits (à rafraîchir avant de supprimer ces lignes)."""
+    if not product_ids:
+        return []
+    rows = db.session.execute(
+        select(CartItem.cart_id).where(CartItem.product_id.in_(product_ids)).distinct()
+    )
+    return [row[0] for row in rows]
+
+
+def item_count(user_id):
+    """Nombre d'articles du panier client (colonne dénormalisée, mémorisé pour la requête)."""
+    cache = g.setdefault('_cart_item_count', {})
+    if user_id not in cache:
+        value = db.session.execute(
+            select(Cart.item_count).where(Cart.user_id == user_id).order_by(Cart.id).limit(1)
+        ).scalar()
+        cache[user_id] = int(value or 0)
+    return cache[user_id]
+
+
+def forget_item_count():
+    """À appeler après une écriture du panier dans la requête courante."""
+    g.pop('_cart_item_count', None)
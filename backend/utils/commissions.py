@@ -0,0 +1,53 @@
+"""Calculs de commissions livreurs (fonctions pures, sans accès base)."""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+def week_bounds(ref_dt=None):
+    """Retourne le début et la fin (UTC) de la semaine courante (lundi -> lundi)."""
+    ref_dt = ref_dt or datetime.utcnow()
+    start = datetime(ref_dt.year, ref_dt.month, ref_dt.day) - timedelta(days=ref_dt.weekday())
+    end = start + timedelta(days=7)
+    return start, end
+
+
+def commission_for_amount(total_amount: float) -> float:
+    """Calcule la commission de base selon le montant de commande."""
+    try:
+        total = float(total_amount or 0)
+    except Exception:
+        total = 0.0
+    if total <= 25:
+        return 3.0
+    if total < 80:
+        return 4.0
+    return 4.0 + (0.02 * total)
+
+
+def assignment_commission(a):
+    """Renvoie la commission (base + dimanche) pour une affectation livrée."""
+    if not a.order:
+        return 0.0
+    base = commission_for_amount(a.order.total_amount)
+    sunday_bonus = 0.0
+    try:
+        ref = a.completed_at or a.order.delivered_at or datetime.utcnow()
+        if ref.weekday() == 6:
+            sunday_bonus = 0.05 * float(a.order.total_amount or 0)
+    except Exception:
+        sunday_bonus = 0.0
+    return base + sunday_bonus
+
+
+def weekly_bonus_total(assignments):
+    """Calcule le total des bonus hebdomadaires (5$ par bloc de 8 livraisons) pour une liste d'affectations livrées."""
+    weekly_counts = defaultdict(int)
+    for a in assignments:
+        if not a.completed_at:
+            continue
+        week_start, _ = week_bounds(a.completed_at)
+        weekly_counts[week_start] += 1
+    total = 0.0
+    for count in weekly_counts.values():
+        total += (count // 8) * 5.0
+    return total
@@ -0,0 +1,317 @@
+"""Compression des réponses (gzip / Brotli) et fichiers statiques pré-compressés.
+
+- Réponses dynamiques : négociation `Accept-Encoding` (br puis gzip), au-delà de
+  `COMPRESS_MIN_SIZE` octets et pour les types listés dans `COMPRESS_MIMETYPES`
+  (niveau par type). Au-delà de `COMPRESS_THREAD_SIZE`, la compression est faite
+  dans un thread natif (`eventlet.tpool`) pour ne pas bloquer la boucle eventlet.
+- Fichiers statiques : variantes `.br` / `.gz` générées à côté des fichiers
+  (au build via `flask precompress-static`, ou au démarrage dans un thread natif si
+  `STATIC_PRECOMPRESS_ON_START`), puis
+  servies directement ; la résolution des variantes est mise en cache par mtime.
+
+Brotli est optionnel (paquet `Brotli`) : sans lui, seul gzip est utilisé.
+"""
+import gzip
+import logging
+import os
+import threading
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+_logger = logging.getLogger(__name__)
+
+_brotli = None
+_brotli_checked = False
+
+# Niveau de compression par type (gzip 1-9 ; Brotli utilise `COMPRESS_BR_LEVEL`)
+DEFAULT_MIMETYPES = {
+    'text/html': 6,
+    'text/css': 6,
+    'text/plain': 6,
+    'text/javascript': 6,
+    'application/javascript': 6,
+    'application/json': 6,
+    'image/svg+xml': 6,
+    'application/xml': 6,
+}
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.svg', '.html', '.json', '.txt', '.map', '.xml')
+
+
+def _import_brotli():
+    """Import paresseux de Brotli (dépendance optionnelle)."""
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        _brotli_checked = True
+        try:
+            import brotli as _b
+            _brotli = _b
+        except Exception:
+            _brotli = None
+    return _brotli
+
+
+def parse_mimetypes(raw):
+    """'text/html:6,application/json:5' -> {'text/html': 6, 'application/json': 5}."""
+    result = {}
+    for token in (raw or '').split(','):
+        token = token.strip()
+        if not token:
+            continue
+        mimetype, _, level = token.partition(':')
+        try:
+            result[mimetype.strip().lower()] = int(level) if level else 6
+        except ValueError:
+            continue
+    return result
+
+
+def accepted_encodings(accept_encoding):
+    """Encodages acceptés par le client (q > 0), '*' couvrant br/gzip non cités."""
+    accepted = {}
+    for part in (accept_encoding or '').lower().split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get('*', 0.0)
+    return {enc for enc in ('br', 'gzip') if accepted.get(enc, wildcard) > 0}
+
+
+def negotiate_encoding(accept_encoding):
+    """Choisit 'br' (si Brotli est installé), 'gzip' ou None."""
+    accepted = accepted_encodings(accept_encoding)
+    if 'br' in accepted and _import_brotli() is not None:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, level, br_level):
+    if encoding == 'br':
+        return _brotli.compress(data, quality=br_level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def run_native(func, *args):
+    """Exécute `func(*args)` dans un thread natif sous eventlet (`tpool`), directement sinon."""
+    try:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute(func, *args)
+    except ImportError:
+        pass
+    return func(*args)
+
+
+def _compress_offloaded(data, encoding, level, br_level, thread_size):
+    """Compression dans un thread natif pour les gros corps (la boucle eventlet reste libre)."""
+    if len(data) >= thread_size:
+        return run_native(_compress, data, encoding, level, br_level)
+    return _compress(data, encoding, level, br_level)
+
+
+def _add_vary(response):
+    vary = {v.strip().lower() for v in response.headers.get('Vary', '').split(',') if v.strip()}
+    if 'accept-encoding' not in vary:
+        response.headers.add('Vary', 'Accept-Encoding')
+
+
+def _compress_response(response):
+    config = current_app.config
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    levels = config.get('COMPRESS_MIMETYPES') or DEFAULT_MIMETYPES
+    level = levels.get(response.mimetype)
+    if level is None:
+        return response
+    _add_vary(response)
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+        return response
+    length = response.calculate_content_length()
+    if length is None or length < int(config.get('COMPRESS_MIN_SIZE', 1024)):
+        return response
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    compressed = _compress_offloaded(
+        data, encoding, level,
+        int(config.get('COMPRESS_BR_LEVEL', 5)),
+        int(config.get('COMPRESS_THREAD_SIZE', 256 * 1024)),
+    )
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
+    # Un ETag fort désigne une représentation exacte : la variante compressée en diffère
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# === STATIQUES PRÉ-COMPRESSÉS ===
+
+def precompress_directory(folder, min_size=512, extensions=PRECOMPRESS_EXTENSIONS, level=9, br_level=11):
+    """Écrit les variantes .gz/.br des fichiers compressibles absentes ou plus anciennes que la source."""
+    brotli = _import_brotli()
+    written = 0
+    for root, _dirs, files in os.walk(folder):
+        for name in files:
+            if not name.lower().endswith(extensions):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+                if stat.st_size < min_size:
+                    continue
+                variants = [('.gz', lambda d: gzip.compress(d, compresslevel=level, mtime=0))]
+                if brotli is not None:
+                    variants.append(('.br', lambda d: brotli.compress(d, quality=br_level)))
+                data = None
+                for suffix, fn in variants:
+                    target = path + suffix
+                    if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                        continue
+                    if data is None:
+                        with open(path, 'rb') as fh:
+                            data = fh.read()
+                    compressed = fn(data)
+                    if len(compressed) >= len(data):
+                        continue
+                    tmp = f"{target}.tmp{os.getpid()}"
+                    with open(tmp, 'wb') as fh:
+                        fh.write(compressed)
+                    os.replace(tmp, target)
+                    written += 1
+            except OSError as exc:
+                _logger.warning("Pré-compression impossible pour %s: %s", path, exc)
+    return written
+
+
+class StaticVariants:
+    """Résolution (mise en cache par mtime) des variantes pré-compressées d'un fichier statique."""
+
+    def __init__(self):
+        self._cache = {}  # chemin -> (mtime source, {'br': bool, 'gz': bool})
+        self._lock = threading.Lock()
+
+    def available(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return {}
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        found = {}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            try:
+                found[encoding] = os.stat(path + suffix).st_mtime >= mtime
+            except OSError:
+                found[encoding] = False
+        with self._lock:
+            self._cache[path] = (mtime, found)
+        return found
+
+
+def send_static_file(directory, filename, max_age=None):
+    """Équivalent de `send_from_directory` servant la variante .br/.gz si le client l'accepte."""
+    from backend.utils import media
+    # Chemin canonique : contrôles d'accès et en-têtes de cache sur le fichier réellement servi
+    filename = media.normalize(filename)
+    if filename is None:
+        raise NotFound()
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    denied = media.authorize(filename)
+    if denied is not None:
+        return denied
+    if media.is_offloaded(filename):
+        return media.send_media(directory, filename, path, max_age=max_age)
+    variants = current_app.extensions['static_variants'].available(path)
+    encoding = None
+    if any(variants.values()):
+        # Les variantes existent déjà : pas besoin du module Brotli pour servir le .br
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        if 'br' in accepted and variants.get('br'):
+            encoding = 'br'
+        elif 'gzip' in accepted and variants.get('gzip'):
+            encoding = 'gzip'
+    if encoding is None:
+        response = send_from_directory(directory, filename, max_age=max_age)
+    else:
+        import mimetypes
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        suffix = '.br' if encoding == 'br' else '.gz'
+        response = send_from_directory(directory, filename + suffix, max_age=max_age, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}")
+    if variants:
+        _add_vary(response)
+    return media.apply_privacy(response, filename)
+
+
+def _static_view(filename):
+    app = current_app
+    max_age = app.get_send_file_max_age(filename)
+    return send_static_file(app.static_folder, filename, max_age=max_age)
+
+
+def init_compression(app):
+    """Active la compression dynamique et le service des statiques pré-compressés."""
+    app.extensions['static_variants'] = StaticVariants()
+    raw = app.config.get('COMPRESS_MIMETYPES')
+    if isinstance(raw, str):
+        app.config['COMPRESS_MIMETYPES'] = parse_mimetypes(raw) or dict(DEFAULT_MIMETYPES)
+    elif not raw:
+        app.config['COMPRESS_MIMETYPES'] = dict(DEFAULT_MIMETYPES)
+    app.after_request(_compress_response)
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = _static_view
+    app.cli.add_command(precompress_static_command)
+
+    if app.config.get('STATIC_PRECOMPRESS_ON_START') and app.static_folder:
+        folder = app.static_folder
+
+        def _run():
+            try:
+                count = run_native(precompress_directory, folder)
+                if count:
+                    _logger.info("Pré-compression statique: %s variante(s) écrite(s)", count)
+            except Exception as exc:
+                _logger.warning("Pré-compression statique échouée: %s", exc)
+
+        threading.Thread(target=_run, name='precompress-static', daemon=True).start()
+
+
+@click.command('precompress-static')
+@click.argument('folders', nargs=-1)
+@with_appcontext
+def precompress_static_command(folders):
+    """Génère les variantes .gz/.br des fichiers statiques (à lancer au build)."""
+    targets = folders or [current_app.static_folder]
+    total = 0
+    for folder in targets:
+        total += precompress_directory(folder)
+    click.echo(f"✅ {total} variante(s) compressée(s) écrite(s)")
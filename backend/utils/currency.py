@@ -0,0 +1,293 @@
+"""Devises : taux persistés, instantané en mémoire, conversion et formatage par lots.
+
+- table `exchange_rates` (base, devise, taux) : seule source des taux (plus de
+  1 USD = 2200 CDF recopié dans les vues et les générateurs PDF) ;
+- `RateSnapshot` : copie immuable des taux, rechargée au plus toutes les
+  `EXCHANGE_RATE_CACHE_SECONDS` ou dès qu'un taux est modifié par ce processus ;
+  inverses et conversions croisées (via une devise pivot) résolus une fois puis mémorisés ;
+- `convert_many` / `format_many` / `display_prices` : une page de prix convertie et
+  formatée en un appel (taux résolu une seule fois) ;
+- rafraîchissement optionnel : si `EXCHANGE_RATE_URL` est défini, un thread de fond
+  lit toutes les `EXCHANGE_RATE_REFRESH_SECONDS` un JSON de la forme
+  `{"base": "USD", "rates": {"CDF": 2200.0, ...}}` (format open.er-api.com /
+  exchangerate.host ; `base_code` accepté) ; `flask refresh-exchange-rates` fait de même à la demande.
+
+Sans ligne en base, les taux de `EXCHANGE_RATES_DEFAULT` (ex: "USD:CDF=2200") s'appliquent.
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from backend.utils import workers
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_rate_spec(spec):
+    """'USD:CDF=2200,USD:EUR=0.92' -> {('USD', 'CDF'): 2200.0, ...} (entrées invalides ignorées)."""
+    rates = {}
+    for part in (spec or '').split(','):
+        pair, _, value = part.strip().partition('=')
+        base, _, quote = pair.partition(':')
+        try:
+            rate = float(value)
+        except ValueError:
+            continue
+        if base.strip() and quote.strip() and rate > 0:
+            rates[(base.strip().upper(), quote.strip().upper())] = rate
+    return rates
+
+
+def format_amount(amount, currency):
+    """'CDF 2 200,00' (même rendu que l'ancien `convert_price`)."""
+    try:
+        return f"{currency} {float(amount):,.2f}".replace(',', ' ').replace('.', ',')
+    except (TypeError, ValueError):
+        return f"{currency} {amount}"
+
+
+class RateSnapshot:
+    """Taux figés à un instant donné ; `rate()` ne touche jamais la base."""
+
+    def __init__(self, rates, updated_at=None):
+        self._direct = dict(rates)
+        self.updated_at = updated_at
+        self._resolved = {}
+        # Empreinte des taux (ETag des pages aux prix convertis)
+        self.version = hashlib.sha1(repr(sorted(self._direct.items())).encode('utf-8')).hexdigest()[:12]
+
+    def _lookup(self, src, dest):
+        edges = {}
+        for (base, quote), value in self._direct.items():
+            edges.setdefault(base, {})[quote] = value
+            edges.setdefault(quote, {}).setdefault(base, 1.0 / value)
+        direct = edges.get(src, {}).get(dest)
+        if direct:
+            return direct
+        # Conversion croisée : src -> pivot -> dest
+        for pivot, first in edges.get(src, {}).items():
+            second = edges.get(pivot, {}).get(dest)
+            if second:
+                return first * second
+        return None
+
+    def rate(self, src, dest):
+        """Taux src -> dest ; 1.0 pour une même devise ou une paire inconnue."""
+        if not src or not dest:
+            return 1.0
+        src, dest = src.upper(), dest.upper()
+        if src == dest:
+            return 1.0
+        key = (src, dest)
+        if key not in self._resolved:
+            value = self._lookup(src, dest)
+            if value is None:
+                _logger.warning("Taux de change inconnu %s -> %s (1.0 utilisé)", src, dest)
+            self._resolved[key] = value or 1.0
+        return self._resolved[key]
+
+    def as_dict(self):
+        return {f"{base}:{quote}": value for (base, quote), value in self._direct.items()}
+
+
+class CurrencyEngine:
+    """Instantané des taux partagé par le processus (rechargé paresseusement)."""
+
+    def __init__(self, db, model, defaults=None, ttl=60):
+        self.db = db
+        self.model = model
+        self.defaults = dict(defaults or {})
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rates = dict(self.defaults)
+        updated_at = None
+        try:
+            table = self.model.__table__
+            with self.db.engine.connect() as conn:
+                rows = conn.execute(table.select()).fetchall()
+            for row in rows:
+                if row.rate and row.rate > 0:
+                    rates[(row.base.upper(), row.quote.upper())] = float(row.rate)
+                    if row.updated_at and (updated_at is None or row.updated_at > updated_at):
+                        updated_at = row.updated_at
+        except Exception as exc:
+            # Table absente (migration non appliquée) : taux par défaut
+            _logger.warning("Lecture des taux de change impossible: %s", exc)
+        return RateSnapshot(rates, updated_at)
+
+    def snapshot(self):
+        now = time.monotonic()
+        if self._snapshot is None or now - self._loaded_at >= self.ttl:
+            with self._lock:
+                if self._snapshot is None or now - self._loaded_at >= self.ttl:
+                    self._snapshot = self._load()
+                    self._loaded_at = time.monotonic()
+        return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def set_rates(self, rates, source='manual'):
+        """Enregistre {(base, devise): taux} (upsert ORM : invalide aussi le cache de pages)."""
+        model = self.model
+        now = datetime.utcnow()
+        changed = 0
+        for (base, quote), value in rates.items():
+            base, quote = base.upper(), quote.upper()
+            if base == quote or not value or value <= 0:
+                continue
+            row = model.query.filter_by(base=base, quote=quote).first()
+            if row is None:
+                row = model(base=base, quote=quote)
+                self.db.session.add(row)
+            elif row.rate == value and row.source == source:
+                # Taux inchangé : aucune écriture (n'invalide pas le cache de pages 'settings')
+                continue
+            row.rate = float(value)
+            row.source = source
+            row.updated_at = now
+            changed += 1
+        self.db.session.commit()
+        if changed:
+            self.invalidate()
+        return changed
+
+
+def _engine():
+    return current_app.extensions['currency']
+
+
+def snapshot():
+    return _engine().snapshot()
+
+
+def get_rate(src, dest):
+    return snapshot().rate(src, dest)
+
+
+def convert(amount, src, dest):
+    """Montant converti arrondi au centime (montant invalide renvoyé tel quel)."""
+    try:
+        return round(float(amount) * get_rate(src, dest), 2)
+    except (TypeError, ValueError):
+        return amount
+
+
+def convert_many(amounts, src, dest):
+    """Liste de montants convertis (taux résolu une fois) ; None reste None."""
+    rate = get_rate(src, dest)
+    result = []
+    for amount in amounts:
+        try:
+            result.append(None if amount is None else round(float(amount) * rate, 2))
+        except (TypeError, ValueError):
+            result.append(amount)
+    return result
+
+
+def format_many(amounts, src, dest):
+    """Liste de prix affichables 'CDF 2 200,00' ; None reste None."""
+    return [None if value is None else format_amount(value, dest.upper())
+            for value in convert_many(amounts, src, dest)]
+
+
+def display_prices(items, src, dest, fields=('price', 'compare_price')):
+    """{id: {champ: prix affiché}} pour une page d'objets (produits, lignes…) en un appel."""
+    items = list(items or [])
+    values = [getattr(item, field, None) for item in items for field in fields]
+    formatted = format_many(values, src, dest)
+    width = len(fields)
+    return {
+        getattr(item, 'id', index): dict(zip(fields, formatted[index * width:(index + 1) * width]))
+        for index, item in enumerate(items)
+    }
+
+
+def fetch_rates(url, currencies, timeout=10):
+    """Lit les taux publiés par `url` ; {(base, devise): taux} limité à `currencies`."""
+    import requests  # import paresseux: inutile au démarrage
+    resp = requests.get(url, headers={"User-Agent": "MangaStore rdc"}, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    base = (data.get('base') or data.get('base_code') or data.get('source') or '').upper()
+    rates = data.get('rates') or data.get('conversion_rates') or {}
+    if not base or not isinstance(rates, dict):
+        raise ValueError("Réponse de taux de change inattendue")
+    wanted = {c.upper() for c in currencies}
+    result = {}
+    for quote, value in rates.items():
+        quote = str(quote).upper()
+        if quote != base and quote in wanted:
+            try:
+                result[(base, quote)] = float(value)
+            except (TypeError, ValueError):
+                continue
+    return result
+
+
+def refresh_rates(app):
+    """Récupère et enregistre les taux depuis `EXCHANGE_RATE_URL` ; nombre de taux modifiés."""
+    url = app.config.get('EXCHANGE_RATE_URL')
+    if not url:
+        return 0
+    currencies = app.config.get('AVAILABLE_CURRENCIES', ['USD', 'CDF'])
+    rates = fetch_rates(url, currencies, timeout=float(app.config.get('EXCHANGE_RATE_TIMEOUT', 10)))
+    if not rates:
+        return 0
+    return app.extensions['currency'].set_rates(rates, source='api')
+
+
+def _start_refresh_worker(app, interval):
+    def _run():
+        while True:
+            try:
+                with app.app_context():
+                    changed = refresh_rates(app)
+                if changed:
+                    _logger.info("Taux de change mis à jour: %s", changed)
+            except Exception as exc:
+                _logger.warning("Rafraîchissement des taux de change impossible: %s", exc)
+            time.sleep(interval)
+
+    threading.Thread(target=_run, name='exchange-rates', daemon=True).start()
+
+
+def init_currency(app, db, model):
+    """Installe le moteur de devises (`app.extensions['currency']`) et, si configuré, le rafraîchissement."""
+    defaults = parse_rate_spec(app.config.get('EXCHANGE_RATES_DEFAULT', 'USD:CDF=2200'))
+    engine = CurrencyEngine(db, model, defaults=defaults,
+                            ttl=float(app.config.get('EXCHANGE_RATE_CACHE_SECONDS', 60)))
+    app.extensions['currency'] = engine
+
+    @app.cli.command('refresh-exchange-rates')
+    def refresh_exchange_rates_command():
+        """Met à jour les taux depuis EXCHANGE_RATE_URL."""
+        if not app.config.get('EXCHANGE_RATE_URL'):
+            click.echo("EXCHANGE_RATE_URL non défini")
+            return
+        changed = refresh_rates(app)
+        click.echo(f"✅ {changed} taux mis à jour")
+
+    @app.cli.command('set-exchange-rate')
+    @click.argument('base')
+    @click.argument('quote')
+    @click.argument('rate', type=float)
+    def set_exchange_rate_command(base, quote, rate):
+        """Fixe un taux manuellement, ex: flask set-exchange-rate USD CDF 2250."""
+        engine.set_rates({(base, quote): rate})
+        click.echo(f"✅ 1 {base.upper()} = {rate} {quote.upper()}")
+
+    interval = int(app.config.get('EXCHANGE_RATE_REFRESH_SECONDS', 0) or 0)
+    if app.config.get('EXCHANGE_RATE_URL') and interval > 0 and not app.config.get('TESTING'):
+        workers.register('exchange-rates', lambda: _start_refresh_worker(app, interval))
+    return engine
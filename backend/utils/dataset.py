@@ -0,0 +1,486 @@
+"""Génération d'un jeu de données synthétique « grande boutique » (benchmarks, capacité).
+
+Le jeu est reproductible : toutes les valeurs dérivent d'un `random.Random(seed)`.
+Les lignes sont insérées en masse (executemany par paquets) directement sur les
+tables, sans passer par l'ORM, avec des identifiants explicites calculés à partir
+du MAX(id) existant : on peut donc ajouter un jeu à une base déjà peuplée.
+
+Les couvertures générées vont dans `static/seed/` (ignoré par git), jamais dans le
+dossier des uploads réels.
+"""
+import json
+import math
+import os
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, func, select, text
+from werkzeug.security import generate_password_hash
+
+from backend.models import (
+    db, User, Deliverer, Category, Product, Order, OrderItem,
+    DeliveryAssignment, ForumMessage, ActivityLog, CommissionEntry,
+)
+from backend.utils.commissions import commission_for_amount
+
+GENRES = [
+    'Shonen', 'Shojo', 'Seinen', 'Josei', 'Isekai', 'Mecha', 'Sport', 'Horreur',
+    'Romance', 'Comédie', 'Fantasy', 'Science-fiction', 'Tranche de vie', 'Mystère',
+    'Historique', 'Cuisine', 'Musique', 'Artbooks', 'Figurines', 'Goodies',
+]
+ICONS = ['fa-book', 'fa-dragon', 'fa-heart', 'fa-robot', 'fa-futbol', 'fa-ghost', 'fa-star', 'fa-gift']
+TITLE_WORDS_A = ['Lame', 'Ombre', 'Chroniques', 'Légende', 'Cœur', 'Esprit', 'Royaume', 'Âme',
+                 'Flamme', 'Lune', 'Tempête', 'Sabre', 'Dragon', 'Étoile', 'Académie', 'Ninja']
+TITLE_WORDS_B = ['du Shogun', 'céleste', 'perdue', 'de Kinshasa', 'éternelle', 'd\'acier', 'du Nord',
+                 'des Abysses', 'de cristal', 'interdite', 'du Fleuve', 'écarlate', 'nocturne', 'solaire']
+DESCRIPTION_SENTENCES = [
+    "Une aventure épique qui tient en haleine du premier au dernier chapitre.",
+    "Édition française reliée, papier de qualité supérieure.",
+    "Idéal pour compléter votre collection.",
+    "Le dessin soigné met en valeur des combats spectaculaires.",
+    "Une histoire touchante sur l'amitié et le dépassement de soi.",
+    "Inclut des pages couleur et un bonus exclusif de l'auteur.",
+    "Best-seller au Japon, enfin disponible en boutique.",
+    "Convient aux lecteurs à partir de 12 ans.",
+]
+FIRST_NAMES = ['Aline', 'Benoît', 'Chantal', 'Daniel', 'Esther', 'Fiston', 'Grâce', 'Héritier', 'Irène',
+               'Jonathan', 'Kevine', 'Lionel', 'Merveille', 'Nathan', 'Orly', 'Patient', 'Rachel',
+               'Samuel', 'Trésor', 'Vanessa', 'Yannick', 'Zoé']
+LAST_NAMES = ['Kabila', 'Mukendi', 'Tshibanda', 'Ilunga', 'Kasongo', 'Mbuyi', 'Nsimba', 'Lukusa',
+              'Mputu', 'Kalala', 'Banza', 'Ngoy', 'Mwamba', 'Kayembe', 'Lunda', 'Makiese']
+# Communes de Kinshasa (lat, lon, poids) : les adresses de livraison s'y concentrent
+COMMUNES = [
+    ('Gombe', -4.3105, 15.3055, 5), ('Lingwala', -4.3240, 15.2960, 3), ('Kintambo', -4.3330, 15.2740, 3),
+    ('Ngaliema', -4.3700, 15.2500, 4), ('Bandalungwa', -4.3460, 15.2890, 3), ('Kalamu', -4.3440, 15.3150, 4),
+    ('Limete', -4.3600, 15.3450, 4), ('Lemba', -4.3950, 15.3200, 3), ('Matete', -4.3850, 15.3500, 2),
+    ('Masina', -4.3850, 15.3950, 3), ('Ngaba', -4.3800, 15.3150, 2), ('Kasa-Vubu', -4.3360, 15.3000, 2),
+]
+FORUM_LINES = [
+    "Bonjour, le tome suivant arrive quand ?", "Livraison reçue, merci !", "Je suis en route vers Limete.",
+    "Vous avez des figurines en stock ?", "Commande confirmée, livraison demain.", "Top qualité, je recommande.",
+    "Le paiement à la livraison est-il possible ?", "Client absent, je repasse dans une heure.",
+]
+ACTIVITY_ACTIONS = ["Connexion client", "Commande passée", "Mise à jour profil", "Ajout au panier",
+                    "Consultation commande", "Inscription client"]
+# Répartition réaliste des statuts de commande
+ORDER_STATUSES = [('delivered', 70), ('cancelled', 10), ('pending', 8), ('confirmed', 7), ('shipped', 5)]
+# Heures de commande : creux la nuit, pic en soirée
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 6, 6, 6, 7, 8, 10, 11, 10, 8, 5, 3]
+
+COVER_COUNT = 12
+# Dossier des couvertures générées, relatif au dossier statique
+COVER_DIR = 'seed'
+COVER_TEMPLATE = """<svg xmlns="http://www.w3.org/2000/svg" width="600" height="800" viewBox="0 0 600 800">
+<rect width="600" height="800" fill="{bg}"/><rect x="40" y="40" width="520" height="720" fill="none" stroke="{fg}" stroke-width="8"/>
+<text x="300" y="420" font-family="sans-serif" font-size="72" fill="{fg}" text-anchor="middle">MANGA {n:02d}</text>
+</svg>
+"""
+COVER_COLORS = [('#1f2937', '#f59e0b'), ('#7c3aed', '#fde68a'), ('#b91c1c', '#fef3c7'), ('#065f46', '#a7f3d0'),
+                ('#1e3a8a', '#bfdbfe'), ('#9d174d', '#fbcfe8'), ('#374151', '#e5e7eb'), ('#92400e', '#fed7aa'),
+                ('#0f766e', '#ccfbf1'), ('#4c1d95', '#ddd6fe'), ('#111827', '#f87171'), ('#164e63', '#67e8f9')]
+
+
+class _Picker:
+    """Tirage pondéré en O(log n) (poids cumulés + bisect), sans recopier la population."""
+
+    def __init__(self, rnd, population, weights):
+        self.rnd = rnd
+        self.population = population
+        self.cum = list(accumulate(weights))
+        self.total = self.cum[-1]
+
+    def pick(self):
+        return self.population[bisect_left(self.cum, self.rnd.random() * self.total)]
+
+
+def _zipf_weights(n, exponent):
+    """Popularité en loi de puissance : le produit de rang r pèse 1 / r^s."""
+    return [1.0 / math.pow(rank, exponent) for rank in range(1, n + 1)]
+
+
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _bulk_insert(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def _ledger_rows(deliverer_id, deliveries, paid_before):
+    """Écritures du grand livre d'un livreur et solde final.
+
+    `deliveries` : [(livrée_le, affectation, n° commande, montant)] ; mêmes montants que
+    `ledger.credit_assignment` (commission de base + bonus dimanche), un paiement à
+    `paid_before` solde les livraisons antérieures (affectations `paid`).
+    """
+    rows, balance, paid = [], 0.0, 0
+
+    def add(kind, amount, created_at, assignment_id=None, count=0, note=None):
+        nonlocal balance
+        amount = round(amount, 2)
+        balance = round(balance + amount, 2)
+        rows.append({'deliverer_id': deliverer_id, 'assignment_id': assignment_id, 'kind': kind,
+                     'amount': amount, 'balance': balance, 'deliveries': count, 'week_start': None,
+                     'note': note, 'created_at': created_at})
+
+    for delivered_at, assignment_id, order_number, total in sorted(deliveries):
+        if delivered_at >= paid_before and paid:
+            add('payout', -balance, paid_before, count=paid, note=f"{paid} livraison(s)")
+            paid = 0
+        add('credit', commission_for_amount(total), delivered_at, assignment_id, 1, order_number)
+        if delivered_at.weekday() == 6:
+            add('sunday_bonus', 0.05 * total, delivered_at, assignment_id, note=order_number)
+        paid += delivered_at < paid_before
+    if paid:
+        add('payout', -balance, paid_before, count=paid, note=f"{paid} livraison(s)")
+    return rows, balance
+
+
+def _write_covers(dest_dir):
+    """Crée des couvertures SVG locales (seed/seed-cover-XX.svg) si absentes."""
+    os.makedirs(dest_dir, exist_ok=True)
+    names = []
+    for n in range(COVER_COUNT):
+        filename = f"seed-cover-{n:02d}.svg"
+        path = os.path.join(dest_dir, filename)
+        if not os.path.exists(path):
+            bg, fg = COVER_COLORS[n % len(COVER_COLORS)]
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(COVER_TEMPLATE.format(bg=bg, fg=fg, n=n + 1))
+        names.append(f"{COVER_DIR}/{filename}")
+    return names
+
+
+def _reset_sequences(tables):
+    """PostgreSQL : réaligner les séquences SERIAL après insertion d'ids explicites."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+def generate_dataset(seed=42, categories=20, products=2000, clients=10000, deliverers=50,
+                     orders=100000, forum_messages=5000, activity_logs=50000, days=365,
+                     popularity_exponent=1.1, chunk_size=5000, password='password',
+                     cover_folder=None, log=None):
+    """Insère un jeu de données complet et retourne le nombre de lignes par table."""
+    rnd = random.Random(seed)
+    log = log or (lambda msg: None)
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(days=days)
+    # Un seul hash pour tous les comptes : le hachage coûte ~100 ms par appel
+    password_hash = generate_password_hash(password)
+    counts = {}
+
+    def _commit(name, n):
+        db.session.commit()
+        counts[name] = counts.get(name, 0) + n
+
+    # Catégories
+    first = _next_id(Category)
+    rows = []
+    for i in range(categories):
+        genre = GENRES[i % len(GENRES)]
+        name = genre if i < len(GENRES) else f"{genre} {i // len(GENRES) + 1}"
+        rows.append({
+            'id': first + i, 'name': name, 'description': f"Sélection {name.lower()} de la boutique.",
+            'icon': rnd.choice(ICONS), 'image': None, 'is_active': True,
+            'created_at': start + timedelta(minutes=i),
+            'updated_at': start + timedelta(minutes=i),
+        })
+    _bulk_insert(Category.__table__, rows)
+    category_ids = [r['id'] for r in rows]
+    _commit('categories', len(rows))
+    log(f"catégories: {len(rows)}")
+
+    # Produits (couvertures locales, descriptions, prix log-normaux)
+    covers = _write_covers(cover_folder or os.path.join(current_app.static_folder, COVER_DIR))
+    first = _next_id(Product)
+    product_ids, product_prices = [], []
+    rows = []
+    for i in range(products):
+        pid = first + i
+        price = round(min(250.0, max(2.0, rnd.lognormvariate(2.6, 0.6))), 2)
+        created = start + timedelta(seconds=rnd.randint(0, days * 86400))
+        n_images = rnd.choice((1, 1, 2, 3))
+        images = [covers[(pid + k) % len(covers)] for k in range(n_images)]
+        rows.append({
+            'id': pid,
+            'name': f"{rnd.choice(TITLE_WORDS_A)} {rnd.choice(TITLE_WORDS_B)} - Tome {rnd.randint(1, 40)}",
+            'description': ' '.join(rnd.sample(DESCRIPTION_SENTENCES, 3)),
+            'price': price,
+            'compare_price': round(price * 1.2, 2) if rnd.random() < 0.15 else None,
+            'quantity': rnd.randint(0, 500),
+            'images': json.dumps(images),
+            'videos': None,
+            'is_active': rnd.random() > 0.03,
+            'is_featured': rnd.random() < 0.02,
+            'created_at': created,
+            'updated_at': created,
+            'category_id': rnd.choice(category_ids),
+        })
+        product_ids.append(pid)
+        product_prices.append(price)
+        if len(rows) >= chunk_size:
+            _bulk_insert(Product.__table__, rows)
+            _commit('products', len(rows))
+            rows = []
+    _bulk_insert(Product.__table__, rows)
+    _commit('products', len(rows))
+    log(f"produits: {counts['products']}")
+
+    # Clients
+    first = _next_id(User)
+    client_ids = []
+    rows = []
+    for i in range(clients):
+        uid = first + i
+        commune = rnd.choice(COMMUNES)[0]
+        rows.append({
+            'id': uid,
+            'email': f"seed{seed}.client{uid}@example.com",
+            'password_hash': password_hash,
+            'first_name': rnd.choice(FIRST_NAMES),
+            'last_name': rnd.choice(LAST_NAMES),
+            'phone': f"+2438{rnd.randint(10000000, 99999999)}",
+            'address': f"{rnd.randint(1, 250)} avenue {rnd.choice(LAST_NAMES)}, {commune}, Kinshasa",
+            'profile_picture': 'default_profile.svg',
+            'is_admin': False, 'is_super_admin': False, 'is_active': True,
+            'created_at': start + timedelta(seconds=rnd.randint(0, days * 86400)),
+        })
+        client_ids.append(uid)
+        if len(rows) >= chunk_size:
+            _bulk_insert(User.__table__, rows)
+            _commit('users', len(rows))
+            rows = []
+    _bulk_insert(User.__table__, rows)
+    _commit('users', len(rows))
+    log(f"clients: {counts['users']}")
+
+    # Livreurs
+    first = _next_id(Deliverer)
+    rows = [{
+        'id': first + i,
+        'email': f"seed{seed}.livreur{first + i}@example.com",
+        'password_hash': password_hash,
+        'first_name': rnd.choice(FIRST_NAMES),
+        'last_name': rnd.choice(LAST_NAMES),
+        'phone': f"+2439{rnd.randint(10000000, 99999999)}",
+        'profile_picture': 'default_profile.svg',
+        'is_active': True, 'commission_due': 0.0,
+        'status': rnd.choice(('available', 'available', 'busy', 'offline')),
+        'created_at': start,
+        'weekly_bonus_paid_count': 0,
+    } for i in range(deliverers)]
+    _bulk_insert(Deliverer.__table__, rows)
+    deliverer_ids = [r['id'] for r in rows]
+    _commit('deliverers', len(rows))
+    log(f"livreurs: {len(rows)}")
+
+    # Commandes, lignes et affectations : popularité produit en loi de puissance (rangs mélangés)
+    popularity = _zipf_weights(len(product_ids), popularity_exponent)
+    ranked = list(range(len(product_ids)))
+    rnd.shuffle(ranked)
+    product_picker = _Picker(rnd, ranked, popularity)
+    # Quelques clients fidèles passent beaucoup de commandes
+    client_picker = _Picker(rnd, client_ids, _zipf_weights(len(client_ids), 0.6)) if client_ids else None
+    status_picker = _Picker(rnd, [s for s, _ in ORDER_STATUSES], [w for _, w in ORDER_STATUSES])
+    hour_picker = _Picker(rnd, list(range(24)), HOUR_WEIGHTS)
+    commune_picker = _Picker(rnd, COMMUNES, [c[3] for c in COMMUNES])
+    deliverer_load = [0] * len(deliverer_ids)
+    deliverer_credits = {deliverer_id: [] for deliverer_id in deliverer_ids}
+    paid_before = now - timedelta(days=14)
+
+    order_id = _next_id(Order)
+    item_id = _next_id(OrderItem)
+    assignment_id = _next_id(DeliveryAssignment)
+    order_rows, item_rows, assignment_rows = [], [], []
+    started = time.perf_counter()
+    for n in range(orders if client_ids and product_ids else 0):
+        created = start + timedelta(days=rnd.randint(0, max(0, days - 1)), hours=hour_picker.pick(),
+                                    minutes=rnd.randint(0, 59), seconds=rnd.randint(0, 59))
+        if created > now:
+            created = now - timedelta(minutes=rnd.randint(1, 600))
+        status = status_picker.pick()
+        # Les commandes récentes sont encore en cours
+        if created > now - timedelta(days=2) and status == 'delivered':
+            status = rnd.choice(('pending', 'confirmed', 'shipped'))
+        commune, lat, lon, _ = commune_picker.pick()
+
+        n_items = min(6, 1 + int(rnd.expovariate(0.9)))
+        seen = set()
+        total = 0.0
+        for _ in range(n_items):
+            idx = product_picker.pick()
+            if idx in seen:
+                continue
+            seen.add(idx)
+            qty = 1 if rnd.random() < 0.75 else rnd.randint(2, 4)
+            price = product_prices[idx]
+            total += price * qty
+            item_rows.append({'id': item_id, 'order_id': order_id, 'product_id': product_ids[idx],
+                              'quantity': qty, 'price': price, 'created_at': created})
+            item_id += 1
+        shipping = 2.0 if rnd.random() < 0.8 else 5.0
+        total = round(total + shipping, 2)
+
+        delivered_at = None
+        status_changed = created + timedelta(hours=rnd.randint(1, 6))
+        if status == 'delivered':
+            delivered_at = created + timedelta(hours=rnd.randint(3, 72))
+            status_changed = delivered_at
+        order_rows.append({
+            'id': order_id,
+            'order_number': f"SYN-{order_id:09d}",
+            'user_id': client_picker.pick(),
+            'total_amount': total,
+            'status': status,
+            'shipping_address': f"{rnd.randint(1, 250)} avenue {rnd.choice(LAST_NAMES)}, {commune}, Kinshasa",
+            'shipping_latitude': round(lat + rnd.gauss(0, 0.01), 6),
+            'shipping_longitude': round(lon + rnd.gauss(0, 0.01), 6),
+            'shipping_geocoded': f"{commune}, Kinshasa",
+            'notes': None,
+            'created_at': created,
+            'updated_at': status_changed,
+            'status_changed_at': status_changed,
+            'delivered_at': delivered_at,
+            'stock_deducted': status == 'delivered',
+        })
+
+        if deliverer_ids and status in ('delivered', 'shipped', 'confirmed'):
+            # Répartition à peu près équilibrée, comme une affectation manuelle
+            slot = min(rnd.sample(range(len(deliverer_ids)), min(3, len(deliverer_ids))),
+                       key=lambda k: deliverer_load[k])
+            deliverer_load[slot] += 1
+            a_status = {'delivered': 'delivered', 'shipped': 'in_progress', 'confirmed': 'assigned'}[status]
+            assignment_rows.append({
+                'id': assignment_id,
+                'order_id': order_id,
+                'deliverer_id': deliverer_ids[slot],
+                'status': a_status,
+                'payout_status': 'paid' if delivered_at and delivered_at < paid_before else 'pending',
+                'commission_recorded': a_status == 'delivered',
+                'created_at': created + timedelta(minutes=rnd.randint(5, 120)),
+                'updated_at': status_changed,
+                'completed_at': delivered_at,
+            })
+            if a_status == 'delivered':
+                deliverer_credits[deliverer_ids[slot]].append(
+                    (delivered_at, assignment_id, f"SYN-{order_id:09d}", total))
+            assignment_id += 1
+        order_id += 1
+
+        if len(order_rows) >= chunk_size:
+            _bulk_insert(Order.__table__, order_rows)
+            _bulk_insert(OrderItem.__table__, item_rows)
+            _bulk_insert(DeliveryAssignment.__table__, assignment_rows)
+            counts['order_items'] = counts.get('order_items', 0) + len(item_rows)
+            counts['delivery_assignments'] = counts.get('delivery_assignments', 0) + len(assignment_rows)
+            _commit('orders', len(order_rows))
+            order_rows, item_rows, assignment_rows = [], [], []
+            if (n + 1) % (chunk_size * 20) == 0:
+                elapsed = time.perf_counter() - started
+                log(f"commandes: {n + 1}/{orders} ({(n + 1) / elapsed:.0f}/s)")
+    _bulk_insert(Order.__table__, order_rows)
+    _bulk_insert(OrderItem.__table__, item_rows)
+    _bulk_insert(DeliveryAssignment.__table__, assignment_rows)
+    counts['order_items'] = counts.get('order_items', 0) + len(item_rows)
+    counts['delivery_assignments'] = counts.get('delivery_assignments', 0) + len(assignment_rows)
+    _commit('orders', len(order_rows))
+    log(f"commandes: {counts['orders']} ({counts['order_items']} lignes, "
+        f"{counts['delivery_assignments']} affectations)")
+
+    # Grand livre des commissions : crédits des livraisons comptabilisées, paiement des plus anciennes
+    rows, balances = [], []
+    for deliverer_id, deliveries in deliverer_credits.items():
+        entries, balance = _ledger_rows(deliverer_id, deliveries, paid_before)
+        rows.extend(entries)
+        balances.append({'deliverer_id': deliverer_id, 'balance': balance})
+        if len(rows) >= chunk_size:
+            _bulk_insert(CommissionEntry.__table__, rows)
+            _commit('commission_ledger', len(rows))
+            rows = []
+    _bulk_insert(CommissionEntry.__table__, rows)
+    if balances:
+        deliverers_table = Deliverer.__table__
+        db.session.execute(
+            deliverers_table.update().where(deliverers_table.c.id == bindparam('deliverer_id'))
+            .values(commission_due=bindparam('balance')), balances)
+    _commit('commission_ledger', len(rows))
+    log(f"grand livre des commissions: {counts['commission_ledger']} écritures")
+
+    # Forum
+    first = _next_id(ForumMessage)
+    rows = []
+    for i in range(forum_messages if client_ids else 0):
+        from_deliverer = deliverer_ids and rnd.random() < 0.3
+        rows.append({
+            'id': first + i,
+            'user_id': None if from_deliverer else rnd.choice(client_ids),
+            'deliverer_id': rnd.choice(deliverer_ids) if from_deliverer else None,
+            'role': 'deliverer' if from_deliverer else 'client',
+            'content': rnd.choice(FORUM_LINES),
+            'created_at': start + timedelta(seconds=rnd.randint(0, days * 86400)),
+        })
+        if len(rows) >= chunk_size:
+            _bulk_insert(ForumMessage.__table__, rows)
+            _commit('forum_messages', len(rows))
+            rows = []
+    _bulk_insert(ForumMessage.__table__, rows)
+    _commit('forum_messages', len(rows))
+
+    # Journal d'activité
+    first = _next_id(ActivityLog)
+    rows = []
+    for i in range(activity_logs if client_ids else 0):
+        actor = rnd.choice(client_ids)
+        rows.append({
+            'id': first + i,
+            'action': rnd.choice(ACTIVITY_ACTIONS),
+            'actor_id': actor,
+            'actor_email': f"seed{seed}.client{actor}@example.com",
+            'created_at': start + timedelta(seconds=rnd.randint(0, days * 86400)),
+        })
+        if len(rows) >= chunk_size:
+            _bulk_insert(ActivityLog.__table__, rows)
+            _commit('activity_logs', len(rows))
+            rows = []
+    _bulk_insert(ActivityLog.__table__, rows)
+    _commit('activity_logs', len(rows))
+
+    _reset_sequences(['categories', 'products', 'users', 'deliverers', 'orders', 'order_items',
+                      'delivery_assignments', 'commission_ledger', 'forum_messages', 'activity_logs'])
+    db.session.commit()
+    return counts
+
+
+@click.command('seed-dataset')
+@click.option('--seed', default=42, show_default=True, help='Graine aléatoire (jeu reproductible).')
+@click.option('--categories', default=20, show_default=True)
+@click.option('--products', default=2000, show_default=True)
+@click.option('--clients', default=10000, show_default=True)
+@click.option('--deliverers', default=50, show_default=True)
+@click.option('--orders', default=100000, show_default=True)
+@click.option('--forum-messages', default=5000, show_default=True)
+@click.option('--activity-logs', default=50000, show_default=True)
+@click.option('--days', default=365, show_default=True, help="Période couverte par l'historique.")
+@click.option('--popularity-exponent', default=1.1, show_default=True, help='Exposant de la loi de Zipf des produits.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Lignes par insertion groupée.')
+@click.option('--password', default='password', show_default=True, help='Mot de passe des comptes générés.')
+@with_appcontext
+def seed_dataset_command(**options):
+    """Génère un jeu de données synthétique (catégories, produits, clients, commandes...)."""
+    started = time.perf_counter()
+    counts = generate_dataset(log=click.echo, **options)
+    click.echo(f"✅ Jeu de données généré en {time.perf_counter() - started:.1f}s : "
+               + ', '.join(f"{name}={n}" for name, n in counts.items()))
@@ -0,0 +1,171 @@
+"""Synchronisation hors ligne du livreur : lot de changements horodatés appliqué en une transaction.
+
+Le téléphone enregistre chaque changement (statut d'une affectation + note, ou
+statut du livreur) avec un identifiant unique et l'heure locale, puis envoie la
+file à `/livreur/api/sync` dès que le réseau revient :
+
+- un identifiant déjà traité (`deliverer_sync_log`) renvoie le résultat mémorisé
+  sans rien réappliquer (lot renvoyé après une coupure) ;
+- les changements sont appliqués dans l'ordre de leur heure d'enregistrement ; un
+  changement plus ancien que le dernier appliqué pour la même cible est ignoré
+  (`conflict`) ;
+- mêmes règles que les formulaires (statut autorisé, note obligatoire) et même
+  crédit de commission quand la commande est livrée ; une livraison prend l'heure
+  enregistrée comme `completed_at`.
+"""
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from backend.models import db, DeliveryAssignment, DelivererSyncLog
+from backend.utils import ledger
+
+ASSIGNMENT_STATUSES = ('assigned', 'in_progress', 'delivered', 'postponed', 'cancelled')
+DELIVERER_STATUSES = ('available', 'busy', 'offline')
+NOTE_REQUIRED = 'La note est obligatoire et doit indiquer si les frais de livraison ont été perçus.'
+_CHANGE_ID_RE = re.compile(r'^[A-Za-z0-9_\-:.]{8,64}$')
+_PURGE_INTERVAL = 600
+_last_purge = [0.0]
+
+
+def parse_recorded_at(value, now):
+    """Heure ISO 8601 (ou epoch en ms) -> datetime UTC naïf, bornée à `now`."""
+    recorded = None
+    try:
+        if isinstance(value, (int, float)):
+            recorded = datetime.utcfromtimestamp(value / 1000.0)
+        elif isinstance(value, str) and value:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            recorded = parsed
+    except (ValueError, OverflowError, OSError):
+        recorded = None
+    if recorded is None or recorded > now:
+        return now
+    return recorded
+
+
+def _last_applied(deliverer_id, kind, target_ids=None):
+    query = (select(DelivererSyncLog.target_id, func.max(DelivererSyncLog.recorded_at))
+             .where(DelivererSyncLog.deliverer_id == deliverer_id, DelivererSyncLog.kind == kind,
+                    DelivererSyncLog.outcome == 'applied'))
+    if target_ids is not None:
+        query = query.where(DelivererSyncLog.target_id.in_(target_ids))
+    return dict(db.session.execute(query.group_by(DelivererSyncLog.target_id)).all())
+
+
+def _apply_assignment(deliverer, assignment, change, recorded_at, last_applied):
+    if assignment is None or assignment.deliverer_id != deliverer.id:
+        return 'rejected', 'Affectation introuvable'
+    status = change.get('status')
+    note = (change.get('note') or '').strip()
+    if status not in ASSIGNMENT_STATUSES:
+        return 'rejected', 'Statut invalide'
+    if not note:
+        return 'rejected', NOTE_REQUIRED
+    previous = last_applied.get(assignment.id)
+    if previous is not None and recorded_at < previous:
+        return 'conflict', 'Un changement plus récent a déjà été appliqué'
+    assignment.status = status
+    assignment.note = note[:2000]
+    if status == 'delivered':
+        assignment.completed_at = assignment.completed_at or recorded_at
+        if assignment.order and assignment.order.status == 'delivered' and not assignment.commission_recorded:
+            ledger.credit_assignment(assignment)
+    last_applied[assignment.id] = recorded_at
+    return 'applied', None
+
+
+def _apply_status(deliverer, change, recorded_at, last_applied):
+    status = change.get('status')
+    if status not in DELIVERER_STATUSES:
+        return 'rejected', 'Statut invalide'
+    previous = last_applied.get(None)
+    if previous is not None and recorded_at < previous:
+        return 'conflict', 'Un changement plus récent a déjà été appliqué'
+    deliverer.status = status
+    last_applied[None] = recorded_at
+    return 'applied', None
+
+
+def apply_changes(deliverer, changes, now=None):
+    """Applique un lot (sans commit) ; un résultat par changement, dans l'ordre reçu.
+
+    Résultat : `{'id', 'outcome': applied|rejected|conflict, 'message', 'duplicate'}`.
+    """
+    now = now or datetime.utcnow()
+    results = {}
+    pending = []
+    for position, change in enumerate(changes):
+        change_id = str(change.get('id') or '') if isinstance(change, dict) else ''
+        if not _CHANGE_ID_RE.match(change_id):
+            results[position] = {'id': change_id or None, 'outcome': 'rejected',
+                                 'message': 'Identifiant de changement invalide', 'duplicate': False}
+            continue
+        pending.append((position, change_id, change))
+
+    ids = {change_id for _, change_id, _ in pending}
+    known = {}
+    if ids:
+        known = {log.change_id: log for log in DelivererSyncLog.query.filter(
+            DelivererSyncLog.deliverer_id == deliverer.id, DelivererSyncLog.change_id.in_(ids))}
+
+    target_ids = set()
+    for _, change_id, change in pending:
+        if change_id not in known and change.get('type') == 'assignment':
+            try:
+                target_ids.add(int(change.get('assignment_id')))
+            except (TypeError, ValueError):
+                pass
+    assignments = {}
+    if target_ids:
+        assignments = {a.id: a for a in DeliveryAssignment.query
+                       .options(joinedload(DeliveryAssignment.order))
+                       .filter(DeliveryAssignment.id.in_(target_ids))}
+    last_assignment = _last_applied(deliverer.id, 'assignment', target_ids) if target_ids else {}
+    last_status = _last_applied(deliverer.id, 'deliverer_status')
+
+    timed = [(parse_recorded_at(change.get('recorded_at'), now), position, change_id, change)
+             for position, change_id, change in pending]
+    for recorded_at, position, change_id, change in sorted(timed, key=lambda item: (item[0], item[1])):
+        log = known.get(change_id)
+        if log is not None:
+            results[position] = {'id': change_id, 'outcome': log.outcome, 'message': log.message,
+                                 'duplicate': True}
+            continue
+        kind = 'deliverer_status' if change.get('type') == 'deliverer_status' else 'assignment'
+        target_id = None
+        try:
+            with db.session.begin_nested():
+                if kind == 'assignment':
+                    try:
+                        target_id = int(change.get('assignment_id'))
+                    except (TypeError, ValueError):
+                        target_id = None
+                    outcome, message = _apply_assignment(deliverer, assignments.get(target_id), change,
+                                                         recorded_at, last_assignment)
+                else:
+                    outcome, message = _apply_status(deliverer, change, recorded_at, last_status)
+        except Exception:
+            outcome, message = 'rejected', 'Erreur lors de la mise à jour'
+        log = DelivererSyncLog(deliverer_id=deliverer.id, change_id=change_id, kind=kind, target_id=target_id,
+                               outcome=outcome, message=message, recorded_at=recorded_at, created_at=now)
+        db.session.add(log)
+        known[change_id] = log
+        results[position] = {'id': change_id, 'outcome': outcome, 'message': message, 'duplicate': False}
+    return [results[position] for position in sorted(results)]
+
+
+def purge_expired(ttl_hours, now=None):
+    """Supprime (au plus toutes les 10 min) les entrées plus anciennes que `ttl_hours` (sans commit)."""
+    tick = time.monotonic()
+    if tick - _last_purge[0] < _PURGE_INTERVAL:
+        return 0
+    _last_purge[0] = tick
+    table = DelivererSyncLog.__table__
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=ttl_hours)
+    return db.session.execute(table.delete().where(table.c.created_at < cutoff)).rowcount
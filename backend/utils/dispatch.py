@@ -0,0 +1,210 @@
+"""Affectation automatique des commandes confirmées au livreur disponible le plus proche.
+
+- positions livreurs : grille en mémoire (`backend.utils.geo`) alimentée par
+  Socket.IO, reconstruite au démarrage depuis `deliverers.last_latitude/longitude` ;
+- une passe lit en trois requêtes les commandes confirmées géolocalisées sans
+  affectation active, les livreurs disponibles et leur charge (missions en cours),
+  puis choisit pour chaque commande (la plus ancienne d'abord) le candidat au plus
+  faible score `distance + charge × DISPATCH_LOAD_PENALTY_KM`, sous la limite
+  `DISPATCH_MAX_ACTIVE` ; la charge est mise à jour au fil de la passe ;
+- déclenchée à la confirmation d'une commande, périodiquement
+  (`DISPATCH_INTERVAL`) et via `flask dispatch-orders`, seulement si
+  `AUTO_DISPATCH_ENABLED`.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import exists, func, select
+
+from backend.models import db, Deliverer, DeliveryAssignment, Order
+from backend.utils import workers
+from backend.utils.geo import DelivererGrid, PositionThrottle, valid_point
+
+_logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('assigned', 'in_progress', 'postponed')
+AUTO_NOTE = 'Affectation automatique (livreur le plus proche)'
+
+_config = {}
+_lock = threading.Lock()
+grid = DelivererGrid()
+_throttle = PositionThrottle(10)
+_persisted = {}
+_loaded = [False]
+
+
+def _setting(name, default):
+    return _config.get(name, default)
+
+
+def _load_positions():
+    """Remplit la grille depuis les dernières positions enregistrées (une fois par processus)."""
+    if _loaded[0]:
+        return
+    cutoff = datetime.utcnow() - _setting('max_age', timedelta(minutes=15))
+    rows = db.session.execute(
+        select(Deliverer.id, Deliverer.last_latitude, Deliverer.last_longitude, Deliverer.last_position_at)
+        .where(Deliverer.last_position_at >= cutoff)
+    ).all()
+    for deliverer_id, lat, lon, seen_at in rows:
+        point = valid_point(lat, lon)
+        if point:
+            grid.update(deliverer_id, point[0], point[1], seen_at)
+    _loaded[0] = True
+
+
+def report_position(deliverer_id, lat, lon, now=None):
+    """Position signalée par un livreur ; False si ignorée (invalide ou trop fréquente).
+
+    La grille est mise à jour à chaque position acceptée ; la base au plus toutes
+    les `DELIVERER_POSITION_PERSIST_INTERVAL` secondes (commit).
+    """
+    point = valid_point(lat, lon)
+    if point is None or not _throttle.allow(deliverer_id):
+        return False
+    now = now or datetime.utcnow()
+    grid.update(deliverer_id, point[0], point[1], now)
+    tick = time.monotonic()
+    if tick - _persisted.get(deliverer_id, float('-inf')) >= _setting('persist_interval', 60):
+        _persisted[deliverer_id] = tick
+        table = Deliverer.__table__
+        db.session.execute(
+            table.update().where(table.c.id == deliverer_id)
+            .values(last_latitude=point[0], last_longitude=point[1], last_position_at=now)
+        )
+        db.session.commit()
+    return True
+
+
+def current_position(deliverer_id, now=None):
+    """Dernière position (lat, lon) du livreur si elle n'est pas périmée, sinon None."""
+    if not _loaded[0]:
+        with _lock:
+            _load_positions()
+    entry = grid.position(deliverer_id)
+    if entry is None or (now or datetime.utcnow()) - entry[2] > _setting('max_age', timedelta(minutes=15)):
+        return None
+    return entry[0], entry[1]
+
+
+def _open_orders(order_ids=None, limit=500):
+    active = exists().where(DeliveryAssignment.order_id == Order.id,
+                            DeliveryAssignment.status != 'cancelled')
+    query = (select(Order.id, Order.shipping_latitude, Order.shipping_longitude)
+             .where(Order.status == 'confirmed', Order.shipping_latitude.isnot(None),
+                    Order.shipping_longitude.isnot(None), ~active))
+    if order_ids is not None:
+        query = query.where(Order.id.in_(order_ids))
+    return db.session.execute(query.order_by(Order.created_at, Order.id).limit(limit)).all()
+
+
+def _available_loads():
+    """{livreur disponible: missions en cours} en une requête groupée."""
+    rows = db.session.execute(
+        select(Deliverer.id, func.count(DeliveryAssignment.id))
+        .outerjoin(DeliveryAssignment, (DeliveryAssignment.deliverer_id == Deliverer.id)
+                   & DeliveryAssignment.status.in_(ACTIVE_STATUSES))
+        .where(Deliverer.status == 'available', Deliverer.is_active.is_(True))
+        .group_by(Deliverer.id)
+    ).all()
+    return dict(rows)
+
+
+def plan(orders, loads, now=None):
+    """Choix des livreurs pour `orders` [(id, lat, lon)] ; [(order_id, deliverer_id, distance_km)]."""
+    max_active = _setting('max_active', 3)
+    penalty = _setting('load_penalty_km', 2.0)
+    max_km = _setting('max_km', 15.0)
+    max_age = _setting('max_age', timedelta(minutes=15))
+    candidates = _setting('candidates', 8)
+    loads = dict(loads)
+
+    def accept(deliverer_id):
+        return deliverer_id in loads and loads[deliverer_id] < max_active
+
+    chosen = []
+    for order_id, lat, lon in orders:
+        point = valid_point(lat, lon)
+        if point is None:
+            continue
+        nearest = grid.nearest(point[0], point[1], limit=candidates, max_km=max_km,
+                               accept=accept, max_age=max_age, now=now)
+        if not nearest:
+            continue
+        distance, deliverer_id = min(nearest, key=lambda item: (item[0] + loads[item[1]] * penalty, item[0]))
+        loads[deliverer_id] += 1
+        chosen.append((order_id, deliverer_id, distance))
+    return chosen
+
+
+def dispatch_pending(order_ids=None, now=None):
+    """Affecte les commandes en attente de livreur (toutes, ou `order_ids`) ; commit.
+
+    Retourne la liste `(order_id, deliverer_id, distance_km)` des affectations créées.
+    """
+    if not _setting('enabled', False):
+        return []
+    with _lock:
+        _load_positions()
+        if not len(grid):
+            return []
+        orders = _open_orders(order_ids)
+        if not orders:
+            return []
+        chosen = plan(orders, _available_loads(), now)
+        now = now or datetime.utcnow()
+        for order_id, deliverer_id, distance in chosen:
+            db.session.add(DeliveryAssignment(
+                order_id=order_id, deliverer_id=deliverer_id, status='assigned',
+                note=f"{AUTO_NOTE} : {distance:.1f} km", created_at=now,
+            ))
+        db.session.commit()
+    return chosen
+
+
+def _start_worker(app, interval):
+    def _run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    dispatch_pending()
+            except Exception as exc:
+                _logger.warning("Affectation automatique impossible: %s", exc)
+
+    threading.Thread(target=_run, name='auto-dispatch', daemon=True).start()
+
+
+def init_dispatch(app):
+    """Réglages, commande `flask dispatch-orders` et passe périodique (si activée)."""
+    global grid, _throttle
+    _config.update(
+        enabled=bool(app.config.get('AUTO_DISPATCH_ENABLED')),
+        max_active=int(app.config.get('DISPATCH_MAX_ACTIVE', 3)),
+        load_penalty_km=float(app.config.get('DISPATCH_LOAD_PENALTY_KM', 2.0)),
+        max_km=float(app.config.get('DISPATCH_MAX_RADIUS_KM', 15.0)),
+        candidates=int(app.config.get('DISPATCH_CANDIDATES', 8)),
+        max_age=timedelta(seconds=int(app.config.get('DELIVERER_POSITION_TTL', 900))),
+        persist_interval=float(app.config.get('DELIVERER_POSITION_PERSIST_INTERVAL', 60)),
+    )
+    grid = DelivererGrid(float(app.config.get('DISPATCH_CELL_KM', 2.0)))
+    _throttle = PositionThrottle(float(app.config.get('DELIVERER_POSITION_MIN_INTERVAL', 10)))
+    _loaded[0] = False
+
+    @app.cli.command('dispatch-orders')
+    def dispatch_orders_command():
+        """Affecte les commandes confirmées au livreur disponible le plus proche."""
+        previous = _config['enabled']
+        _config['enabled'] = True
+        try:
+            chosen = dispatch_pending()
+        finally:
+            _config['enabled'] = previous
+        click.echo(f"✅ {len(chosen)} commande(s) affectée(s)")
+
+    interval = int(app.config.get('DISPATCH_INTERVAL', 30) or 0)
+    if _config['enabled'] and interval > 0 and not app.config.get('TESTING'):
+        workers.register('auto-dispatch', lambda: _start_worker(app, interval))
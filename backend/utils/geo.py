@@ -0,0 +1,199 @@
+"""Positions des livreurs : grille spatiale en mémoire, distances et géohash.
+
+- chaque position signalée (Socket.IO `deliverer:position`) est rangée dans une
+  cellule de `cell_km` de côté (clé entière lat/lon) ; une recherche du plus
+  proche parcourt les anneaux de cellules autour du point et s'arrête dès que
+  l'anneau suivant ne peut plus contenir de livreur plus proche ;
+- positions trop anciennes (`max_age`) ignorées à la recherche ;
+- un seul processus (gunicorn `-w 1`) : la grille est reconstruite au démarrage
+  depuis les dernières positions enregistrées en base.
+"""
+import math
+import threading
+import time
+from datetime import datetime
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (km) entre deux points en degrés."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_point(lat, lon):
+    """(lat, lon) en float si les coordonnées sont utilisables, sinon None."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lon) or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_INDEX = {char: index for index, char in enumerate(_GEOHASH_ALPHABET)}
+
+
+def geohash_encode(lat, lon, precision=6):
+    """Géohash (base 32) du point ; 6 caractères ≈ 1,2 km × 0,6 km."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if target >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_bounds(code):
+    """Cellule du géohash : (sud, ouest, nord, est) ; ValueError si le code est invalide."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in code:
+        if char not in _GEOHASH_INDEX:
+            raise ValueError("Géohash invalide")
+        value = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+class DelivererGrid:
+    """Index des positions livreurs par cellules carrées (degrés) ; sûr entre threads."""
+
+    def __init__(self, cell_km=2.0):
+        self.cell_deg = max(float(cell_km), 0.1) / KM_PER_DEGREE
+        self._cells = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def update(self, deliverer_id, lat, lon, seen_at=None):
+        seen_at = seen_at or datetime.utcnow()
+        cell = self._cell(lat, lon)
+        with self._lock:
+            previous = self._positions.get(deliverer_id)
+            if previous is not None and previous[2] != cell:
+                self._discard(deliverer_id, previous[2])
+            self._positions[deliverer_id] = (lat, lon, cell, seen_at)
+            self._cells.setdefault(cell, set()).add(deliverer_id)
+
+    def remove(self, deliverer_id):
+        with self._lock:
+            previous = self._positions.pop(deliverer_id, None)
+            if previous is not None:
+                self._discard(deliverer_id, previous[2])
+
+    def _discard(self, deliverer_id, cell):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(deliverer_id)
+            if not members:
+                del self._cells[cell]
+
+    def position(self, deliverer_id):
+        """(lat, lon, vu_le) ou None."""
+        entry = self._positions.get(deliverer_id)
+        return entry and (entry[0], entry[1], entry[3])
+
+    def nearest(self, lat, lon, limit=5, max_km=None, accept=None, max_age=None, now=None):
+        """Livreurs les plus proches : liste `(distance_km, deliverer_id)` triée, au plus `limit`.
+
+        `accept(deliverer_id)` filtre les candidats (disponibilité, charge) ;
+        `max_age` (timedelta) écarte les positions trop anciennes.
+        """
+        now = now or datetime.utcnow()
+        row, col = self._cell(lat, lon)
+        cell_km = self.cell_deg * KM_PER_DEGREE
+        max_rings = int(max_km / cell_km) + 2 if max_km else 1000
+        found = []
+
+        def consider(deliverer_id):
+            d_lat, d_lon, _, seen_at = self._positions[deliverer_id]
+            if max_age is not None and now - seen_at > max_age:
+                return
+            if accept is not None and not accept(deliverer_id):
+                return
+            distance = haversine_km(lat, lon, d_lat, d_lon)
+            if not max_km or distance <= max_km:
+                found.append((distance, deliverer_id))
+
+        with self._lock:
+            if not self._positions:
+                return []
+            # Au-delà de la cellule occupée la plus éloignée, les anneaux sont vides
+            reach = min(max_rings, max(max(abs(r - row), abs(c - col)) for r, c in self._cells))
+            if (2 * reach + 1) ** 2 > 4 * len(self._positions):
+                # Grille clairsemée autour du point : un parcours direct coûte moins que les anneaux
+                for deliverer_id in self._positions:
+                    consider(deliverer_id)
+                found.sort()
+                return found[:limit]
+            for ring in range(reach + 1):
+                # Écart minimal entre le point et l'anneau (les degrés de longitude rétrécissent avec la latitude)
+                shrink = math.cos(math.radians(min(89.0, abs(lat) + (ring + 1) * self.cell_deg)))
+                gap = max(ring - 1, 0) * cell_km * shrink
+                if len(found) >= limit and gap > found[limit - 1][0]:
+                    break
+                if max_km and gap > max_km:
+                    break
+                for cell in self._ring(row, col, ring):
+                    for deliverer_id in self._cells.get(cell, ()):
+                        consider(deliverer_id)
+                found.sort()
+        return found[:limit]
+
+    @staticmethod
+    def _ring(row, col, ring):
+        if ring == 0:
+            yield row, col
+            return
+        for dc in range(-ring, ring + 1):
+            yield row - ring, col + dc
+            yield row + ring, col + dc
+        for dr in range(-ring + 1, ring):
+            yield row + dr, col - ring
+            yield row + dr, col + ring
+
+
+class PositionThrottle:
+    """Limite la fréquence des positions acceptées par livreur (horloge monotone)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = float(min_interval)
+        self._last = {}
+
+    def allow(self, key):
+        tick = time.monotonic()
+        if tick - self._last.get(key, -self.min_interval - 1) < self.min_interval:
+            return False
+        self._last[key] = tick
+        return True
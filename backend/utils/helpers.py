@@ -48,8 +48,8 @@ def get_first_image_url(product):
     if cleaned.startswith('static/'):
         cleaned = cleaned[len('static/'):]
 
-    # Si le chemin inclut déjà uploads/products, ne pas le dupliquer
-    if cleaned.startswith('uploads/'):
+    # Si le chemin inclut déjà uploads/products (ou désigne une couverture générée), ne pas le dupliquer
+    if cleaned.startswith(('uploads/', 'seed/')):
         static_path = cleaned
     elif cleaned.startswith('products/'):
         static_path = os.path.join('uploads', cleaned)
@@ -0,0 +1,179 @@
+"""GET conditionnel (ETag / Last-Modified) pour les pages catalogue des visiteurs anonymes.
+
+`ShopSettings.catalog_version` est incrémenté dans la transaction qui modifie un
+produit ou une catégorie (flush ORM ou update/delete en masse) : l'ETag d'une page
+liste dépend de ce compteur, celui d'une fiche produit de son `updated_at`.
+
+Les pages embarquent un jeton CSRF horodaté : l'ETag inclut une tranche de temps
+(un quart de `WTF_CSRF_TIME_LIMIT`) pour qu'une copie revalidée par 304 ne serve
+jamais un jeton expiré. Il inclut aussi une empreinte du secret CSRF de la session
+(nouveau secret => nouvelle page) et la version de l'instantané des taux de change
+(prix convertis).
+
+`user_conditional_page` applique le même mécanisme à une page d'utilisateur
+connecté (ex : tableau de bord livreur), l'ETag incluant son identifiant.
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from backend.utils import currency
+from backend.utils.page_cache import is_anonymous_page_request
+
+SESSION_BUMPED_KEY = 'catalog_version_bumped'
+
+_config = {}
+_listeners_installed = False
+
+
+def _bump_catalog_version(session_):
+    """Une seule incrémentation par transaction (SQL Core : ni flush ni événement ORM)."""
+    if session_.info.get(SESSION_BUMPED_KEY):
+        return
+    session_.info[SESSION_BUMPED_KEY] = True
+    table = _config['settings_model'].__table__
+    conn = session_.connection()
+    result = conn.execute(table.update().values(catalog_version=func.coalesce(table.c.catalog_version, 0) + 1))
+    if not result.rowcount:
+        conn.execute(table.insert().values(catalog_version=1))
+
+
+def _after_flush(session_, flush_context):
+    models = _config.get('catalog_models')
+    if not models:
+        return
+    for obj in list(session_.new) + list(session_.dirty) + list(session_.deleted):
+        if isinstance(obj, models):
+            _bump_catalog_version(session_)
+            return
+
+
+def _do_orm_execute(state):
+    models = _config.get('catalog_models')
+    if not models or not (state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, models):
+        _bump_catalog_version(state.session)
+
+
+def _reset(session_):
+    session_.info.pop(SESSION_BUMPED_KEY, None)
+
+
+def init_catalog_versioning(catalog_models, settings_model):
+    """Incrémente `settings_model.catalog_version` à chaque modification de `catalog_models`."""
+    global _listeners_installed
+    _config['catalog_models'] = tuple(catalog_models)
+    _config['settings_model'] = settings_model
+    if not _listeners_installed:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _reset)
+        event.listen(Session, 'after_rollback', _reset)
+        _listeners_installed = True
+
+
+def _csrf_bucket():
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if not limit:
+        return 0
+    return int(time.time() // max(60, int(limit) // 4))
+
+
+def _csrf_secret_digest():
+    secret = session.get('csrf_token')
+    if not secret:
+        return ''
+    return hashlib.sha1(str(secret).encode('utf-8')).hexdigest()[:8]
+
+
+def _rates_version():
+    try:
+        return currency.snapshot().version
+    except Exception:
+        return ''
+
+
+def _etag_for(parts):
+    raw = '|'.join(str(p) for p in parts + (
+        request.full_path,
+        session.get('currency') or '',
+        session.get('theme') or '',
+        _csrf_bucket(),
+        _csrf_secret_digest(),
+        _rates_version(),
+    ))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def _respond(view, args, kwargs, parts, last_modified):
+    etag = _etag_for(tuple(parts))
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.replace(microsecond=0)
+
+    not_modified = False
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif last_modified and request.if_modified_since:
+        not_modified = last_modified <= request.if_modified_since.replace(tzinfo=None)
+    if not_modified:
+        resp = make_response('', 304)
+    else:
+        resp = make_response(view(*args, **kwargs))
+        if resp.status_code != 200:
+            return resp
+        # Le rendu a pu créer le secret CSRF de la session : ETag de la page effectivement servie
+        etag = _etag_for(tuple(parts))
+    resp.set_etag(etag, weak=True)
+    if last_modified:
+        resp.last_modified = last_modified
+    # La page contient le jeton CSRF de la session : cache navigateur uniquement, revalidé à chaque visite
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+def conditional_page(validators):
+    """Répond 304 si la copie du navigateur est à jour (visiteurs anonymes uniquement).
+
+    `validators(**view_args)` retourne `(parties_etag, last_modified)` ou None pour
+    laisser la vue répondre normalement (ex : 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not is_anonymous_page_request():
+                return view(*args, **kwargs)
+            state = validators(**kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            return _respond(view, args, kwargs, *state)
+        return wrapped
+    return decorator
+
+
+def user_conditional_page(validators):
+    """Variante de `conditional_page` pour une page propre à l'utilisateur connecté.
+
+    L'ETag inclut l'identifiant de session de connexion (`get_id()`) ; une page avec
+    un flash en attente est toujours rendue.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or not current_user.is_authenticated
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+            state = validators(**kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            parts, last_modified = state
+            return _respond(view, args, kwargs, tuple(parts) + (current_user.get_id(),), last_modified)
+        return wrapped
+    return decorator
@@ -0,0 +1,110 @@
+"""Clés d'idempotence pour l'API JSON (panier, commande).
+
+Le client envoie `Idempotency-Key: <uuid>` ; la première requête réserve la clé
+(ligne `idempotency_keys` sans statut), s'exécute, puis mémorise sa réponse. Une
+répétition (réseau mobile, double clic) reçoit la même réponse avec l'en-tête
+`Idempotent-Replayed: true` sans rien ré-exécuter — pas de seconde commande.
+
+- même clé, corps différent : 422 ;
+- même clé pendant que la première requête s'exécute : 409 ;
+- réponse 5xx (ou 409/429) : la réservation est libérée pour permettre un nouvel essai.
+
+Les lignes sont écrites sur une connexion distincte de `db.session` (la transaction
+de la vue reste indépendante) et purgées après `IDEMPOTENCY_TTL_HOURS`.
+"""
+import hashlib
+import re
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request, jsonify, make_response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import db, IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+_KEY_RE = re.compile(r'^[A-Za-z0-9_\-:.]{8,128}$')
+_PURGE_INTERVAL = 600
+_last_purge = [0.0]
+
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _error(code, message, status):
+    return jsonify({'ok': False, 'error': code, 'message': message}), status
+
+
+def _purge_expired(conn):
+    now = time.monotonic()
+    if now - _last_purge[0] < _PURGE_INTERVAL:
+        return
+    _last_purge[0] = now
+    ttl = float(current_app.config.get('IDEMPOTENCY_TTL_HOURS', 24))
+    table = IdempotencyKey.__table__
+    conn.execute(table.delete().where(table.c.created_at < datetime.utcnow() - timedelta(hours=ttl)))
+
+
+def idempotent(scope):
+    """Rend une vue JSON rejouable sans effet de bord ; `scope()` identifie le client."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            key = (request.headers.get(HEADER) or '').strip()
+            if not key:
+                return view(*args, **kwargs)
+            if not _KEY_RE.match(key):
+                return _error('invalid_idempotency_key', "En-tête Idempotency-Key invalide.", 400)
+
+            table = IdempotencyKey.__table__
+            scope_value = scope()
+            req_hash = _request_hash()
+            where = (table.c.scope == scope_value) & (table.c.key == key)
+            try:
+                with db.engine.begin() as conn:
+                    _purge_expired(conn)
+                    conn.execute(table.insert().values(
+                        scope=scope_value, key=key, endpoint=request.endpoint or '',
+                        request_hash=req_hash, created_at=datetime.utcnow(),
+                    ))
+            except IntegrityError:
+                with db.engine.connect() as conn:
+                    row = conn.execute(
+                        select(table.c.request_hash, table.c.status_code, table.c.response_body).where(where)
+                    ).first()
+                if row is None or row.status_code is None:
+                    return _error('request_in_progress', "Requête identique déjà en cours.", 409)
+                if row.request_hash != req_hash:
+                    return _error('idempotency_key_reused', "Clé déjà utilisée pour une autre requête.", 422)
+                replay = current_app.response_class(row.response_body, status=row.status_code,
+                                                    mimetype='application/json')
+                replay.headers['Idempotent-Replayed'] = 'true'
+                return replay
+
+            def _release():
+                with db.engine.begin() as conn:
+                    conn.execute(table.delete().where(where))
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                _release()
+                raise
+            if response.status_code >= 500 or response.status_code in (409, 429) or not response.is_json:
+                _release()
+                return response
+            with db.engine.begin() as conn:
+                conn.execute(table.update().where(where).values(
+                    status_code=response.status_code,
+                    response_body=response.get_data(as_text=True),
+                ))
+            return response
+        return wrapped
+    return decorator
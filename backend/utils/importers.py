@@ -0,0 +1,195 @@
+"""Lecture des fichiers d'import du catalogue (produits, catégories).
+
+Fonctions pures (sans contexte Flask) : elles sont utilisées par les routes
+d'import de l'admin et par les microbenchmarks (`scripts/microbench.py`).
+Les lecteurs XLSX/DOCX/PDF sont importés à la demande.
+"""
+import csv
+import os
+import re
+from io import TextIOWrapper
+
+from werkzeug.utils import secure_filename
+
+
+def normalize_key(key: str) -> str:
+    value = str(key or '').strip().lower()
+    value = re.sub(r'[^a-z0-9]+', '_', value)
+    return value.strip('_')
+
+def normalize_row(row: dict) -> dict:
+    normalized = {}
+    for key, value in (row or {}).items():
+        if key is None:
+            continue
+        norm = normalize_key(key)
+        if not norm:
+            continue
+        normalized[norm] = value
+    return normalized
+
+def row_get(row: dict, keys: tuple[str, ...]):
+    for key in keys:
+        value = row.get(key)
+        if value is None:
+            continue
+        if isinstance(value, str) and not value.strip():
+            continue
+        return value
+    return None
+
+def clean_number(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    text = text.replace(' ', '').replace(',', '.')
+    text = re.sub(r'[^0-9\\.-]', '', text)
+    if not text or text in {'.', '-', '-.'}:
+        return None
+    try:
+        return float(text)
+    except Exception:
+        return None
+
+def parse_int(value, default=0):
+    number = clean_number(value)
+    if number is None:
+        return default
+    return int(number)
+
+def parse_float(value, default=None):
+    number = clean_number(value)
+    if number is None:
+        return default
+    return float(number)
+
+def parse_bool(value, default=False):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y', 'oui', 'on', 'active', 'actif'):
+        return True
+    if text in ('0', 'false', 'no', 'non', 'off', 'inactive', 'inactif'):
+        return False
+    return default
+
+def read_rows_from_file(file_storage):
+    """Lit un fichier d'import (CSV, TXT/TSV, XLSX, DOCX, PDF) et retourne une liste de dicts par ligne."""
+    if not file_storage or not file_storage.filename:
+        raise ValueError("Aucun fichier fourni.")
+    filename = secure_filename(file_storage.filename)
+    ext = os.path.splitext(filename)[1].lower()
+    def _rows_from_lines(lines):
+        if not lines:
+            return []
+        sample = "\n".join(lines[:5])
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,|\\t")
+        except Exception:
+            dialect = csv.excel
+        reader = csv.reader(lines, dialect=dialect)
+        rows = list(reader)
+        if not rows:
+            return []
+        headers = [str(h).strip() if h is not None else '' for h in rows[0]]
+        data = []
+        for row in rows[1:]:
+            if not row:
+                continue
+            row_map = {}
+            for idx, header in enumerate(headers):
+                if not header:
+                    continue
+                value = row[idx] if idx < len(row) else None
+                row_map[header] = value
+            if any(v is not None and str(v).strip() != '' for v in row_map.values()):
+                data.append(row_map)
+        return data
+    if ext == '.csv':
+        text_stream = TextIOWrapper(file_storage.stream, encoding='utf-8-sig')
+        sample = text_stream.read(2048)
+        text_stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample)
+        except Exception:
+            dialect = csv.excel
+        reader = csv.DictReader(text_stream, dialect=dialect)
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if any(v is not None and str(v).strip() != '' for v in row.values()):
+                rows.append(row)
+        return rows
+    if ext in ('.txt', '.tsv'):
+        file_storage.stream.seek(0)
+        text = file_storage.stream.read().decode('utf-8', errors='ignore')
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        return _rows_from_lines(lines)
+    if ext in ('.xlsx', '.xlsm', '.xltx', '.xltm'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_storage, read_only=True, data_only=True)
+        sheet = workbook.active
+        rows = list(sheet.iter_rows(values_only=True))
+        if not rows:
+            return []
+        headers = [str(h).strip() if h is not None else '' for h in rows[0]]
+        data = []
+        for row in rows[1:]:
+            if not row:
+                continue
+            row_map = {}
+            for idx, header in enumerate(headers):
+                if not header:
+                    continue
+                value = row[idx] if idx < len(row) else None
+                row_map[header] = value
+            if any(v is not None and str(v).strip() != '' for v in row_map.values()):
+                data.append(row_map)
+        return data
+    if ext == '.docx':
+        from docx import Document
+        file_storage.stream.seek(0)
+        doc = Document(file_storage)
+        data = []
+        if doc.tables:
+            for table in doc.tables:
+                if not table.rows:
+                    continue
+                headers = [cell.text.strip() for cell in table.rows[0].cells]
+                for row in table.rows[1:]:
+                    row_map = {}
+                    for idx, cell in enumerate(row.cells):
+                        if idx >= len(headers):
+                            continue
+                        header = headers[idx]
+                        if not header:
+                            continue
+                        row_map[header] = cell.text.strip()
+                    if any(v is not None and str(v).strip() != '' for v in row_map.values()):
+                        data.append(row_map)
+        if not data:
+            lines = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+            return _rows_from_lines(lines)
+        return data
+    if ext == '.pdf':
+        from PyPDF2 import PdfReader
+        file_storage.stream.seek(0)
+        reader = PdfReader(file_storage)
+        text_parts = []
+        for page in reader.pages:
+            content = page.extract_text() or ''
+            if content.strip():
+                text_parts.append(content)
+        text = "\n".join(text_parts).strip()
+        if not text:
+            return []
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        return _rows_from_lines(lines)
+    raise ValueError("Format non supporte. Utilisez CSV, XLSX, DOCX, PDF, TXT ou TSV.")
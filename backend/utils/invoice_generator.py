@@ -6,6 +6,7 @@ import qrcode
 from io import BytesIO
 from datetime import datetime, timedelta
 from flask import current_app
+from backend.utils.currency import get_rate
 import textwrap
 
 
@@ -26,21 +27,13 @@ def generate_invoice_pdf(order, target_currency=None):
     base_currency = (settings.currency if settings and settings.currency else current_app.config.get('BASE_CURRENCY', 'USD')).upper()
     available_currencies = [curr.upper() for curr in current_app.config.get('AVAILABLE_CURRENCIES', ['USD', 'CDF'])]
 
-    def get_rate(from_currency: str, to_currency: str) -> float:
-        if not from_currency or not to_currency or from_currency == to_currency:
-            return 1.0
-        rates = {
-            ('USD', 'CDF'): 2200.0,
-            ('CDF', 'USD'): 1 / 2200.0,
-        }
-        return rates.get((from_currency.upper(), to_currency.upper()), 1.0)
-
     currency = (target_currency or base_currency or "USD").upper()
     if currency not in available_currencies:
         currency = base_currency
 
+    rate = get_rate(base_currency, currency)
+
     def convert_amount(amount: float) -> float:
-        rate = get_rate(base_currency, currency)
         try:
             return round(float(amount) * rate, 2)
         except Exception:
@@ -0,0 +1,247 @@
+"""Grand livre des commissions livreurs : écritures en ajout seul, soldes et totaux agrégés.
+
+- chaque mouvement (crédit de livraison, bonus dimanche, bonus hebdo, paiement,
+  ajustement) est une ligne `commission_ledger` avec son solde courant ;
+  `Deliverer.commission_due` reste le solde dénormalisé, ajusté par UPDATE
+  `commission_due = commission_due + montant` dans la même transaction ;
+- paiement : une écriture de solde négatif et un seul UPDATE des affectations ;
+- totaux du mois : un agrégat sur l'index (livreur, date) ; totaux cumulés :
+  instantanés mensuels `commission_snapshots` (mois clos) + agrégat du mois en cours.
+
+Les montants sont calculés par `backend.utils.commissions` (fonctions pures).
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+import click
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import db, CommissionEntry, CommissionSnapshot, Deliverer, DeliveryAssignment
+from backend.utils import workers
+from backend.utils.commissions import commission_for_amount
+
+_logger = logging.getLogger(__name__)
+
+KINDS = ('credit', 'sunday_bonus', 'weekly_bonus', 'payout', 'adjustment')
+EARNED = ('credit', 'sunday_bonus', 'weekly_bonus')
+
+
+def month_start(value=None):
+    value = value or datetime.utcnow()
+    return date(value.year, value.month, 1)
+
+
+def next_month(value):
+    return date(value.year + (value.month == 12), value.month % 12 + 1, 1)
+
+
+def _as_datetime(day):
+    return datetime(day.year, day.month, day.day)
+
+
+def record(deliverer_id, kind, amount, assignment_id=None, deliveries=0, week_start=None, note=None):
+    """Ajoute une écriture et met à jour le solde du livreur (sans commit)."""
+    # Montant arrondi une seule fois : le solde avance exactement de ce qui est écrit au grand livre
+    amount = round(float(amount), 2)
+    deliverers = Deliverer.__table__
+    db.session.execute(
+        deliverers.update().where(deliverers.c.id == deliverer_id)
+        .values(commission_due=func.coalesce(deliverers.c.commission_due, 0) + amount)
+    )
+    balance = db.session.execute(
+        select(deliverers.c.commission_due).where(deliverers.c.id == deliverer_id)
+    ).scalar() or 0.0
+    # Instance déjà chargée : relire le solde à la prochaine lecture
+    loaded = db.session.identity_map.get(db.session.identity_key(Deliverer, deliverer_id))
+    if loaded is not None:
+        db.session.expire(loaded, ['commission_due'])
+    entry = CommissionEntry(
+        deliverer_id=deliverer_id, kind=kind, amount=amount, balance=round(float(balance), 2),
+        assignment_id=assignment_id, deliveries=deliveries, week_start=week_start, note=note,
+        created_at=datetime.utcnow(),
+    )
+    db.session.add(entry)
+    return entry
+
+
+def credit_assignment(assignment):
+    """Crédite la commission de base (+ bonus dimanche) d'une livraison terminée ; montant crédité."""
+    if assignment.commission_recorded or not assignment.deliverer_id or not assignment.order:
+        return 0.0
+    now = datetime.utcnow()
+    total = float(assignment.order.total_amount or 0)
+    base = commission_for_amount(total)
+    # Bonus 5% si livraison finalisée un dimanche
+    sunday = 0.05 * total if (assignment.completed_at or now).weekday() == 6 else 0.0
+    note = assignment.order.order_number
+    record(assignment.deliverer_id, 'credit', base, assignment_id=assignment.id, deliveries=1, note=note)
+    if sunday:
+        record(assignment.deliverer_id, 'sunday_bonus', sunday, assignment_id=assignment.id, note=note)
+    assignment.commission_recorded = True
+    assignment.completed_at = assignment.completed_at or now
+    assignment.payout_status = assignment.payout_status or 'pending'
+    return base + sunday
+
+
+def pay_out(deliverer_id):
+    """Solde le livreur : une écriture de paiement et un UPDATE des affectations (sans commit)."""
+    deliverers = Deliverer.__table__
+    assignments = DeliveryAssignment.__table__
+    now = datetime.utcnow()
+    balance = db.session.execute(
+        select(deliverers.c.commission_due).where(deliverers.c.id == deliverer_id).with_for_update()
+    ).scalar() or 0.0
+    # Connexion de la session (même transaction) : colonnes de paiement seulement, hors cumuls de livraisons
+    paid = db.session.connection().execute(
+        assignments.update()
+        .where(assignments.c.deliverer_id == deliverer_id, assignments.c.payout_status != 'paid')
+        .values(payout_status='paid', commission_recorded=True,
+                status=func.coalesce(assignments.c.status, 'delivered'),
+                completed_at=func.coalesce(assignments.c.completed_at, now), updated_at=now)
+    ).rowcount
+    if not balance and not paid:
+        return None
+    return record(deliverer_id, 'payout', -balance, deliveries=paid or 0, note=f"{paid or 0} livraison(s)")
+
+
+def _sums(deliverer_id, start=None, end=None):
+    query = (select(CommissionEntry.kind, func.sum(CommissionEntry.amount), func.sum(CommissionEntry.deliveries))
+             .where(CommissionEntry.deliverer_id == deliverer_id))
+    if start is not None:
+        query = query.where(CommissionEntry.created_at >= _as_datetime(start))
+    if end is not None:
+        query = query.where(CommissionEntry.created_at < _as_datetime(end))
+    totals = dict.fromkeys(KINDS, 0.0)
+    totals.update(deliveries=0, deliveries_paid=0)
+    for kind, amount, deliveries in db.session.execute(query.group_by(CommissionEntry.kind)):
+        if kind == 'payout':
+            totals['payout'] += -float(amount or 0)
+            totals['deliveries_paid'] += int(deliveries or 0)
+        else:
+            totals[kind] = totals.get(kind, 0.0) + float(amount or 0)
+            if kind == 'credit':
+                totals['deliveries'] += int(deliveries or 0)
+    return totals
+
+
+def _finish(totals):
+    totals['earned'] = sum(totals[kind] for kind in EARNED)
+    totals['base'] = totals['credit'] + totals['sunday_bonus']
+    return totals
+
+
+def month_totals(deliverer_id, month=None):
+    """Totaux d'un mois (par défaut le mois courant) : un agrégat indexé."""
+    month = month or month_start()
+    return _finish(_sums(deliverer_id, month, next_month(month)))
+
+
+def _snapshot_values(deliverer_id, month):
+    totals = _sums(deliverer_id, month, next_month(month))
+    closing = db.session.execute(
+        select(CommissionEntry.balance)
+        .where(CommissionEntry.deliverer_id == deliverer_id,
+               CommissionEntry.created_at < _as_datetime(next_month(month)))
+        .order_by(CommissionEntry.created_at.desc(), CommissionEntry.id.desc()).limit(1)
+    ).scalar()
+    return {
+        'credit': totals['credit'], 'sunday_bonus': totals['sunday_bonus'],
+        'weekly_bonus': totals['weekly_bonus'], 'payout': totals['payout'],
+        'adjustment': totals['adjustment'], 'deliveries': totals['deliveries'],
+        'deliveries_paid': totals['deliveries_paid'], 'closing_balance': closing or 0.0,
+    }
+
+
+def snapshot_closed_months(deliverer_id, today=None):
+    """Fige les mois clos non encore résumés du livreur ; nombre d'instantanés créés."""
+    current = month_start(today)
+    last = db.session.execute(
+        select(func.max(CommissionSnapshot.month)).where(CommissionSnapshot.deliverer_id == deliverer_id)
+    ).scalar()
+    if last is not None:
+        start = next_month(last)
+    else:
+        first = db.session.execute(
+            select(func.min(CommissionEntry.created_at)).where(CommissionEntry.deliverer_id == deliverer_id)
+        ).scalar()
+        if first is None:
+            return 0
+        start = month_start(first)
+    created = 0
+    month = start
+    while month < current:
+        values = _snapshot_values(deliverer_id, month)
+        try:
+            with db.session.begin_nested():
+                db.session.add(CommissionSnapshot(deliverer_id=deliverer_id, month=month, **values))
+            created += 1
+        except IntegrityError:
+            # Mois déjà figé par une autre passe
+            pass
+        month = next_month(month)
+    return created
+
+
+def snapshot_all(today=None):
+    """Fige les mois clos de tous les livreurs ayant des écritures (commit)."""
+    ids = [row[0] for row in db.session.execute(select(CommissionEntry.deliverer_id).distinct())]
+    created = sum(snapshot_closed_months(deliverer_id, today) for deliverer_id in ids)
+    db.session.commit()
+    return created
+
+
+def lifetime_totals(deliverer_id, today=None):
+    """Totaux cumulés : instantanés des mois clos + agrégat du mois en cours."""
+    snapshot_closed_months(deliverer_id, today)
+    current = month_start(today)
+    totals = _sums(deliverer_id, current)
+    row = db.session.execute(
+        select(*(func.coalesce(func.sum(getattr(CommissionSnapshot, name)), 0)
+                 for name in KINDS + ('deliveries', 'deliveries_paid')))
+        .where(CommissionSnapshot.deliverer_id == deliverer_id, CommissionSnapshot.month < current)
+    ).one()
+    for name, value in zip(KINDS + ('deliveries', 'deliveries_paid'), row):
+        totals[name] += value or 0
+    return _finish(totals)
+
+
+def monthly_history(deliverer_id, limit=12, today=None):
+    """Mois les plus récents (instantanés + mois en cours), du plus récent au plus ancien."""
+    snapshot_closed_months(deliverer_id, today)
+    current = month_start(today)
+    rows = [{'month': current, **month_totals(deliverer_id, current)}]
+    snapshots = (CommissionSnapshot.query
+                 .filter(CommissionSnapshot.deliverer_id == deliverer_id, CommissionSnapshot.month < current)
+                 .order_by(CommissionSnapshot.month.desc()).limit(max(limit - 1, 0)).all())
+    for snap in snapshots:
+        rows.append(_finish({'month': snap.month, **{name: getattr(snap, name)
+                                                    for name in KINDS + ('deliveries', 'deliveries_paid')}}))
+    return rows
+
+
+def _start_worker(app, interval):
+    def _run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    snapshot_all()
+            except Exception as exc:
+                _logger.warning("Instantanés des commissions impossibles: %s", exc)
+
+    threading.Thread(target=_run, name='commission-snapshots', daemon=True).start()
+
+
+def init_ledger(app):
+    """Commande `flask snapshot-commissions` et passe périodique des instantanés mensuels."""
+    @app.cli.command('snapshot-commissions')
+    def snapshot_commissions_command():
+        """Fige les totaux des mois clos de chaque livreur."""
+        click.echo(f"✅ {snapshot_all()} instantané(s) mensuel(s) créé(s)")
+
+    interval = int(app.config.get('COMMISSION_SNAPSHOT_INTERVAL', 21600) or 0)
+    if interval > 0 and not app.config.get('TESTING'):
+        workers.register('commission-snapshots', lambda: _start_worker(app, interval))
@@ -0,0 +1,177 @@
+"""Service des médias uploadés (images, vidéos produit, pièces jointes du forum).
+
+L'app autorise la requête puis délègue le transfert :
+
+- `MEDIA_OFFLOAD=x-accel` : en-tête `X-Accel-Redirect` vers `MEDIA_ACCEL_PREFIX`
+  (location `internal` nginx pointant sur le dossier statique) ;
+- `MEDIA_OFFLOAD=x-sendfile` : en-tête `X-Sendfile` (Apache mod_xsendfile, lighttpd) ;
+- sinon : envoi direct par le serveur WSGI. Les requêtes `Range` (lecture vidéo,
+  reprise) sont traitées ici : le fichier est positionné sur le début de la plage et
+  remis à `wsgi.file_wrapper`, que gunicorn transmet par `sendfile` (zéro copie,
+  borné par Content-Length) au lieu de relire le fichier par blocs en Python.
+
+Les pièces jointes du forum (`MEDIA_PROTECTED_PREFIXES`) exigent un utilisateur connecté.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from zlib import adler32
+
+from flask import current_app, request, Response, send_from_directory
+from flask_login import current_user
+from werkzeug.http import parse_if_range_header, parse_range_header
+
+from backend.utils.compression import PRECOMPRESS_EXTENSIONS
+
+_RANGE_BLOCK_SIZE = 64 * 1024
+_SAFE_PATH_RE = re.compile(r'^[\w\-./]+$')
+
+
+def _prefixes(key, default):
+    value = current_app.config.get(key, default)
+    if isinstance(value, str):
+        value = [p.strip() for p in value.split(',')]
+    return tuple(p.strip('/') + '/' for p in value if p and p.strip('/'))
+
+
+def normalize(filename):
+    """Chemin relatif canonique (`a/b.txt`) tel que `safe_join` le sert ; None s'il remonte (`..`).
+
+    Les segments vides et `.` sont retirés : `uploads//forum/x` et `./uploads/forum/x`
+    désignent le même fichier que `uploads/forum/x` et doivent passer les mêmes contrôles.
+    """
+    parts = [part for part in filename.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts:
+        return None
+    return posixpath.normpath('/'.join(parts))
+
+
+def is_protected(filename):
+    """Pièce jointe réservée aux connectés ; un chemin non normalisable est traité comme protégé."""
+    filename = normalize(filename)
+    if filename is None:
+        return True
+    return filename.startswith(_prefixes('MEDIA_PROTECTED_PREFIXES', ('uploads/forum',)))
+
+
+def is_offloaded(filename):
+    """Médias uploadés non compressibles (les SVG/JS/CSS gardent leurs variantes .gz/.br)."""
+    filename = normalize(filename)
+    if filename is None or filename.lower().endswith(PRECOMPRESS_EXTENSIONS):
+        return False
+    return filename.startswith(_prefixes('MEDIA_OFFLOAD_PREFIXES', ('uploads',)))
+
+
+def authorize(filename):
+    """None si l'accès est permis, sinon la réponse à renvoyer (redirection vers la connexion)."""
+    if not is_protected(filename) or current_user.is_authenticated:
+        return None
+    login_manager = getattr(current_app, 'login_manager', None)
+    if login_manager is not None:
+        return login_manager.unauthorized()
+    return Response(status=401)
+
+
+def _cache_headers(response, max_age):
+    """Mêmes en-têtes de cache que `send_file`."""
+    if max_age:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = max_age
+        response.cache_control.public = True
+    else:
+        response.cache_control.no_cache = True
+
+
+def apply_privacy(response, filename):
+    """Un média protégé ne doit jamais être stocké par un cache partagé."""
+    if is_protected(filename):
+        response.cache_control.public = None
+        response.cache_control.private = True
+    return response
+
+
+def _offload_response(mode, path, filename, mimetype, max_age):
+    response = Response(mimetype=mimetype)
+    if mode == 'x-accel':
+        prefix = current_app.config.get('MEDIA_ACCEL_PREFIX', '/_protected_media').rstrip('/')
+        location = f"{prefix}/{filename.lstrip('/')}"
+        if not _SAFE_PATH_RE.match(location):
+            from urllib.parse import quote
+            location = quote(location)
+        response.headers['X-Accel-Redirect'] = location
+    else:
+        response.headers['X-Sendfile'] = path
+    _cache_headers(response, max_age)
+    return response
+
+
+def _file_body(fh, start, length):
+    """Corps pour une plage : `wsgi.file_wrapper` de gunicorn (sendfile), sinon lecture bornée."""
+    fh.seek(start)
+    wrapper = request.environ.get('wsgi.file_wrapper')
+    if wrapper is not None and type(wrapper).__module__.startswith('gunicorn'):
+        # gunicorn envoie depuis la position courante sans dépasser Content-Length
+        return wrapper(fh, _RANGE_BLOCK_SIZE)
+
+    def _limited():
+        remaining = length
+        try:
+            while remaining > 0:
+                chunk = fh.read(min(_RANGE_BLOCK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            fh.close()
+    return _limited()
+
+
+def _range_response(path, mimetype, max_age):
+    """Réponse 206/416 pour une requête Range simple ; None pour laisser un envoi complet."""
+    stat = os.stat(path)
+    size = stat.st_size
+    # Même ETag que `send_file` pour que If-Range concorde avec la réponse complète
+    etag = f"{stat.st_mtime}-{size}-{adler32(path.encode()) & 0xFFFFFFFF}"
+    # If-Range périmé : renvoyer le fichier complet
+    if_range = parse_if_range_header(request.headers.get('If-Range'))
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and if_range.date.timestamp() < int(stat.st_mtime):
+        return None
+    ranges = parse_range_header(request.headers.get('Range'))
+    if ranges is None or len(ranges.ranges) != 1:
+        return None
+    bounds = ranges.range_for_length(size)
+    if bounds is None:
+        response = Response(status=416, mimetype=mimetype)
+        response.headers['Content-Range'] = f"bytes */{size}"
+        return response
+    start, stop = bounds
+    length = stop - start
+    fh = open(path, 'rb')
+    response = Response(_file_body(fh, start, length), status=206, mimetype=mimetype, direct_passthrough=True)
+    response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+    response.headers['Content-Length'] = str(length)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.set_etag(etag)
+    response.last_modified = stat.st_mtime
+    _cache_headers(response, max_age)
+    return response
+
+
+def send_media(directory, filename, path, max_age=None):
+    """Envoie un média uploadé selon `MEDIA_OFFLOAD` (déjà autorisé par l'appelant)."""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    mode = (current_app.config.get('MEDIA_OFFLOAD') or '').lower()
+    if mode in ('x-accel', 'x-sendfile'):
+        return apply_privacy(_offload_response(mode, path, filename, mimetype, max_age), filename)
+    if request.headers.get('Range') and request.method == 'GET':
+        response = _range_response(path, mimetype, max_age)
+        if response is not None:
+            return apply_privacy(response, filename)
+    # Fichier complet : Flask passe déjà par `wsgi.file_wrapper` (sendfile sous gunicorn)
+    response = send_from_directory(directory, filename, max_age=max_age, mimetype=mimetype)
+    response.headers['Accept-Ranges'] = 'bytes'
+    return apply_privacy(response, filename)
@@ -0,0 +1,233 @@
+"""Cache de pages rendues pour les visiteurs anonymes (accueil, catalogue, pages légales).
+
+Clé : chemin + paramètres de requête autorisés + devise + thème de la session.
+Le cache est contourné pour les utilisateurs connectés, les messages flash en attente,
+un panier invité non vide et les requêtes autres que GET/HEAD.
+
+Le jeton CSRF (lié à la session) est remplacé par un marqueur avant stockage puis
+par le jeton du visiteur courant au moment de servir la page.
+
+Invalidation par étiquettes : les modifications ORM (flush ou update/delete en masse)
+des modèles étiquetés sont collectées et purgées après le commit. Le cache est local
+au processus : avec plusieurs workers, la durée de vie (`PAGE_CACHE_TTL`) borne
+l'obsolescence.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session, g, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF__'
+SESSION_TAGS_KEY = 'page_cache_tags'
+
+
+class PageCache:
+    """LRU + TTL avec index étiquette -> clés (thread/greenlet-safe)."""
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, entry, tags)
+        self._tags = {}  # tag -> set(keys)
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation : une page rendue pendant une invalidation n'est pas stockée
+        self.version = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, entry, tags, version=None):
+        with self._lock:
+            if version is not None and version != self.version:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, entry, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            return True
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            self.version += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key):
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._tags.pop(tag, None)
+
+
+def _tagged_models():
+    try:
+        return current_app.extensions['page_cache_models']
+    except (RuntimeError, KeyError):
+        return None
+
+
+def _collect(session_, objects):
+    models = _tagged_models()
+    if not models:
+        return
+    tags = session_.info.setdefault(SESSION_TAGS_KEY, set())
+    for obj in objects:
+        tag = models.get(type(obj))
+        if tag:
+            tags.add(tag)
+
+
+def _after_flush(session_, flush_context):
+    _collect(session_, list(session_.new) + list(session_.dirty) + list(session_.deleted))
+
+
+def _do_orm_execute(state):
+    # Query.update()/delete() en masse ne passent pas par le flush
+    if not (state.is_update or state.is_delete):
+        return
+    models = _tagged_models()
+    mapper = state.bind_mapper
+    if models and mapper is not None and models.get(mapper.class_):
+        state.session.info.setdefault(SESSION_TAGS_KEY, set()).add(models[mapper.class_])
+
+
+def _after_commit(session_):
+    tags = session_.info.pop(SESSION_TAGS_KEY, None)
+    if not tags:
+        return
+    try:
+        cache = current_app.extensions.get('page_cache')
+    except RuntimeError:
+        return
+    if cache is not None:
+        cache.invalidate_tags(*tags)
+
+
+def _after_rollback(session_):
+    session_.info.pop(SESSION_TAGS_KEY, None)
+
+
+_listeners_installed = False
+
+
+def init_page_cache(app, tagged_models):
+    """Active le cache pour l'app ; `tagged_models` = {Modèle: étiquette} à invalider."""
+    global _listeners_installed
+    app.extensions['page_cache'] = PageCache(
+        max_entries=int(app.config.get('PAGE_CACHE_MAX_ENTRIES', 512)),
+        ttl=int(app.config.get('PAGE_CACHE_TTL', 300)),
+    )
+    app.extensions['page_cache_models'] = dict(tagged_models)
+    if not _listeners_installed:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        _listeners_installed = True
+    return app.extensions['page_cache']
+
+
+def invalidate(*tags):
+    """Invalidation explicite (ex : modifications hors ORM)."""
+    cache = current_app.extensions.get('page_cache')
+    if cache is not None:
+        cache.invalidate_tags(*tags)
+
+
+def is_anonymous_page_request():
+    """GET/HEAD d'un visiteur anonyme sans flash en attente ni panier : page identique pour tous."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if current_user.is_authenticated:
+        return False
+    return not (session.get('_flashes') or session.get('guest_cart'))
+
+
+def _cache_key(query_args):
+    """Clé de cache de la requête courante, ou None si la page doit être rendue normalement."""
+    if not current_app.config.get('PAGE_CACHE_ENABLED', True):
+        return None
+    if not is_anonymous_page_request():
+        return None
+    if any(arg not in query_args for arg in request.args):
+        return None
+    args = tuple(sorted((k, tuple(request.args.getlist(k))) for k in request.args))
+    return (request.path, args, session.get('currency') or '', session.get('theme') or '')
+
+
+def _serve(entry):
+    status, body, content_type = entry
+    if CSRF_PLACEHOLDER in body:
+        from flask_wtf.csrf import generate_csrf
+        body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode())
+    resp = make_response(body, status)
+    resp.content_type = content_type
+    resp.headers['X-Page-Cache'] = 'HIT'
+    return resp
+
+
+def cached_page(*tags, query_args=()):
+    """Met en cache la page rendue pour les visiteurs anonymes.
+
+    Toutes les pages dépendent des paramètres boutique (layout) : l'étiquette
+    'settings' est toujours ajoutée.
+    """
+    tags = tuple(tags) + ('settings',)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            cache = current_app.extensions.get('page_cache')
+            key = _cache_key(query_args) if cache is not None else None
+            if key is None:
+                resp = make_response(view(*args, **kwargs))
+                resp.headers['X-Page-Cache'] = 'BYPASS'
+                return resp
+            entry = cache.get(key)
+            if entry is not None:
+                return _serve(entry)
+
+            version = cache.version
+            resp = make_response(view(*args, **kwargs))
+            resp.headers['X-Page-Cache'] = 'MISS'
+            if (resp.status_code == 200 and not resp.direct_passthrough
+                    and resp.mimetype == 'text/html' and not session.get('_flashes')):
+                body = resp.get_data()
+                token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+                if token:
+                    body = body.replace(token.encode(), CSRF_PLACEHOLDER)
+                cache.set(key, (resp.status_code, body, resp.content_type), tags, version=version)
+            return resp
+        return wrapped
+    return decorator
@@ -9,6 +9,7 @@ from io import BytesIO
 from datetime import datetime
 import os
 from flask import current_app
+from backend.utils.currency import get_rate
 from backend.models import ShopSettings
 
 
@@ -23,21 +24,13 @@ def generate_products_pdf(products, target_currency=None):
     uploads_root = current_app.config.get('UPLOAD_FOLDER', os.path.join('frontend', 'static', 'uploads'))
     shop_name = settings.shop_name if settings and settings.shop_name else "Manga Store"
 
-    def get_rate(from_currency: str, to_currency: str) -> float:
-        if not from_currency or not to_currency or from_currency == to_currency:
-            return 1.0
-        rates = {
-            ('USD', 'CDF'): 2200.0,
-            ('CDF', 'USD'): 1/2200.0
-        }
-        return rates.get((from_currency.upper(), to_currency.upper()), 1.0)
-
     currency = (target_currency or base_currency or "USD").upper()
     if currency not in available_currencies:
         currency = base_currency
 
+    rate = get_rate(base_currency, currency)
+
     def convert_amount(amount: float) -> float:
-        rate = get_rate(base_currency, currency)
         try:
             return round(float(amount) * rate, 2)
         except Exception:
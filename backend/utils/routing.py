@@ -0,0 +1,137 @@
+"""Tournée du livreur : ordre de passage des missions en cours (plus proche voisin + 2-opt).
+
+- matrice des distances orthodromiques entre les adresses géocodées (et la
+  dernière position connue du livreur, point de départ fixe si disponible) ;
+- ordre initial par plus proche voisin, amélioré par 2-opt (inversion de
+  segments) tant qu'un échange raccourcit le trajet ; trajet ouvert, sans retour ;
+- résultat mis en cache par livreur tant que l'ensemble des missions (et leurs
+  coordonnées) et la cellule de départ (`origin_key`, ≈ 110 m) ne changent pas ;
+  les missions sans coordonnées restent en fin de liste, dans leur ordre d'origine.
+"""
+import threading
+from collections import OrderedDict
+
+from backend.utils.geo import haversine_km, valid_point
+
+_CACHE_SIZE = 512
+# Décimales de la cellule de départ : 3 ≈ 110 m, en deçà la tournée n'est pas recalculée
+ORIGIN_DIGITS = 3
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def distance_matrix(points):
+    """Matrice symétrique des distances (km) entre `points` [(lat, lon)]."""
+    size = len(points)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        lat1, lon1 = points[i]
+        row = matrix[i]
+        for j in range(i + 1, size):
+            distance = haversine_km(lat1, lon1, points[j][0], points[j][1])
+            row[j] = distance
+            matrix[j][i] = distance
+    return matrix
+
+
+def path_length(order, matrix):
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour(matrix, start=0):
+    """Ordre de visite glouton depuis `start` (indices de la matrice)."""
+    remaining = set(range(len(matrix))) - {start}
+    order = [start]
+    while remaining:
+        row = matrix[order[-1]]
+        nxt = min(remaining, key=lambda j: (row[j], j))
+        remaining.remove(nxt)
+        order.append(nxt)
+    return order
+
+
+def two_opt(order, matrix, fixed_start=True, max_passes=50):
+    """Inverse les segments qui raccourcissent le trajet ouvert ; premier point fixe si `fixed_start`."""
+    order = list(order)
+    size = len(order)
+    first = 1 if fixed_start else 0
+    for _ in range(max_passes):
+        improved = False
+        for i in range(first, size - 1):
+            for j in range(i + 1, size):
+                before = matrix[order[i - 1]][order[i]] if i > 0 else 0.0
+                after = matrix[order[j]][order[j + 1]] if j + 1 < size else 0.0
+                new_before = matrix[order[i - 1]][order[j]] if i > 0 else 0.0
+                new_after = matrix[order[i]][order[j + 1]] if j + 1 < size else 0.0
+                if new_before + new_after < before + after - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def plan_route(stops, origin=None):
+    """Ordre de passage des `stops` [(clé, lat, lon)] depuis `origin` (lat, lon) facultatif.
+
+    Retour : `{'order': [clés], 'legs': {clé: km depuis l'étape précédente},
+    'total_km', 'initial_km' (ordre reçu), 'unrouted': [clés sans coordonnées],
+    'origin': (lat, lon) ou None}`.
+    """
+    located, unrouted = [], []
+    for key, lat, lon in stops:
+        point = valid_point(lat, lon)
+        if point is None:
+            unrouted.append(key)
+        else:
+            located.append((key, point))
+    origin = valid_point(*origin) if origin else None
+    points = ([origin] if origin else []) + [point for _, point in located]
+    keys = ([None] if origin else []) + [key for key, _ in located]
+    result = {'order': [], 'legs': {}, 'total_km': 0.0, 'initial_km': 0.0,
+              'unrouted': unrouted, 'origin': origin}
+    if not located:
+        result['order'] = unrouted
+        return result
+    matrix = distance_matrix(points)
+    if origin:
+        order = two_opt(nearest_neighbour(matrix, 0), matrix, fixed_start=True)
+    else:
+        # Départ libre : meilleur point de départ du plus proche voisin, puis 2-opt sur tout le trajet
+        order = min((nearest_neighbour(matrix, start) for start in range(len(points))),
+                    key=lambda candidate: path_length(candidate, matrix))
+        order = two_opt(order, matrix, fixed_start=False)
+    previous = None
+    for index in order:
+        if keys[index] is not None:
+            result['legs'][keys[index]] = round(matrix[previous][index], 3) if previous is not None else 0.0
+            result['order'].append(keys[index])
+        previous = index
+    result['total_km'] = round(path_length(order, matrix), 3)
+    result['initial_km'] = round(path_length(list(range(len(points))), matrix), 3)
+    result['order'] += unrouted
+    return result
+
+
+def origin_key(origin):
+    """Cellule (lat, lon arrondis à `ORIGIN_DIGITS`) de la position de départ, ou None."""
+    point = valid_point(*origin) if origin else None
+    return point and (round(point[0], ORIGIN_DIGITS), round(point[1], ORIGIN_DIGITS))
+
+
+def route_for(deliverer_id, stops, origin=None):
+    """`plan_route` mis en cache par livreur ; recalculé quand les missions, leurs coordonnées
+    ou la cellule de départ changent."""
+    signature = (tuple(sorted((key, lat, lon) for key, lat, lon in stops)), origin_key(origin))
+    with _lock:
+        cached = _cache.get(deliverer_id)
+        if cached is not None and cached[0] == signature:
+            _cache.move_to_end(deliverer_id)
+            return cached[1]
+    result = plan_route(stops, origin)
+    with _lock:
+        _cache[deliverer_id] = (signature, result)
+        _cache.move_to_end(deliverer_id)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,333 @@
+"""Sessions côté serveur : le cookie ne porte plus qu'un identifiant opaque.
+
+Le panier invité, les coordonnées de commande invité, les commandes récentes, la
+devise… restent dans `session` mais sont stockés dans la table `server_sessions`
+(ou en mémoire pour les tests) au lieu d'être sérialisés, signés et renvoyés dans
+le cookie à chaque requête.
+
+- chargement paresseux : la base n'est lue qu'au premier accès à `session`, et
+  jamais pour les fichiers statiques publics (session nulle) ;
+- écriture seulement si le contenu a changé (empreinte du contenu sérialisé, ce qui
+  couvre aussi les modifications imbriquées comme `session['guest_cart'][pid] = …`),
+  ou pour prolonger l'expiration à mi-vie ;
+- expiration : `PERMANENT_SESSION_LIFETIME` ; les lignes expirées sont purgées en
+  tâche de fond au plus toutes les `SESSION_GC_INTERVAL` secondes ;
+- l'identifiant change à chaque connexion ou déconnexion (`_user_id` modifié) :
+  un identifiant obtenu avant la connexion ne donne jamais accès au compte ;
+- une session anonyme qui ne contient que des clés techniques (secret CSRF, flash,
+  badge panier…) reste dans un cookie signé : aucune ligne serveur pour un simple
+  visiteur tant qu'il n'a rien de réel (panier, coordonnées, connexion).
+
+Un ancien cookie signé (session Flask classique) est repris une fois puis remplacé.
+"""
+import hashlib
+import logging
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin, SecureCookieSessionInterface
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
+
+_logger = logging.getLogger(__name__)
+
+_SID_RE = re.compile(r'^[A-Za-z0-9_-]{32,64}$')
+
+# Clés qui ne justifient pas une ligne `server_sessions` (session anonyme en cookie signé)
+COOKIE_ONLY_KEYS = frozenset({'csrf_token', '_fresh', '_permanent', '_flashes', 'cart_count'})
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dont le contenu n'est chargé qu'au premier accès."""
+
+    def __init__(self, sid=None, loader=None, initial=None, had_cookie=False):
+        def on_update(self_):
+            self_.modified = True
+            self_.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.had_cookie = had_cookie or sid is not None
+        self.modified = bool(initial)
+        self.accessed = False
+        self.expires_at = None
+        self.loaded_digest = None
+        self.loaded_user = None
+        self._loader = loader
+        self._loaded = loader is None
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        record = self._loader(self.sid)
+        if record is None:
+            # Identifiant inconnu ou expiré : jamais réutilisé (fixation de session)
+            self.sid = None
+            self.new = True
+            return
+        data, expires_at, digest = record
+        dict.update(self, data)
+        self.expires_at = expires_at
+        self.loaded_digest = digest
+        self.loaded_user = data.get('_user_id')
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+
+def _lazy(name):
+    method = getattr(CallbackDict, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._load()
+        self.accessed = True
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__', '__len__',
+              '__repr__', 'get', 'keys', 'values', 'items', 'copy', 'setdefault', 'pop', 'popitem',
+              'update', 'clear'):
+    setattr(ServerSideSession, _name, _lazy(_name))
+
+
+class MemorySessionStore:
+    """Stockage en mémoire du processus (tests, développement mono-processus)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            return self._data.get(sid)
+
+    def save(self, sid, payload, expires_at):
+        with self._lock:
+            self._data[sid] = (payload, expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def gc(self, now):
+        with self._lock:
+            expired = [sid for sid, (_, exp) in self._data.items() if exp <= now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+class SqlSessionStore:
+    """Table `server_sessions` (SQLite/PostgreSQL) via SQL Core, sur une connexion distincte
+    de `db.session` : l'écriture de session ne valide jamais la transaction de la vue."""
+
+    def __init__(self, db, model):
+        self.db = db
+        self.table = model.__table__
+
+    def load(self, sid):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            row = conn.execute(select(t.c.data, t.c.expires_at).where(t.c.id == sid)).first()
+        return (row.data, row.expires_at) if row else None
+
+    def save(self, sid, payload, expires_at):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            result = conn.execute(t.update().where(t.c.id == sid).values(data=payload, expires_at=expires_at))
+            if result.rowcount:
+                return
+            try:
+                with conn.begin_nested():
+                    conn.execute(t.insert().values(id=sid, data=payload, expires_at=expires_at))
+            except IntegrityError:
+                conn.execute(t.update().where(t.c.id == sid).values(data=payload, expires_at=expires_at))
+
+    def delete(self, sid):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(t.delete().where(t.c.id == sid))
+
+    def gc(self, now):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            return conn.execute(t.delete().where(t.c.expires_at <= now)).rowcount
+
+
+class ServerSessionInterface(SessionInterface):
+    """`SessionInterface` Flask adossée à un stockage serveur (`MemorySessionStore`, `SqlSessionStore`)."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, gc_interval=600):
+        self.store = store
+        self.gc_interval = gc_interval
+        self._last_gc = time.monotonic()
+        self._gc_lock = threading.Lock()
+        self._legacy = SecureCookieSessionInterface()
+
+    @staticmethod
+    def _digest(payload):
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+    def _load(self, sid):
+        try:
+            record = self.store.load(sid)
+        except Exception as exc:
+            _logger.warning("Lecture de session impossible: %s", exc)
+            return None
+        if record is None:
+            return None
+        payload, expires_at = record
+        if expires_at is not None and expires_at <= datetime.utcnow():
+            return None
+        try:
+            data = self.serializer.loads(payload)
+        except Exception:
+            return None
+        return data, expires_at, self._digest(payload)
+
+    def _is_public_static(self, app, request):
+        prefix = (app.static_url_path or '').rstrip('/') + '/'
+        if not app.static_folder or not request.path.startswith(prefix):
+            return False
+        from backend.utils.media import is_protected
+        # `is_protected` normalise le chemin (`//`, `.`, `..`) comme le fera l'envoi du fichier
+        return not is_protected(request.path[len(prefix):])
+
+    def open_session(self, app, request):
+        if self._is_public_static(app, request):
+            # Fichier statique public : aucune lecture de session (Flask-Login la consulte à chaque réponse)
+            return self.make_null_session(app)
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSideSession()
+        if _SID_RE.match(cookie):
+            return ServerSideSession(cookie, loader=self._load)
+        # Cookie signé (session anonyme légère ou ancienne session Flask) : passe côté serveur
+        # dès qu'il contient autre chose que des clés techniques
+        legacy = self._legacy.open_session(app, request)
+        session = ServerSideSession(initial=dict(legacy) if legacy else None, had_cookie=True)
+        session.modified = False
+        return session
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.loaded:
+            # `session` jamais lue ni modifiée pendant la requête
+            return
+
+        if not session:
+            if session.sid:
+                try:
+                    self.store.delete(session.sid)
+                except Exception as exc:
+                    _logger.warning("Suppression de session impossible: %s", exc)
+            if session.had_cookie:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        payload = self.serializer.dumps(dict(session))
+        digest = self._digest(payload)
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        refresh = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if session.sid is not None and dict.get(session, '_user_id') != session.loaded_user:
+            # Connexion / déconnexion : nouvel identifiant, l'ancien (peut-être imposé par un tiers) est détruit
+            try:
+                self.store.delete(session.sid)
+            except Exception as exc:
+                _logger.warning("Suppression de session impossible: %s", exc)
+            session.sid = None
+        if session.sid is None and COOKIE_ONLY_KEYS.issuperset(session.keys()):
+            self._save_cookie_only(app, session, response)
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+            session.new = True
+        if session.new or refresh or digest != session.loaded_digest:
+            try:
+                self.store.save(session.sid, payload, now + lifetime)
+            except Exception as exc:
+                _logger.error("Enregistrement de session impossible: %s", exc)
+                return
+        if session.new or (session.permanent and refresh):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+        self._maybe_gc(app)
+
+    def _save_cookie_only(self, app, session, response):
+        if not self._legacy.should_set_cookie(app, session):
+            return
+        response.set_cookie(
+            self.get_cookie_name(app),
+            self._legacy.get_signing_serializer(app).dumps(dict(session)),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def _maybe_gc(self, app):
+        if time.monotonic() - self._last_gc < self.gc_interval:
+            return
+        with self._gc_lock:
+            if time.monotonic() - self._last_gc < self.gc_interval:
+                return
+            self._last_gc = time.monotonic()
+
+        def _run():
+            try:
+                with app.app_context():
+                    removed = self.store.gc(datetime.utcnow())
+                if removed:
+                    _logger.info("Sessions expirées purgées: %s", removed)
+            except Exception as exc:
+                _logger.warning("Purge des sessions impossible: %s", exc)
+
+        threading.Thread(target=_run, name='session-gc', daemon=True).start()
+
+
+def init_sessions(app, db=None, model=None):
+    """Installe le stockage de session choisi par `SESSION_BACKEND` ('sql', 'memory' ou 'cookie')."""
+    backend = (app.config.get('SESSION_BACKEND') or 'cookie').lower()
+    if backend == 'cookie':
+        return None
+    if backend == 'memory':
+        store = MemorySessionStore()
+    elif backend == 'sql':
+        store = SqlSessionStore(db, model)
+    else:
+        raise ValueError(f"SESSION_BACKEND inconnu: {backend}")
+    app.session_interface = ServerSessionInterface(
+        store, gc_interval=int(app.config.get('SESSION_GC_INTERVAL', 600)),
+    )
+    return app.session_interface
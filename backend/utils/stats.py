@@ -0,0 +1,307 @@
+"""Statistiques du tableau de bord admin : une ligne `stats_snapshot` tenue à jour.
+
+- compteurs (produits, commandes, clients, commandes en attente) ajustés dans la
+  transaction qui crée, modifie ou supprime l'objet (`after_flush`, UPDATE
+  `col = col + delta` : atomique, sans relecture) ;
+- CA reconnu (commandes livrées depuis plus d'une heure) : cumul jusqu'à
+  `revenue_recognized_until`, avancé par une passe incrémentale qui ne somme que
+  les livraisons de la nouvelle fenêtre ; une commande déjà comptée qui change
+  (annulation, montant, suppression) est corrigée par le même mécanisme de delta ;
+- écritures en masse (update/delete ORM, insert Core du jeu de données) : la ligne
+  est marquée `dirty` et recalculée entièrement à la lecture suivante ;
+- réconciliation complète périodique (`STATS_RECONCILE_INTERVAL`) pour réparer
+  toute dérive, et `flask reconcile-stats` à la demande.
+
+Le tableau de bord et le profil admin lisent une seule ligne.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import event, func, inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+
+from backend.utils import workers
+
+_logger = logging.getLogger(__name__)
+
+SNAPSHOT_ID = 1
+REVENUE_DELAY = timedelta(hours=1)
+COUNTERS = ('total_products', 'total_orders', 'total_users', 'pending_orders', 'recognized_revenue')
+
+_config = {}
+_listeners_installed = False
+
+
+def revenue_cutoff(now=None):
+    """Instant à partir duquel une livraison compte dans le CA (1h après livraison)."""
+    return (now or datetime.utcnow()) - REVENUE_DELAY
+
+
+UNKNOWN = object()
+
+
+def old_value(state, attr):
+    """Valeur de `attr` avant le flush (UNKNOWN si elle n'était pas chargée)."""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    # Attribut modifié sans valeur précédente chargée : ancien état inconnu
+    return UNKNOWN if history.added else None
+
+
+def _order_contribution(status, total, delivered_at, until):
+    revenue = 0.0
+    if status == 'delivered' and delivered_at is not None and until is not None and delivered_at <= until:
+        revenue = float(total or 0)
+    return {'pending_orders': 1 if status == 'pending' else 0, 'recognized_revenue': revenue}
+
+
+def _snapshot_until(session_):
+    if 'stats_until' not in session_.info:
+        table = _config['model'].__table__
+        session_.info['stats_until'] = session_.connection().execute(
+            select(table.c.revenue_recognized_until).where(table.c.id == SNAPSHOT_ID)
+        ).scalar()
+    return session_.info['stats_until']
+
+
+def _mark_dirty(session_):
+    table = _config['model'].__table__
+    session_.connection().execute(table.update().where(table.c.id == SNAPSHOT_ID).values(dirty=True))
+
+
+def _after_flush(session_, flush_context):
+    models = _config.get('models')
+    if not models:
+        return
+    product_model, order_model, user_model = models
+    delta = dict.fromkeys(COUNTERS, 0)
+    unknown = False
+
+    def add(values, sign):
+        for key, value in values.items():
+            delta[key] += sign * value
+
+    for obj in session_.new:
+        if isinstance(obj, product_model):
+            delta['total_products'] += 1
+        elif isinstance(obj, order_model):
+            delta['total_orders'] += 1
+            until = _snapshot_until(session_) if obj.status == 'delivered' else None
+            add(_order_contribution(obj.status, obj.total_amount, obj.delivered_at, until), 1)
+        elif isinstance(obj, user_model) and obj.is_admin is False:
+            delta['total_users'] += 1
+
+    for obj in session_.deleted:
+        state = sa_inspect(obj)
+        if isinstance(obj, product_model):
+            delta['total_products'] -= 1
+        elif isinstance(obj, order_model):
+            delta['total_orders'] -= 1
+            old = {attr: old_value(state, attr) for attr in ('status', 'total_amount', 'delivered_at')}
+            if UNKNOWN in old.values():
+                unknown = True
+                continue
+            until = _snapshot_until(session_) if old['status'] == 'delivered' else None
+            add(_order_contribution(old['status'], old['total_amount'], old['delivered_at'], until), -1)
+        elif isinstance(obj, user_model):
+            old_admin = old_value(state, 'is_admin')
+            if old_admin is UNKNOWN:
+                unknown = True
+            elif old_admin is False:
+                delta['total_users'] -= 1
+
+    for obj in session_.dirty:
+        if obj in session_.deleted or not session_.is_modified(obj):
+            continue
+        state = sa_inspect(obj)
+        if isinstance(obj, order_model):
+            attrs = ('status', 'total_amount', 'delivered_at')
+            if not any(state.attrs[a].history.has_changes() for a in attrs):
+                continue
+            old = {attr: old_value(state, attr) for attr in attrs}
+            if UNKNOWN in old.values():
+                unknown = True
+                continue
+            until = (_snapshot_until(session_)
+                     if 'delivered' in (old['status'], obj.status) else None)
+            add(_order_contribution(old['status'], old['total_amount'], old['delivered_at'], until), -1)
+            add(_order_contribution(obj.status, obj.total_amount, obj.delivered_at, until), 1)
+        elif isinstance(obj, user_model) and state.attrs.is_admin.history.has_changes():
+            old_admin = old_value(state, 'is_admin')
+            if old_admin is UNKNOWN:
+                unknown = True
+                continue
+            delta['total_users'] += (obj.is_admin is False) - (old_admin is False)
+
+    if unknown:
+        _mark_dirty(session_)
+    changes = {key: value for key, value in delta.items() if value}
+    if changes:
+        table = _config['model'].__table__
+        session_.connection().execute(
+            table.update().where(table.c.id == SNAPSHOT_ID).values(
+                **{key: table.c[key] + value for key, value in changes.items()},
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+
+def _do_orm_execute(state):
+    tables = _config.get('tables')
+    if not tables or not (state.is_insert or state.is_update or state.is_delete):
+        return
+    target = getattr(state.statement, 'table', None)
+    if target is not None and target.name in tables:
+        _mark_dirty(state.session)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _reset(session_):
+    session_.info.pop('stats_until', None)
+
+
+def compute(db, now=None):
+    """Valeurs exactes (réconciliation) : une requête agrégée par table."""
+    product_model, order_model, user_model = _config['models']
+    until = revenue_cutoff(now)
+    orders = db.session.execute(select(
+        func.count(order_model.id),
+        func.coalesce(func.sum(db.case((order_model.status == 'pending', 1), else_=0)), 0),
+        func.coalesce(func.sum(
+            db.case((
+                (order_model.status == 'delivered')
+                & order_model.delivered_at.isnot(None)
+                & (order_model.delivered_at <= until),
+                order_model.total_amount,
+            ), else_=0)
+        ), 0),
+    )).one()
+    return {
+        'total_products': db.session.execute(select(func.count(product_model.id))).scalar() or 0,
+        'total_orders': orders[0] or 0,
+        'total_users': db.session.execute(
+            select(func.count(user_model.id)).where(user_model.is_admin.is_(False))
+        ).scalar() or 0,
+        'pending_orders': int(orders[1] or 0),
+        'recognized_revenue': float(orders[2] or 0),
+        'revenue_recognized_until': until,
+    }
+
+
+def reconcile(db):
+    """Recalcule entièrement la ligne et journalise la dérive corrigée."""
+    model = _config['model']
+    values = compute(db)
+    now = datetime.utcnow()
+    row = db.session.get(model, SNAPSHOT_ID)
+    if row is None:
+        row = model(id=SNAPSHOT_ID)
+        db.session.add(row)
+    else:
+        drift = {key: (getattr(row, key), values[key]) for key in COUNTERS
+                 if round(float(getattr(row, key) or 0), 2) != round(float(values[key]), 2)}
+        if drift and not row.dirty:
+            _logger.warning("Statistiques réconciliées (dérive): %s", drift)
+    for key, value in values.items():
+        setattr(row, key, value)
+    row.dirty = False
+    row.reconciled_at = now
+    row.updated_at = now
+    db.session.commit()
+    return row
+
+
+def advance_revenue(db, now=None):
+    """Ajoute au CA reconnu les livraisons passées sous le seuil depuis la dernière passe."""
+    model = _config['model']
+    order_model = _config['models'][1]
+    table = model.__table__
+    until = revenue_cutoff(now)
+    with db.engine.begin() as conn:
+        row = conn.execute(
+            select(table.c.revenue_recognized_until, table.c.dirty).where(table.c.id == SNAPSHOT_ID)
+        ).first()
+        if row is None or row.dirty or row.revenue_recognized_until is None:
+            return None
+        since = row.revenue_recognized_until
+        if until <= since:
+            return 0.0
+        added = conn.execute(
+            select(func.coalesce(func.sum(order_model.total_amount), 0)).where(
+                order_model.status == 'delivered',
+                order_model.delivered_at > since,
+                order_model.delivered_at <= until,
+            )
+        ).scalar() or 0
+        # Condition sur `since` : une autre passe concurrente ne compte pas deux fois la fenêtre
+        conn.execute(
+            table.update()
+            .where(table.c.id == SNAPSHOT_ID, table.c.revenue_recognized_until == since)
+            .values(recognized_revenue=table.c.recognized_revenue + added,
+                    revenue_recognized_until=until, updated_at=datetime.utcnow())
+        )
+    return float(added)
+
+
+def read(db):
+    """Ligne de statistiques (une requête) ; recalculée si absente ou marquée `dirty`."""
+    row = db.session.get(_config['model'], SNAPSHOT_ID)
+    if row is None or row.dirty:
+        row = reconcile(db)
+    return row
+
+
+def _start_worker(app, db, sweep_interval, reconcile_interval):
+    def _run():
+        last_reconcile = time.monotonic()
+        while True:
+            time.sleep(sweep_interval)
+            try:
+                with app.app_context():
+                    if time.monotonic() - last_reconcile >= reconcile_interval:
+                        reconcile(db)
+                        last_reconcile = time.monotonic()
+                    else:
+                        advance_revenue(db)
+            except Exception as exc:
+                _logger.warning("Mise à jour des statistiques impossible: %s", exc)
+
+    threading.Thread(target=_run, name='stats-snapshot', daemon=True).start()
+
+
+def init_stats(app, db, model, product_model, order_model, user_model):
+    """Installe le suivi incrémental de `model` (ligne unique) et la passe périodique."""
+    global _listeners_installed
+    _config['model'] = model
+    _config['models'] = (product_model, order_model, user_model)
+    _config['tables'] = {m.__tablename__ for m in (product_model, order_model, user_model)}
+    if not _listeners_installed:
+        # Charge l'ancienne valeur avant affectation (objet expiré après commit) : delta exact sans recalcul
+        for attr in (order_model.status, order_model.total_amount, order_model.delivered_at, user_model.is_admin):
+            event.listen(attr, 'set', _keep_old_value, active_history=True)
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _reset)
+        event.listen(Session, 'after_rollback', _reset)
+        _listeners_installed = True
+
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats_command():
+        """Recalcule la ligne stats_snapshot (compteurs et CA reconnu)."""
+        row = reconcile(db)
+        click.echo(f"✅ Statistiques: {row.total_orders} commandes, {row.total_products} produits, "
+                   f"{row.total_users} clients, CA {row.recognized_revenue:.2f}")
+
+    sweep = int(app.config.get('STATS_SWEEP_INTERVAL', 60) or 0)
+    if sweep > 0 and not app.config.get('TESTING'):
+        reconcile_interval = int(app.config.get('STATS_RECONCILE_INTERVAL', 3600))
+        workers.register('stats-snapshot', lambda: _start_worker(app, db, sweep, reconcile_interval))
@@ -0,0 +1,45 @@
+"""Tâches de fond périodiques : démarrées une fois par processus, après le fork des workers.
+
+Chaque module enregistre son démarreur dans son `init_x` (`register`) au lieu de
+lancer son fil directement ; `start()` les lance dans le processus courant.
+
+- démarrage classique : `create_app` appelle `start()` ;
+- préchargement gunicorn (`GUNICORN_PRELOAD`) : `create_app` s'exécute dans le
+  maître et un fil qui y serait lancé ne survit pas au fork ; le hook `post_fork`
+  de gunicorn.conf.py appelle `start()` dans chaque worker.
+"""
+import logging
+import os
+import threading
+
+_logger = logging.getLogger(__name__)
+
+_starters = {}
+_started_pid = [None]
+_lock = threading.Lock()
+
+
+def register(name, starter):
+    """Enregistre `starter()` (lance le fil de fond `name`) ; remplace un démarreur de même nom."""
+    _starters[name] = starter
+
+
+def deferred():
+    """Vrai si l'app est préchargée par le maître gunicorn : démarrage au `post_fork`."""
+    return os.getenv('GUNICORN_PRELOAD', 'False').lower() in ('1', 'true', 'yes')
+
+
+def start():
+    """Lance les fils enregistrés dans ce processus (une seule fois par pid) ; nombre lancé."""
+    pid = os.getpid()
+    with _lock:
+        if _started_pid[0] == pid:
+            return 0
+        _started_pid[0] = pid
+        starters = list(_starters.items())
+    for name, starter in starters:
+        try:
+            starter()
+        except Exception as exc:
+            _logger.warning("Tâche de fond %s non démarrée: %s", name, exc)
+    return len(starters)
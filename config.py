@@ -20,6 +20,8 @@ class Config:
         _db_url = _db_url.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = _db_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Création des tables au démarrage (désactivée : le schéma est géré par `flask init-db` / migrations)
+    AUTO_CREATE_TABLES = os.getenv('AUTO_CREATE_TABLES', 'False').lower() == 'true'
     # Limiter le nombre de connexions (évite "max clients reached" sur Supabase/pgbouncer)
     _pool_size = max(2, int(os.getenv('DB_POOL_SIZE', '5')))
     _max_overflow = max(1, int(os.getenv('DB_MAX_OVERFLOW', '5')))
@@ -34,6 +36,9 @@ class Config:
         "pool_timeout": _pool_timeout,
         "connect_args": {"connect_timeout": _connect_timeout},
     }
+    # sqlite3.connect() ne connaît pas connect_timeout (option psycopg2 uniquement)
+    if _db_url.startswith('sqlite:'):
+        SQLALCHEMY_ENGINE_OPTIONS["connect_args"] = {}
     _static_folder = os.getenv('STATIC_FOLDER', os.path.join(BASEDIR, 'frontend', 'static'))
     if not os.path.isabs(_static_folder):
         _static_folder = os.path.join(BASEDIR, _static_folder)
@@ -66,6 +71,94 @@ class Config:
     SHOP_EMAIL = os.getenv('SHOP_EMAIL', 'contact@mangastore.com')
     SHOP_PHONE = os.getenv('SHOP_PHONE', '+243000000000')
     BASE_CURRENCY = os.getenv('BASE_CURRENCY', 'USD')
+    # Taux utilisés tant que la table exchange_rates est vide, ex: "USD:CDF=2200,USD:EUR=0.92"
+    EXCHANGE_RATES_DEFAULT = os.getenv('EXCHANGE_RATES_DEFAULT', 'USD:CDF=2200')
+    # Durée (s) de l'instantané des taux en mémoire
+    EXCHANGE_RATE_CACHE_SECONDS = int(os.getenv('EXCHANGE_RATE_CACHE_SECONDS', '60'))
+    # Source JSON des taux ({"base": "USD", "rates": {...}}), vide = taux manuels uniquement
+    EXCHANGE_RATE_URL = os.getenv('EXCHANGE_RATE_URL', '')
+    # Intervalle (s) du rafraîchissement automatique ; 0 = seulement `flask refresh-exchange-rates`
+    EXCHANGE_RATE_REFRESH_SECONDS = int(os.getenv('EXCHANGE_RATE_REFRESH_SECONDS', '21600'))
+    EXCHANGE_RATE_TIMEOUT = float(os.getenv('EXCHANGE_RATE_TIMEOUT', '10'))
+
+    # Stockage des sessions : 'sql' (table server_sessions), 'memory' (tests) ou 'cookie' (cookie signé Flask)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sql').strip().lower()
+    # Purge des sessions expirées (secondes entre deux passes)
+    SESSION_GC_INTERVAL = int(os.getenv('SESSION_GC_INTERVAL', '600'))
+    # API JSON panier/commande : durée de conservation des clés Idempotency-Key (heures)
+    IDEMPOTENCY_TTL_HOURS = float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24'))
+
+    # Cache des pages publiques pour visiteurs anonymes (accueil, catalogue, pages légales)
+    PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+    PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '300'))
+    PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '512'))
+
+    # Administration : produits par page du tableau catalogue
+    ADMIN_PRODUCTS_PER_PAGE = int(os.getenv('ADMIN_PRODUCTS_PER_PAGE', '50'))
+    # Administration : affectations par page de la fiche livreur
+    ADMIN_DELIVERER_ASSIGNMENTS_PER_PAGE = int(os.getenv('ADMIN_DELIVERER_ASSIGNMENTS_PER_PAGE', '50'))
+    # Tableau de bord livreur : livraisons terminées par page (onglet Historique)
+    DELIVERER_HISTORY_PER_PAGE = int(os.getenv('DELIVERER_HISTORY_PER_PAGE', '20'))
+    # Synchronisation hors ligne livreur : changements max par envoi, conservation du journal (h)
+    DELIVERER_SYNC_MAX_CHANGES = int(os.getenv('DELIVERER_SYNC_MAX_CHANGES', '100'))
+    DELIVERER_SYNC_LOG_TTL_HOURS = int(os.getenv('DELIVERER_SYNC_LOG_TTL_HOURS', '168'))
+    # Statistiques du tableau de bord : passe du CA reconnu (s) et réconciliation complète (s) ; 0 = désactivé
+    STATS_SWEEP_INTERVAL = int(os.getenv('STATS_SWEEP_INTERVAL', '60'))
+    STATS_RECONCILE_INTERVAL = int(os.getenv('STATS_RECONCILE_INTERVAL', '3600'))
+    # Cumuls journaliers des ventes : passe incrémentale (s), recalcul des N derniers jours toutes les N s ; 0 = désactivé
+    ANALYTICS_ROLLUP_INTERVAL = int(os.getenv('ANALYTICS_ROLLUP_INTERVAL', '60'))
+    ANALYTICS_REBUILD_INTERVAL = int(os.getenv('ANALYTICS_REBUILD_INTERVAL', '3600'))
+    ANALYTICS_REBUILD_DAYS = int(os.getenv('ANALYTICS_REBUILD_DAYS', '7'))
+    # Affectation automatique des commandes confirmées au livreur disponible le plus proche
+    AUTO_DISPATCH_ENABLED = os.getenv('AUTO_DISPATCH_ENABLED', 'False').lower() == 'true'
+    DISPATCH_INTERVAL = int(os.getenv('DISPATCH_INTERVAL', '30'))
+    DISPATCH_MAX_RADIUS_KM = float(os.getenv('DISPATCH_MAX_RADIUS_KM', '15'))
+    # Missions en cours max par livreur, et pénalité (km) par mission en cours dans le choix
+    DISPATCH_MAX_ACTIVE = int(os.getenv('DISPATCH_MAX_ACTIVE', '3'))
+    DISPATCH_LOAD_PENALTY_KM = float(os.getenv('DISPATCH_LOAD_PENALTY_KM', '2'))
+    DISPATCH_CANDIDATES = int(os.getenv('DISPATCH_CANDIDATES', '8'))
+    DISPATCH_CELL_KM = float(os.getenv('DISPATCH_CELL_KM', '2'))
+    # Positions livreurs : intervalle min entre deux positions (s), écriture en base (s), péremption (s)
+    DELIVERER_POSITION_MIN_INTERVAL = float(os.getenv('DELIVERER_POSITION_MIN_INTERVAL', '10'))
+    DELIVERER_POSITION_PERSIST_INTERVAL = float(os.getenv('DELIVERER_POSITION_PERSIST_INTERVAL', '60'))
+    DELIVERER_POSITION_TTL = int(os.getenv('DELIVERER_POSITION_TTL', '900'))
+    # Journal d'activité : taille max de la file mémoire, lot par INSERT, passe (s), fichier de débordement
+    ACTIVITY_LOG_QUEUE_SIZE = int(os.getenv('ACTIVITY_LOG_QUEUE_SIZE', '1000'))
+    ACTIVITY_LOG_BATCH_SIZE = int(os.getenv('ACTIVITY_LOG_BATCH_SIZE', '100'))
+    ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_LOG_FLUSH_INTERVAL', '2'))
+    ACTIVITY_LOG_SPILL_PATH = os.getenv('ACTIVITY_LOG_SPILL_PATH', 'logs/activity_spill.jsonl')
+    # Grand livre des commissions : instantanés des mois clos toutes les N secondes (0 = à la lecture seulement)
+    COMMISSION_SNAPSHOT_INTERVAL = int(os.getenv('COMMISSION_SNAPSHOT_INTERVAL', '21600'))
+
+    # Compression des réponses (gzip, Brotli si le paquet est installé)
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    # Types compressés et niveau gzip, ex: "text/html:6,application/json:5" (vide = valeurs par défaut)
+    COMPRESS_MIMETYPES = os.getenv('COMPRESS_MIMETYPES')
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', '5'))
+    # Au-delà de cette taille, compression dans un thread natif (ne bloque pas eventlet)
+    COMPRESS_THREAD_SIZE = int(os.getenv('COMPRESS_THREAD_SIZE', str(256 * 1024)))
+    # Génère les variantes .gz/.br manquantes des statiques au démarrage (thread natif) ;
+    # désactivé par défaut : préférer `flask precompress-static` au build
+    STATIC_PRECOMPRESS_ON_START = os.getenv('STATIC_PRECOMPRESS_ON_START', 'False').lower() == 'true'
+
+    # URLs statiques avec empreinte du contenu (cache navigateur d'un an, immuable)
+    ASSET_FINGERPRINT_ENABLED = os.getenv('ASSET_FINGERPRINT_ENABLED', 'True').lower() == 'true'
+    # Délai (s) entre deux vérifications mtime/taille d'un même fichier
+    ASSET_MANIFEST_CHECK_INTERVAL = float(os.getenv('ASSET_MANIFEST_CHECK_INTERVAL', '5'))
+    # Au-delà de cette taille (octets), empreinte mtime/taille au lieu du hash du contenu
+    ASSET_HASH_MAX_SIZE = int(os.getenv('ASSET_HASH_MAX_SIZE', str(1024 * 1024)))
+
+    # Médias uploadés : transfert délégué au proxy ('x-accel' nginx, 'x-sendfile'), vide = sendfile local
+    MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '').strip().lower()
+    # Location nginx `internal` qui pointe sur le dossier statique
+    MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_protected_media')
+    MEDIA_OFFLOAD_PREFIXES = os.getenv('MEDIA_OFFLOAD_PREFIXES', 'uploads')
+    # Pièces jointes réservées aux utilisateurs connectés
+    MEDIA_PROTECTED_PREFIXES = os.getenv('MEDIA_PROTECTED_PREFIXES', 'uploads/forum')
+
+    # Géocodage des adresses de livraison (Nominatim par défaut, stub local possible pour les tests de charge)
+    GEOCODER_URL = os.getenv('GEOCODER_URL', 'https://nominatim.openstreetmap.org/search')
 
     # WebRTC / TURN-STUN (remplir dans .env pour des appels fiables)
     ICE_STUN_URL = os.getenv('ICE_STUN_URL', 'stun:stun.l.google.com:19302')
@@ -1,30 +1,143 @@
-// Simple cart using localStorage
-function getCart(){ return JSON.parse(localStorage.getItem('cart') || '[]'); }
-function saveCart(c){ localStorage.setItem('cart', JSON.stringify(c)); document.getElementById('cart-count').textContent = c.reduce((s,i)=>s+i.quantity,0); }
-window.addEventListener('DOMContentLoaded', ()=>{
-  const buttons = document.querySelectorAll('.add-to-cart');
-  buttons.forEach(btn=>{
-    btn.addEventListener('click', ()=>{
-      const id = parseInt(btn.dataset.id);
-      const title = btn.dataset.title;
-      const price = parseFloat(btn.dataset.price);
-      let cart = getCart();
-      let item = cart.find(i=>i.product_id===id);
-      if(item){ item.quantity += 1; } else { cart.push({product_id:id,title,price,quantity:1}); }
-      saveCart(cart);
-      alert('Produit ajouté au panier');
+// Panier : client de l'API JSON (/api/cart, /api/checkout).
+// Chaque écriture porte un en-tête Idempotency-Key : une requête répétée
+// (réseau instable, double clic) est rejouée par le serveur sans doublon.
+(function () {
+  function csrfToken() {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    if (meta) return meta.content;
+    const input = document.querySelector('input[name="csrf_token"]');
+    return input ? input.value : '';
+  }
+
+  function newKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+  }
+
+  async function request(method, url, body, key) {
+    const headers = { 'Accept': 'application/json', 'X-CSRFToken': csrfToken() };
+    if (body !== undefined) headers['Content-Type'] = 'application/json';
+    if (method !== 'GET') headers['Idempotency-Key'] = key || newKey();
+    const response = await fetch(url, {
+      method,
+      headers,
+      credentials: 'same-origin',
+      body: body !== undefined ? JSON.stringify(body) : undefined,
     });
-  });
-  if(document.getElementById('cart-count')) saveCart(getCart());
-});
-async function checkout(address){
-  const cart = getCart();
-  const resp = await fetch('/api/checkout',{
-    method:'POST', headers:{'Content-Type':'application/json'},
-    body: JSON.stringify({address, items: cart})
-  });
-  const j = await resp.json();
-  if(j.ok){ localStorage.removeItem('cart'); alert('Commande passée! ID: '+j.order_id); window.location.href='/'; }
-  else if(j.error=='not_authenticated'){ alert('Veuillez vous connecter'); window.location.href='/login'; }
-  else if(j.error=='insufficient_stock'){ alert('Stock insuffisant pour un produit'); }
-}
+    const data = await response.json().catch(() => null);
+    if (!response.ok || !data || data.ok === false) {
+      const error = new Error((data && data.message) || 'Impossible de mettre à jour le panier.');
+      error.code = data && data.error;
+      error.status = response.status;
+      throw error;
+    }
+    return data;
+  }
+
+  function notify(message, isError) {
+    if (typeof window.showToast === 'function') window.showToast(message, isError);
+    else if (message) alert(message);
+  }
+
+  function setBadges(count) {
+    if (typeof window.updateCartBadges === 'function') window.updateCartBadges(count);
+  }
+
+  function formatAmount(root, amount) {
+    const rate = parseFloat(root.dataset.rate || '1') || 1;
+    const currency = root.dataset.currency || '';
+    const value = (Number(amount) * rate).toFixed(2).split('.');
+    value[0] = value[0].replace(/\B(?=(\d{3})+(?!\d))/g, ' ');
+    return `${currency} ${value.join(',')}`.trim();
+  }
+
+  function render(root, cart) {
+    const lines = new Map(cart.items.map(item => [String(item.product_id), item]));
+    root.querySelectorAll('[data-cart-line]').forEach(row => {
+      const item = lines.get(row.dataset.productId);
+      if (!item) { row.remove(); return; }
+      const input = row.querySelector('input[name="quantity"][type="number"]');
+      if (input) { input.value = item.quantity; input.max = item.stock; }
+    });
+    root.querySelectorAll('[data-cart-subtotal]').forEach(el => { el.textContent = formatAmount(root, cart.subtotal); });
+    const warnings = root.querySelector('[data-cart-warnings]');
+    if (warnings) {
+      warnings.innerHTML = '';
+      cart.warnings.forEach(w => {
+        const div = document.createElement('div');
+        div.className = 'p-3 rounded-lg border ' + (w.level === 'error'
+          ? 'bg-red-50 border-red-200 text-red-800'
+          : 'bg-yellow-50 border-yellow-200 text-yellow-800');
+        div.textContent = w.message;
+        warnings.appendChild(div);
+      });
+    }
+    if (!cart.items.length) window.location.reload();
+  }
+
+  async function mutate(root, form, method, url, body) {
+    const button = form.querySelector('button[type="submit"]');
+    if (button) button.disabled = true;
+    // La même clé est réutilisée si l'utilisateur renvoie le même formulaire avant la réponse
+    form.dataset.idempotencyKey = form.dataset.idempotencyKey || newKey();
+    try {
+      const data = await request(method, url, body, form.dataset.idempotencyKey);
+      render(root, data.cart);
+      setBadges(data.cart_count);
+      notify(data.message);
+    } catch (err) {
+      notify(err.message, true);
+    } finally {
+      delete form.dataset.idempotencyKey;
+      if (button) button.disabled = false;
+    }
+  }
+
+  function bindCartPage() {
+    const root = document.querySelector('[data-cart]');
+    if (!root) return;
+    root.querySelectorAll('[data-cart-line]').forEach(row => {
+      const productId = row.dataset.productId;
+      const url = `/api/cart/items/${productId}`;
+      const update = row.querySelector('form[data-cart-update]');
+      if (update) {
+        update.addEventListener('submit', e => {
+          e.preventDefault();
+          const quantity = parseInt(update.querySelector('input[name="quantity"]').value, 10);
+          if (Number.isNaN(quantity) || quantity < 0) { notify('Quantité invalide', true); return; }
+          mutate(root, update, 'PATCH', url, { quantity });
+        });
+      }
+      const remove = row.querySelector('form[data-cart-remove]');
+      if (remove) {
+        remove.addEventListener('submit', e => {
+          e.preventDefault();
+          mutate(root, remove, 'DELETE', url);
+        });
+      }
+    });
+  }
+
+  // API publique (ajout depuis d'autres pages, checkout en un appel)
+  window.Cart = {
+    get: () => request('GET', '/api/cart'),
+    add: (productId, quantity = 1) => request('POST', '/api/cart/items', { product_id: productId, quantity }),
+    setQuantity: (productId, quantity) => request('PATCH', `/api/cart/items/${productId}`, { quantity }),
+    remove: productId => request('DELETE', `/api/cart/items/${productId}`),
+    checkout: (details, key) => request('POST', '/api/checkout', details || {}, key),
+  };
+
+  window.checkout = async function (details) {
+    const key = newKey();
+    try {
+      const data = await window.Cart.checkout(details, key);
+      setBadges(0);
+      window.location.href = data.redirect;
+    } catch (err) {
+      if (err.code === 'clients_only') window.location.href = '/login';
+      else notify(err.message, true);
+    }
+  };
+
+  document.addEventListener('DOMContentLoaded', bindCartPage);
+})();
@@ -0,0 +1,21 @@
+// Livreur : envoie la position du téléphone (Socket.IO `deliverer:position`)
+// pour l'affectation automatique des commandes au livreur le plus proche.
+// Le serveur ignore les positions trop rapprochées ; on limite aussi ici.
+(function () {
+  const MIN_INTERVAL_MS = 15000;
+  if (!navigator.geolocation || typeof window.io !== 'function') return;
+  const socket = window.io({ transports: ['websocket'] });
+  let lastSent = 0;
+
+  navigator.geolocation.watchPosition(position => {
+    const now = Date.now();
+    if (now - lastSent < MIN_INTERVAL_MS || !socket.connected) return;
+    lastSent = now;
+    socket.emit('deliverer:position', {
+      lat: position.coords.latitude,
+      lon: position.coords.longitude,
+    });
+  }, () => {
+    // Localisation refusée ou indisponible : pas d'affectation automatique pour ce livreur
+  }, { enableHighAccuracy: true, maximumAge: 10000, timeout: 20000 });
+})();
@@ -0,0 +1,141 @@
+// Livreur : file hors ligne des mises à jour (/livreur/api/sync).
+// Chaque changement (statut de mission + note, statut du livreur) est gardé
+// dans localStorage avec un identifiant unique et l'heure locale, puis envoyé
+// par lot dès que le réseau revient ; le serveur ignore un identifiant déjà
+// traité et applique les changements dans l'ordre où ils ont été faits.
+(function () {
+  const STORAGE_KEY = 'deliverer-sync-queue';
+  const RETRY_MS = 30000;
+  const ACTIVE = ['assigned', 'in_progress', 'postponed'];
+  const script = document.currentScript;
+  const syncUrl = (script && script.dataset.syncUrl) || '/livreur/api/sync';
+  let sending = false;
+
+  function csrfToken() {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    if (meta) return meta.content;
+    const input = document.querySelector('input[name="csrf_token"]');
+    return input ? input.value : '';
+  }
+
+  function newId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+  }
+
+  function load() {
+    try {
+      const queue = JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+      return Array.isArray(queue) ? queue : [];
+    } catch (e) {
+      return [];
+    }
+  }
+
+  function save(queue) {
+    try {
+      localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+    } catch (e) {
+      // Stockage plein ou désactivé : la file reste en mémoire pour cette page
+    }
+    showPending(queue.length);
+  }
+
+  function notify(message, isError) {
+    if (typeof window.showToast === 'function') window.showToast(message, isError);
+    else if (isError && message) alert(message);
+  }
+
+  function showPending(count) {
+    const el = document.querySelector('[data-sync-pending]');
+    if (!el) return;
+    el.textContent = count ? `${count} mise(s) à jour en attente de réseau` : '';
+    el.classList.toggle('hidden', !count);
+  }
+
+  function applyAssignments(assignments) {
+    const byId = new Map(assignments.map(a => [String(a.id), a]));
+    document.querySelectorAll('[data-assignment-card]').forEach(card => {
+      const item = byId.get(card.dataset.assignmentCard);
+      if (!item || !ACTIVE.includes(item.status)) { card.remove(); return; }
+      const badge = card.querySelector('[data-assignment-status]');
+      if (badge) badge.textContent = item.status_label;
+      const select = card.querySelector('select[name="status"]');
+      if (select) select.value = item.status;
+    });
+    const count = document.querySelector('[data-sync-active-count]');
+    if (count) count.textContent = assignments.length;
+    const empty = document.querySelector('[data-sync-empty]');
+    if (empty) empty.classList.toggle('hidden', document.querySelector('[data-assignment-card]') !== null);
+  }
+
+  function applyResponse(data) {
+    const badge = document.querySelector('[data-sync-deliverer-status]');
+    if (badge && data.deliverer_status_label) badge.textContent = data.deliverer_status_label;
+    if (Array.isArray(data.assignments)) applyAssignments(data.assignments);
+    (data.results || []).forEach(result => {
+      if (result.outcome !== 'applied' && !result.duplicate && result.message) notify(result.message, true);
+    });
+  }
+
+  async function flush() {
+    const queue = load();
+    if (sending || !queue.length || navigator.onLine === false) return;
+    sending = true;
+    try {
+      const response = await fetch(syncUrl, {
+        method: 'POST',
+        headers: { 'Accept': 'application/json', 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken() },
+        credentials: 'same-origin',
+        body: JSON.stringify({ changes: queue }),
+      });
+      const data = await response.json().catch(() => null);
+      if (response.status === 401) {
+        notify((data && data.message) || 'Session expirée, reconnectez-vous.', true);
+        return;
+      }
+      if (!response.ok || !data || data.ok === false) return;
+      // Retire seulement les changements traités (d'autres ont pu être ajoutés pendant l'envoi)
+      const done = new Set((data.results || []).map(result => result.id));
+      save(load().filter(change => !done.has(change.id)));
+      applyResponse(data);
+    } catch (e) {
+      // Réseau indisponible : nouvel essai au retour en ligne ou au prochain intervalle
+    } finally {
+      sending = false;
+    }
+  }
+
+  function enqueue(change) {
+    const queue = load();
+    queue.push(Object.assign({ id: newId(), recorded_at: new Date().toISOString() }, change));
+    save(queue);
+    flush();
+  }
+
+  document.addEventListener('submit', event => {
+    const form = event.target.closest('form[data-sync]');
+    if (!form) return;
+    event.preventDefault();
+    const status = form.querySelector('[name="status"]');
+    if (form.dataset.sync === 'assignment') {
+      const note = form.querySelector('[name="note"]');
+      enqueue({
+        type: 'assignment',
+        assignment_id: Number(form.dataset.assignmentId),
+        status: status ? status.value : '',
+        note: note ? note.value.trim() : '',
+      });
+      if (note) note.value = '';
+    } else {
+      enqueue({ type: 'deliverer_status', status: status ? status.value : '' });
+    }
+  });
+
+  window.addEventListener('online', flush);
+  document.addEventListener('DOMContentLoaded', () => {
+    showPending(load().length);
+    flush();
+  });
+  setInterval(flush, RETRY_MS);
+})();
@@ -0,0 +1,58 @@
+# gunicorn.conf.py - chargé automatiquement par gunicorn depuis le dossier courant
+#
+# Mode préchargement (GUNICORN_PRELOAD=true) : l'app est importée une seule fois dans le
+# maître, les modules lourds (PDF, imports) y sont préchauffés, puis les workers forkés
+# partagent cet état (copy-on-write) au lieu de tout réimporter au premier visiteur.
+import os
+
+_truthy = ('1', 'true', 'yes')
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False').lower() in _truthy
+_warmup = os.getenv('GUNICORN_WARMUP', 'True').lower() in _truthy
+
+# Modules chargés à la demande par l'app (exports PDF, imports catalogue)
+WARMUP_MODULES = (
+    'backend.utils.invoice_generator',
+    'backend.utils.pdf_generator',
+    'openpyxl',
+    'docx',
+    'PyPDF2',
+)
+
+
+def when_ready(server):
+    """Maître prêt (avant le fork des workers) : préchauffer les imports lourds si l'app est préchargée."""
+    if not (preload_app and _warmup):
+        return
+    import importlib
+    for name in WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as exc:
+            server.log.warning("Préchauffage %s impossible: %s", name, exc)
+
+
+def post_fork(server, worker):
+    """Worker forké : ne pas partager les connexions DB du maître, puis lancer les tâches de fond.
+
+    Les fils lancés dans le maître ne survivent pas au fork : en préchargement,
+    `create_app` les diffère et chaque worker les démarre ici.
+    """
+    if not preload_app:
+        return
+    try:
+        from backend.models import db
+        from wsgi import app
+        with app.app_context():
+            try:
+                db.engine.dispose(close=False)
+            except TypeError:  # SQLAlchemy < 1.4.33
+                db.engine.dispose()
+    except Exception as exc:
+        server.log.warning("Réinitialisation du pool DB après fork impossible: %s", exc)
+        return
+    try:
+        from backend.utils import workers
+        workers.start()
+    except Exception as exc:
+        server.log.warning("Démarrage des tâches de fond impossible: %s", exc)
@@ -0,0 +1,47 @@
+"""add exchange_rates table (central currency engine)
+
+Revision ID: a1c4e7b9d2f6
+Revises: f2a6d8c4b1e3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e7b9d2f6'
+down_revision = 'f2a6d8c4b1e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'exchange_rates' not in inspector.get_table_names():
+        table = op.create_table(
+            'exchange_rates',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('base', sa.String(length=3), nullable=False),
+            sa.Column('quote', sa.String(length=3), nullable=False),
+            sa.Column('rate', sa.Float(), nullable=False),
+            sa.Column('source', sa.String(length=20), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('base', 'quote', name='uq_exchange_rate_pair'),
+        )
+        # Taux jusque-là codé en dur dans l'application
+        op.bulk_insert(table, [
+            {'base': 'USD', 'quote': 'CDF', 'rate': 2200.0, 'source': 'default', 'updated_at': datetime.utcnow()},
+        ])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'exchange_rates' in inspector.get_table_names():
+        op.drop_table('exchange_rates')
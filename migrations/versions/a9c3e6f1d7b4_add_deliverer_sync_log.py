@@ -0,0 +1,46 @@
+"""add deliverer_sync_log table (offline sync idempotency)
+
+Revision ID: a9c3e6f1d7b4
+Revises: f7b2d5e8c4a1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e6f1d7b4'
+down_revision = 'f7b2d5e8c4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'deliverer_sync_log' not in inspector.get_table_names():
+        op.create_table(
+            'deliverer_sync_log',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('deliverer_id', sa.Integer(), sa.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('change_id', sa.String(length=64), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('target_id', sa.Integer(), nullable=True),
+            sa.Column('outcome', sa.String(length=20), nullable=False),
+            sa.Column('message', sa.String(length=255), nullable=True),
+            sa.Column('recorded_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('deliverer_id', 'change_id', name='uq_deliverer_sync_change'),
+        )
+        op.create_index('ix_deliverer_sync_log_created_at', 'deliverer_sync_log', ['created_at'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'deliverer_sync_log' in inspector.get_table_names():
+        op.drop_index('ix_deliverer_sync_log_created_at', table_name='deliverer_sync_log')
+        op.drop_table('deliverer_sync_log')
@@ -0,0 +1,36 @@
+"""index products.category_id (category counts, EXISTS on delete)
+
+Revision ID: b3d5f8a2c7e1
+Revises: a1c4e7b9d2f6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d5f8a2c7e1'
+down_revision = 'a1c4e7b9d2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'products' in inspector.get_table_names():
+        indexed = {tuple(ix['column_names']) for ix in inspector.get_indexes('products')}
+        if ('category_id',) not in indexed:
+            op.create_index('ix_products_category_id', 'products', ['category_id'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'products' in inspector.get_table_names():
+        names = {ix['name'] for ix in inspector.get_indexes('products')}
+        if 'ix_products_category_id' in names:
+            op.drop_index('ix_products_category_id', table_name='products')
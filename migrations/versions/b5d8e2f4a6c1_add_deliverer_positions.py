@@ -0,0 +1,62 @@
+"""deliverer last position columns and dispatch indexes
+
+Revision ID: b5d8e2f4a6c1
+Revises: a9c3e6f1d7b4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8e2f4a6c1'
+down_revision = 'a9c3e6f1d7b4'
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    'last_latitude': sa.Float(),
+    'last_longitude': sa.Float(),
+    'last_position_at': sa.DateTime(),
+}
+INDEXES = {
+    ('delivery_assignments', 'ix_delivery_assignments_order_status'): ['order_id', 'status'],
+    ('orders', 'ix_orders_status'): ['status'],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'deliverers' in tables:
+        existing = {col['name'] for col in inspector.get_columns('deliverers')}
+        with op.batch_alter_table('deliverers', schema=None) as batch_op:
+            for name, type_ in COLUMNS.items():
+                if name not in existing:
+                    batch_op.add_column(sa.Column(name, type_, nullable=True))
+
+    for (table, name), columns in INDEXES.items():
+        if table in tables:
+            indexed = {tuple(ix['column_names']) for ix in inspector.get_indexes(table)}
+            if tuple(columns) not in indexed:
+                op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    for (table, name), _ in INDEXES.items():
+        if table in tables and name in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
+
+    if 'deliverers' in tables:
+        existing = {col['name'] for col in inspector.get_columns('deliverers')}
+        with op.batch_alter_table('deliverers', schema=None) as batch_op:
+            for name in COLUMNS:
+                if name in existing:
+                    batch_op.drop_column(name)
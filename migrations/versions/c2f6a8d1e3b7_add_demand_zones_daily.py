@@ -0,0 +1,49 @@
+"""add demand_zones_daily rollup (delivered demand by geohash and hour of week)
+
+Revision ID: c2f6a8d1e3b7
+Revises: b5d8e2f4a6c1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f6a8d1e3b7'
+down_revision = 'b5d8e2f4a6c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'demand_zones_daily' not in tables:
+        op.create_table(
+            'demand_zones_daily',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('geohash', sa.String(length=12), nullable=False),
+            sa.Column('hour_of_week', sa.SmallInteger(), nullable=False),
+            sa.Column('orders', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('delivery_seconds', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('timed_orders', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index('ix_demand_zones_daily_day_geohash', 'demand_zones_daily', ['day', 'geohash'], unique=False)
+
+    # Cumuls existants sans les zones : reconstruction complète à la prochaine passe
+    if 'rollup_state' in tables:
+        op.execute(sa.text("UPDATE rollup_state SET stale = :stale").bindparams(stale=True))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'demand_zones_daily' in inspector.get_table_names():
+        op.drop_index('ix_demand_zones_daily_day_geohash', table_name='demand_zones_daily')
+        op.drop_table('demand_zones_daily')
@@ -0,0 +1,50 @@
+"""add updated_at to products/categories and catalog_version to shop settings
+
+Revision ID: c3a9e1f2b7d4
+Revises: 1069c02827c9
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9e1f2b7d4'
+down_revision = '1069c02827c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in ('products', 'categories'):
+        cols = {c["name"] for c in inspector.get_columns(table)}
+        if "updated_at" not in cols:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Valeur initiale : date de création
+        op.execute(sa.text(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL"))
+
+    cols = {c["name"] for c in inspector.get_columns("shop_settings")}
+    if "catalog_version" not in cols:
+        with op.batch_alter_table('shop_settings', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('catalog_version', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    cols = {c["name"] for c in inspector.get_columns("shop_settings")}
+    if "catalog_version" in cols:
+        with op.batch_alter_table('shop_settings', schema=None) as batch_op:
+            batch_op.drop_column('catalog_version')
+
+    for table in ('products', 'categories'):
+        cols = {c["name"] for c in inspector.get_columns(table)}
+        if "updated_at" in cols:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.drop_column('updated_at')
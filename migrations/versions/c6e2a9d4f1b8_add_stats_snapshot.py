@@ -0,0 +1,54 @@
+"""add stats_snapshot table (admin dashboard counters)
+
+Revision ID: c6e2a9d4f1b8
+Revises: b3d5f8a2c7e1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a9d4f1b8'
+down_revision = 'b3d5f8a2c7e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'stats_snapshot' not in inspector.get_table_names():
+        # Ligne créée (et remplie) à la première lecture ou par `flask reconcile-stats`
+        op.create_table(
+            'stats_snapshot',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('total_products', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('total_orders', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('total_users', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('pending_orders', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('recognized_revenue', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('revenue_recognized_until', sa.DateTime(), nullable=True),
+            sa.Column('dirty', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'orders' in inspector.get_table_names():
+        indexed = {tuple(ix['column_names']) for ix in inspector.get_indexes('orders')}
+        if ('delivered_at',) not in indexed:
+            op.create_index('ix_orders_delivered_at', 'orders', ['delivered_at'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'orders' in inspector.get_table_names():
+        names = {ix['name'] for ix in inspector.get_indexes('orders')}
+        if 'ix_orders_delivered_at' in names:
+            op.drop_index('ix_orders_delivered_at', table_name='orders')
+    if 'stats_snapshot' in inspector.get_table_names():
+        op.drop_table('stats_snapshot')
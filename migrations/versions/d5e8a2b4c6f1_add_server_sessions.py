@@ -0,0 +1,39 @@
+"""add server_sessions table (server-side session store)
+
+Revision ID: d5e8a2b4c6f1
+Revises: c3a9e1f2b7d4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e8a2b4c6f1'
+down_revision = 'c3a9e1f2b7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'server_sessions' not in inspector.get_table_names():
+        op.create_table(
+            'server_sessions',
+            sa.Column('id', sa.String(length=64), primary_key=True),
+            sa.Column('data', sa.Text(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_server_sessions_expires_at', 'server_sessions', ['expires_at'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'server_sessions' in inspector.get_table_names():
+        op.drop_index('ix_server_sessions_expires_at', table_name='server_sessions')
+        op.drop_table('server_sessions')
@@ -0,0 +1,79 @@
+"""add daily sales / deliveries rollup tables
+
+Revision ID: d8f1b4e6a3c9
+Revises: c6e2a9d4f1b8
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f1b4e6a3c9'
+down_revision = 'c6e2a9d4f1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    # Tables remplies à la première passe (`rolled_until` absent) ou par `flask rebuild-rollups`
+    if 'sales_daily' not in tables:
+        op.create_table(
+            'sales_daily',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('category_id', sa.Integer(), nullable=True),
+            sa.Column('product_id', sa.Integer(), nullable=True),
+            sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('units', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('orders', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index('ix_sales_daily_day', 'sales_daily', ['day'], unique=False)
+        op.create_index('ix_sales_daily_product_day', 'sales_daily', ['product_id', 'day'], unique=False)
+        op.create_index('ix_sales_daily_category_day', 'sales_daily', ['category_id', 'day'], unique=False)
+
+    if 'sales_daily_totals' not in tables:
+        op.create_table(
+            'sales_daily_totals',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('units', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('orders', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+    if 'deliveries_daily' not in tables:
+        op.create_table(
+            'deliveries_daily',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('deliverer_id', sa.Integer(), nullable=False),
+            sa.Column('deliveries', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        )
+        op.create_index('ix_deliveries_daily_day', 'deliveries_daily', ['day'], unique=False)
+        op.create_index('ix_deliveries_daily_deliverer_day', 'deliveries_daily', ['deliverer_id', 'day'], unique=False)
+
+    if 'rollup_state' not in tables:
+        op.create_table(
+            'rollup_state',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('rolled_until', sa.DateTime(), nullable=True),
+            sa.Column('stale', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('rebuilt_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    for name in ('rollup_state', 'deliveries_daily', 'sales_daily_totals', 'sales_daily'):
+        if name in tables:
+            op.drop_table(name)
@@ -0,0 +1,152 @@
+"""add commission ledger and monthly snapshots (backfilled from assignments)
+
+Revision ID: e4a7c2d9b5f3
+Revises: d8f1b4e6a3c9
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2d9b5f3'
+down_revision = 'd8f1b4e6a3c9'
+branch_labels = None
+depends_on = None
+
+
+def _commission_for_amount(total):
+    # Barème à la date de la migration (cf. backend.utils.commissions)
+    if total <= 25:
+        return 3.0
+    if total < 80:
+        return 4.0
+    return 4.0 + (0.02 * total)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _backfill(bind, ledger):
+    """Reprend l'historique : crédits et bonus réellement versés, puis écart avec `commission_due`.
+
+    Seuls les mouvements attestés en base sont repris : crédit et bonus dimanche des
+    affectations comptabilisées, bonus hebdo de la dernière semaine payée
+    (`last_bonus_week_start` × `weekly_bonus_paid_count`). Les semaines antérieures et
+    les paiements ne laissaient pas de trace : une seule ligne de reprise ramène le
+    solde à `commission_due`.
+    """
+    deliverers = bind.execute(sa.text(
+        "SELECT id, commission_due, last_bonus_week_start, weekly_bonus_paid_count FROM deliverers"
+    )).fetchall()
+    rows = bind.execute(sa.text(
+        "SELECT a.id, a.deliverer_id, a.completed_at, a.payout_status, o.total_amount, o.delivered_at, o.order_number "
+        "FROM delivery_assignments a JOIN orders o ON o.id = a.order_id "
+        "WHERE a.status = 'delivered' AND a.commission_recorded = :recorded"
+    ), {'recorded': True}).fetchall()
+    by_deliverer = defaultdict(list)
+    for row in rows:
+        by_deliverer[row.deliverer_id].append(row)
+
+    now = datetime.utcnow()
+    entries = []
+    for deliverer in deliverers:
+        events = []
+        paid = 0
+        for row in by_deliverer.get(deliverer.id, []):
+            ref = _as_datetime(row.completed_at or row.delivered_at) or now
+            total = float(row.total_amount or 0)
+            events.append((ref, 'credit', _commission_for_amount(total), row.id, 1, None, row.order_number))
+            if ref.weekday() == 6:
+                events.append((ref, 'sunday_bonus', 0.05 * total, row.id, 0, None, row.order_number))
+            paid += row.payout_status == 'paid'
+        week = deliverer.last_bonus_week_start
+        if isinstance(week, str):
+            week = datetime.fromisoformat(week).date()
+        if week and deliverer.weekly_bonus_paid_count:
+            ref = min(datetime(week.year, week.month, week.day) + timedelta(days=7, seconds=-1), now)
+            count = int(deliverer.weekly_bonus_paid_count)
+            events.append((ref, 'weekly_bonus', count * 5.0, None, 0, week, f"{count} bonus hebdo"))
+        events.sort(key=lambda e: e[0])
+        balance = 0.0
+        for ref, kind, amount, assignment_id, deliveries, week_start, note in events:
+            # Même arrondi que `ledger.record` : le solde courant est la somme des montants écrits
+            amount = round(amount, 2)
+            balance = round(balance + amount, 2)
+            entries.append({'deliverer_id': deliverer.id, 'assignment_id': assignment_id, 'kind': kind,
+                            'amount': amount, 'balance': balance, 'deliveries': deliveries,
+                            'week_start': week_start, 'note': note, 'created_at': ref})
+        # Paiements (et bonus hebdo plus anciens) non tracés : l'écart ramène le solde à `commission_due`
+        due = round(float(deliverer.commission_due or 0), 2)
+        gap = round(due - balance, 2)
+        if gap:
+            entries.append({'deliverer_id': deliverer.id, 'assignment_id': None,
+                            'kind': 'payout' if gap < 0 else 'adjustment', 'amount': gap,
+                            'balance': due, 'deliveries': paid if gap < 0 else 0, 'week_start': None,
+                            'note': 'Reprise du solde existant', 'created_at': now})
+    if entries:
+        op.bulk_insert(ledger, entries)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'commission_ledger' not in tables:
+        ledger = op.create_table(
+            'commission_ledger',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('deliverer_id', sa.Integer(), sa.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('assignment_id', sa.Integer(), nullable=True),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('balance', sa.Float(), nullable=False),
+            sa.Column('deliveries', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('week_start', sa.Date(), nullable=True),
+            sa.Column('note', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.UniqueConstraint('assignment_id', 'kind', name='uq_commission_assignment_kind'),
+        )
+        op.create_index('ix_commission_ledger_deliverer_created', 'commission_ledger',
+                        ['deliverer_id', 'created_at'], unique=False)
+        if 'deliverers' in tables and 'delivery_assignments' in tables:
+            _backfill(bind, ledger)
+
+    if 'commission_snapshots' not in tables:
+        # Remplis à la première lecture ou par `flask snapshot-commissions`
+        op.create_table(
+            'commission_snapshots',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('deliverer_id', sa.Integer(), sa.ForeignKey('deliverers.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('month', sa.Date(), nullable=False),
+            sa.Column('credit', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('sunday_bonus', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('weekly_bonus', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('payout', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('adjustment', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('deliveries', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('deliveries_paid', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('closing_balance', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('deliverer_id', 'month', name='uq_commission_snapshot_month'),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'commission_snapshots' in tables:
+        op.drop_table('commission_snapshots')
+    if 'commission_ledger' in tables:
+        op.drop_index('ix_commission_ledger_deliverer_created', table_name='commission_ledger')
+        op.drop_table('commission_ledger')
@@ -0,0 +1,49 @@
+"""add denormalized item_count/subtotal to carts
+
+Revision ID: e9b3c7d1a5f2
+Revises: d5e8a2b4c6f1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c7d1a5f2'
+down_revision = 'd5e8a2b4c6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    cols = {c["name"] for c in inspector.get_columns("carts")}
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        if "item_count" not in cols:
+            batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+        if "subtotal" not in cols:
+            batch_op.add_column(sa.Column('subtotal', sa.Float(), nullable=False, server_default='0'))
+
+    # Valeurs initiales à partir des lignes existantes
+    op.execute(sa.text("""
+        UPDATE carts SET
+            item_count = COALESCE((SELECT SUM(ci.quantity) FROM cart_items ci WHERE ci.cart_id = carts.id), 0),
+            subtotal = COALESCE((SELECT SUM(ci.quantity * p.price) FROM cart_items ci
+                                 JOIN products p ON p.id = ci.product_id
+                                 WHERE ci.cart_id = carts.id), 0)
+    """))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    cols = {c["name"] for c in inspector.get_columns("carts")}
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        if "subtotal" in cols:
+            batch_op.drop_column('subtotal')
+        if "item_count" in cols:
+            batch_op.drop_column('item_count')
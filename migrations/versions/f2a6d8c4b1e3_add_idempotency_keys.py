@@ -0,0 +1,45 @@
+"""add idempotency_keys table (JSON cart/checkout API)
+
+Revision ID: f2a6d8c4b1e3
+Revises: e9b3c7d1a5f2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6d8c4b1e3'
+down_revision = 'e9b3c7d1a5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'idempotency_keys' not in inspector.get_table_names():
+        op.create_table(
+            'idempotency_keys',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('scope', sa.String(length=80), nullable=False),
+            sa.Column('key', sa.String(length=128), nullable=False),
+            sa.Column('endpoint', sa.String(length=120), nullable=False),
+            sa.Column('request_hash', sa.String(length=64), nullable=False),
+            sa.Column('status_code', sa.Integer(), nullable=True),
+            sa.Column('response_body', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('scope', 'key', name='uq_idempotency_scope_key'),
+        )
+        op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'idempotency_keys' in inspector.get_table_names():
+        op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+        op.drop_table('idempotency_keys')
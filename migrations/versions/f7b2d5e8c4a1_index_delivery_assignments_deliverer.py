@@ -0,0 +1,43 @@
+"""index delivery_assignments by deliverer (dashboard tabs and history cursor)
+
+Revision ID: f7b2d5e8c4a1
+Revises: e4a7c2d9b5f3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b2d5e8c4a1'
+down_revision = 'e4a7c2d9b5f3'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_delivery_assignments_deliverer_status': ['deliverer_id', 'status'],
+    'ix_delivery_assignments_deliverer_id_id': ['deliverer_id', 'id'],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'delivery_assignments' in inspector.get_table_names():
+        indexed = {tuple(ix['column_names']) for ix in inspector.get_indexes('delivery_assignments')}
+        for name, columns in INDEXES.items():
+            if tuple(columns) not in indexed:
+                op.create_index(name, 'delivery_assignments', columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'delivery_assignments' in inspector.get_table_names():
+        names = {ix['name'] for ix in inspector.get_indexes('delivery_assignments')}
+        for name in INDEXES:
+            if name in names:
+                op.drop_index(name, table_name='delivery_assignments')
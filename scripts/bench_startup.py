@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Mesure du démarrage à froid: import de `backend.apps`, `create_app()` et premières requêtes.
+
+Usage:
+  - `./scripts/bench_startup.py --runs 10`
+  - base ciblée: `DATABASE_URL=sqlite:////tmp/bench.db ./scripts/bench_startup.py`
+  - modules les plus coûteux à l'import: `./scripts/bench_startup.py --importtime 15`
+
+Chaque mesure tourne dans un interpréteur Python neuf (comme une machine Fly.io qui
+redémarre), les résultats affichés sont les médianes et le min/max sur `--runs`.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import backend.apps as apps_module
+t1 = time.perf_counter()
+app = apps_module.create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+timings = {'import_s': t1 - t0, 'create_app_s': t2 - t1}
+for path in PATHS:
+    start = time.perf_counter()
+    resp = client.get(path)
+    timings[f'first GET {path} ({resp.status_code})'] = time.perf_counter() - start
+heavy = [m for m in ('reportlab', 'qrcode', 'openpyxl', 'PyPDF2', 'docx') if m in sys.modules]
+print(json.dumps({'timings': timings, 'heavy_modules': heavy}))
+"""
+
+
+def run_child(paths):
+    code = f"PATHS = {paths!r}\n" + CHILD
+    env = dict(os.environ)
+    env.setdefault('MAIL_SUPPRESS_SEND', 'True')
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=project_root, env=env,
+                                  stderr=subprocess.DEVNULL)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def import_profile(top):
+    """Top des modules par temps cumulé (python -X importtime)."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import backend.apps'],
+                          cwd=project_root, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    print(f"\n{'cumul ms':>10} {'propre ms':>10}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:10.1f} {self_us / 1000:10.1f}  {name}")
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark du démarrage à froid')
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--path', action='append', dest='paths', help='Requête après démarrage (répétable)')
+    p.add_argument('--importtime', type=int, metavar='N', help='Afficher les N imports les plus coûteux')
+    p.add_argument('--output', help='Écrire les mesures brutes en JSON')
+    args = p.parse_args()
+    paths = args.paths or ['/', '/products']
+
+    runs = [run_child(paths) for _ in range(args.runs)]
+    keys = list(runs[0]['timings'])
+    print(f"{'étape':40} {'médiane':>10} {'min':>10} {'max':>10}")
+    for key in keys:
+        values = [r['timings'][key] for r in runs if key in r['timings']]
+        print(f"{key:40} {median(values) * 1000:8.1f}ms {min(values) * 1000:8.1f}ms {max(values) * 1000:8.1f}ms")
+    print(f"Modules lourds chargés au démarrage: {', '.join(runs[0]['heavy_modules']) or 'aucun'}")
+
+    if args.importtime:
+        import_profile(args.importtime)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(runs, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
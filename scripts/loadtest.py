@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+Générateur de charge pour Manga Store (scénarios boutique, admin, livreur, forum).
+
+Usage:
+  - contre une instance déjà lancée:
+      `./scripts/loadtest.py --base-url http://127.0.0.1:8080 --users 20 --duration 60`
+  - en démarrant l'app localement (gunicorn -k eventlet -w 1, comme en production):
+      `./scripts/loadtest.py --serve --database-url sqlite:////tmp/loadtest.db --users 20`
+  - scénarios authentifiés (comptes existants dans la base ciblée):
+      `--client-email ... --client-password ... --admin-email ... --admin-password ...
+       --deliverer-email ... --deliverer-password ...`
+
+Chaque scénario est une suite de requêtes HTTP rejouée en boucle par des utilisateurs
+virtuels (threads). Le rapport donne, par scénario et par étape, le débit, les latences
+p50/p95/p99 et le taux d'erreur; `--output` écrit le même rapport en JSON (clés triées)
+pour pouvoir le comparer d'un commit à l'autre.
+
+Le géocodage Nominatim est remplacé par un stub local: en mode `--serve` l'app reçoit
+`GEOCODER_URL` pointant vers ce stub, et le scénario checkout envoie de toute façon des
+coordonnées (comme le fait le JavaScript de la page checkout).
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from urllib.parse import urlsplit
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# ajouter le dossier principal au PYTHONPATH
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+CSRF_RE = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+PRODUCT_LINK_RE = re.compile(r'/product/(\d+)')
+
+# Kinshasa (coordonnées renvoyées par le stub de géocodage)
+STUB_LAT, STUB_LON = -4.3217, 15.3126
+
+DEFAULT_WEIGHTS = {
+    'browse': 6,
+    'guest_checkout': 2,
+    'client_orders': 2,
+    'admin_pages': 1,
+    'deliverer_dashboard': 1,
+    'forum_presence': 1,
+}
+
+
+class StepFailed(Exception):
+    """Étape d'un scénario en échec (statut inattendu, redirection vers login, ...)."""
+
+
+class Metrics:
+    """Collecte thread-safe des échantillons (scénario, étape, latence, succès)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # (scenario, step) -> [(latency_s, ok)]
+        self.iterations = defaultdict(lambda: {'ok': 0, 'failed': 0})
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, scenario, step, latency, ok):
+        with self._lock:
+            self.samples[(scenario, step)].append((latency, ok))
+
+    def iteration(self, scenario, ok):
+        with self._lock:
+            self.iterations[scenario]['ok' if ok else 'failed'] += 1
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _summarize(samples, elapsed):
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if not s[1])
+    count = len(samples)
+
+    def _ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': _ms(_percentile(latencies, 50)),
+            'p95': _ms(_percentile(latencies, 95)),
+            'p99': _ms(_percentile(latencies, 99)),
+            'max': _ms(latencies[-1] if latencies else None),
+        },
+    }
+
+
+class VirtualUser:
+    """Un utilisateur virtuel: une session HTTP (cookies) et le contexte partagé."""
+
+    def __init__(self, ctx, metrics, scenario):
+        self.ctx = ctx
+        self.metrics = metrics
+        self.scenario = scenario
+        self.http = requests.Session()
+        self.http.headers['User-Agent'] = 'MangaStore-loadtest/1.0'
+
+    def _url(self, path):
+        return self.ctx['base_url'].rstrip('/') + path
+
+    def request(self, step, method, path, expect=(200,), expect_path=None, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.ctx['timeout'])
+        start = time.perf_counter()
+        ok = False
+        try:
+            resp = self.http.request(method, self._url(path), **kwargs)
+            ok = resp.status_code in expect
+            location = resp.headers.get('Location') or ''
+            if ok and resp.status_code in (301, 302, 303) and '/login' in location:
+                ok = False
+            # En cas d'échec, les formulaires de connexion redirigent vers leur propre page
+            if ok and expect_path is not None and urlsplit(location).path != expect_path:
+                ok = False
+            return resp if ok else None
+        except requests.RequestException:
+            return None
+        finally:
+            self.metrics.record(self.scenario, step, time.perf_counter() - start, ok)
+
+    def get(self, step, path, **kwargs):
+        resp = self.request(step, 'GET', path, **kwargs)
+        if resp is None:
+            raise StepFailed(step)
+        return resp
+
+    def post(self, step, path, data=None, expect=(200, 302), **kwargs):
+        resp = self.request(step, 'POST', path, data=data, expect=expect, **kwargs)
+        if resp is None:
+            raise StepFailed(step)
+        return resp
+
+    @staticmethod
+    def csrf_from(resp):
+        match = CSRF_RE.search(resp.text or '')
+        if not match:
+            raise StepFailed('csrf_token')
+        return match.group(1)
+
+    def login(self, kind):
+        creds = self.ctx['credentials'].get(kind)
+        if not creds:
+            raise StepFailed(f'{kind}_credentials')
+        login_page, login_action, success_path = {
+            'client': ('/login', '/login', '/'),
+            'admin': ('/admin', '/admin/login', '/admin/dashboard'),
+            'deliverer': ('/livreur', '/livreur/login', '/livreur/dashboard'),
+        }[kind]
+        page = self.get(f'{kind}_login_page', login_page)
+        token = self.csrf_from(page)
+        self.post(f'{kind}_login', login_action, data={
+            'csrf_token': token,
+            'email': creds[0],
+            'password': creds[1],
+        }, expect=(302,), expect_path=success_path)
+
+
+# === SCÉNARIOS ===
+
+def scenario_browse(vu):
+    """Navigation anonyme: accueil, catalogue, recherche, catégories, fiche produit."""
+    vu.get('home', '/')
+    resp = vu.get('products', '/products')
+    ids = PRODUCT_LINK_RE.findall(resp.text or '')
+    term = random.choice(vu.ctx['search_terms'])
+    vu.get('search', f'/products?q={term}')
+    vu.get('categories', '/categories')
+    if ids:
+        vu.get('product_detail', f'/product/{random.choice(ids)}')
+
+
+def scenario_guest_checkout(vu):
+    """Panier invité puis commande (coordonnées fournies: aucun appel Nominatim)."""
+    product_ids = vu.ctx['product_ids']
+    if not product_ids:
+        raise StepFailed('no_products')
+    product_id = random.choice(product_ids)
+    page = vu.get('product_detail', f'/product/{product_id}')
+    token = vu.csrf_from(page)
+    vu.post('add_to_cart', f'/add_to_cart/{product_id}', data={'csrf_token': token, 'quantity': 1},
+            headers={'X-Requested-With': 'fetch', 'Accept': 'application/json'}, expect=(200,))
+    vu.get('cart', '/cart')
+    checkout_page = vu.get('checkout_page', '/checkout')
+    token = vu.csrf_from(checkout_page)
+    suffix = uuid.uuid4().hex[:12]
+    resp = vu.post('checkout', '/checkout', data={
+        'csrf_token': token,
+        'first_name': 'Charge',
+        'last_name': f'Test{suffix[:4]}',
+        'email': f'loadtest+{suffix}@example.com',
+        'phone': '+243000000000',
+        'shipping_address': 'Avenue du Commerce 1, Gombe, Kinshasa',
+        'shipping_latitude': str(STUB_LAT),
+        'shipping_longitude': str(STUB_LON),
+        'shipping_geocoded': 'Gombe, Kinshasa',
+        'shipping_method': 'standard',
+        'payment_method': 'cash_on_delivery',
+        'order_notes': 'loadtest',
+    }, expect=(302,))
+    location = resp.headers.get('Location') or ''
+    if '/order_confirmation/' not in location:
+        raise StepFailed('checkout')
+    vu.get('order_confirmation', urlsplit(location).path)
+
+
+def scenario_client_orders(vu):
+    """Client connecté: historique de commandes et profil."""
+    if not vu.ctx.get('_logged_in'):
+        vu.login('client')
+        vu.ctx['_logged_in'] = True
+    vu.get('orders', '/orders')
+    vu.get('profile', '/profile')
+
+
+def scenario_admin_pages(vu):
+    """Admin connecté: tableau de bord, commandes, clients."""
+    if not vu.ctx.get('_logged_in'):
+        vu.login('admin')
+        vu.ctx['_logged_in'] = True
+    vu.get('admin_dashboard', '/admin/dashboard')
+    vu.get('admin_orders', '/admin/orders')
+    vu.get('admin_clients', '/admin/clients')
+
+
+def scenario_deliverer_dashboard(vu):
+    """Livreur connecté: tableau de bord des affectations."""
+    if not vu.ctx.get('_logged_in'):
+        vu.login('deliverer')
+        vu.ctx['_logged_in'] = True
+    vu.get('deliverer_dashboard', '/livreur/dashboard')
+
+
+def scenario_forum_presence(vu):
+    """Client connecté: page forum puis présence Socket.IO (connect -> presence:update)."""
+    if not vu.ctx.get('_logged_in'):
+        vu.login('client')
+        vu.ctx['_logged_in'] = True
+    vu.get('forum', '/forum')
+
+    try:
+        import socketio  # python-socketio (dépendance de Flask-SocketIO)
+    except Exception:
+        raise StepFailed('socketio_client_missing')
+
+    received = threading.Event()
+    client = socketio.Client(reconnection=False, http_session=vu.http)
+    client.on('presence:update', lambda data: received.set())
+    start = time.perf_counter()
+    ok = False
+    try:
+        client.connect(vu.ctx['base_url'], transports=['polling'], wait_timeout=vu.ctx['timeout'])
+        ok = received.wait(vu.ctx['timeout'])
+    except Exception:
+        ok = False
+    finally:
+        vu.metrics.record(vu.scenario, 'socketio_presence', time.perf_counter() - start, ok)
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+    if not ok:
+        raise StepFailed('socketio_presence')
+
+
+SCENARIOS = {
+    'browse': scenario_browse,
+    'guest_checkout': scenario_guest_checkout,
+    'client_orders': scenario_client_orders,
+    'admin_pages': scenario_admin_pages,
+    'deliverer_dashboard': scenario_deliverer_dashboard,
+    'forum_presence': scenario_forum_presence,
+}
+
+SCENARIO_CREDENTIALS = {
+    'client_orders': 'client',
+    'forum_presence': 'client',
+    'admin_pages': 'admin',
+    'deliverer_dashboard': 'deliverer',
+}
+
+
+def _parse_weights(raw, credentials):
+    if raw:
+        weights = {}
+        for token in raw.split(','):
+            token = token.strip()
+            if not token:
+                continue
+            name, _, weight = token.partition('=')
+            name = name.strip()
+            if name not in SCENARIOS:
+                raise SystemExit(f"Scénario inconnu: {name} (disponibles: {', '.join(SCENARIOS)})")
+            weights[name] = float(weight or 1)
+    else:
+        weights = dict(DEFAULT_WEIGHTS)
+    # Ignorer les scénarios authentifiés sans identifiants
+    for name in list(weights):
+        kind = SCENARIO_CREDENTIALS.get(name)
+        if kind and kind not in credentials:
+            print(f"⚠️ Scénario '{name}' ignoré (identifiants {kind} absents)")
+            weights.pop(name)
+    if not weights:
+        raise SystemExit("Aucun scénario exécutable.")
+    return weights
+
+
+def _user_loop(index, ctx, metrics, weights, deadline):
+    rnd = random.Random(ctx['seed'] + index)
+    names = list(weights)
+    cum = []
+    acc = 0.0
+    for name in names:
+        acc += weights[name]
+        cum.append(acc)
+    # Une session persistante par scénario (garde la connexion des comptes authentifiés)
+    users = {}
+    while time.time() < deadline:
+        scenario = rnd.choices(names, cum_weights=cum)[0]
+        if scenario not in users or scenario == 'guest_checkout':
+            # Nouveau visiteur à chaque commande invitée (panier et cookie vierges)
+            users[scenario] = VirtualUser(dict(ctx), metrics, scenario)
+        vu = users[scenario]
+        try:
+            SCENARIOS[scenario](vu)
+            metrics.iteration(scenario, True)
+        except StepFailed:
+            metrics.iteration(scenario, False)
+            # Repartir d'une session vierge (cookies, connexion) après un échec
+            users.pop(scenario, None)
+        if ctx['think_time']:
+            time.sleep(rnd.uniform(0, ctx['think_time']))
+
+
+def _discover_products(base_url, timeout):
+    try:
+        resp = requests.get(base_url.rstrip('/') + '/products', timeout=timeout)
+        return sorted(set(PRODUCT_LINK_RE.findall(resp.text or '')), key=int)
+    except requests.RequestException:
+        return []
+
+
+class _GeocoderStub(BaseHTTPRequestHandler):
+    """Répond comme Nominatim (/search?format=json) avec une position fixe."""
+
+    def do_GET(self):
+        body = json.dumps([{'lat': str(STUB_LAT), 'lon': str(STUB_LON), 'display_name': 'Gombe, Kinshasa (stub)'}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_geocoder_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _GeocoderStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _serve_app(args, geocoder_url):
+    """Lance gunicorn -k eventlet -w 1 (configuration de production) sur un port libre."""
+    port = args.port or _free_port()
+    env = dict(os.environ)
+    env.update({
+        'GEOCODER_URL': geocoder_url,
+        'MAIL_SUPPRESS_SEND': 'True',
+        'PREFERRED_URL_SCHEME': 'http',
+        'ALLOW_SQLITE_FALLBACK': 'false',
+    })
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    cmd = [sys.executable, '-m', 'gunicorn', '-k', 'eventlet', '-w', '1',
+           '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:app']
+    proc = subprocess.Popen(cmd, cwd=project_root, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Le serveur s'est arrêté au démarrage (code {proc.returncode}).")
+        try:
+            requests.get(base_url + '/about', timeout=2)
+            return proc, base_url
+        except requests.RequestException:
+            time.sleep(0.3)
+    proc.terminate()
+    raise SystemExit("Le serveur n'a pas répondu dans les 60s.")
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def build_report(metrics, args, weights, base_url):
+    elapsed = max(1e-9, (metrics.finished_at or time.time()) - (metrics.started_at or time.time()))
+    scenarios = {}
+    by_scenario = defaultdict(list)
+    for (scenario, step), samples in metrics.samples.items():
+        by_scenario[scenario].extend(samples)
+    for scenario in sorted(set(by_scenario) | set(metrics.iterations)):
+        entry = _summarize(by_scenario.get(scenario, []), elapsed)
+        entry['iterations'] = dict(metrics.iterations.get(scenario, {'ok': 0, 'failed': 0}))
+        entry['steps'] = {
+            step: _summarize(samples, elapsed)
+            for (sc, step), samples in sorted(metrics.samples.items())
+            if sc == scenario
+        }
+        scenarios[scenario] = entry
+    all_samples = [s for samples in metrics.samples.values() for s in samples]
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'started_at': datetime.utcfromtimestamp(metrics.started_at).isoformat() + 'Z' if metrics.started_at else None,
+            'duration_s': round(elapsed, 2),
+            'users': args.users,
+            'target': base_url,
+            'database': (args.database_url or os.getenv('DATABASE_URL') or 'sqlite').split(':', 1)[0],
+            'weights': weights,
+            'seed': args.seed,
+        },
+        'total': _summarize(all_samples, elapsed),
+        'scenarios': scenarios,
+    }
+
+
+def print_report(report):
+    print("\n" + "=" * 96)
+    print(f"{'Scénario / étape':38} {'req':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7}")
+    print("-" * 96)
+
+    def _line(label, s):
+        lat = s['latency_ms']
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{label:38} {s['requests']:7d} {s['throughput_rps']:8.2f} {fmt(lat['p50'])} {fmt(lat['p95'])} "
+              f"{fmt(lat['p99'])} {s['error_rate'] * 100:6.2f}%")
+
+    for name, entry in report['scenarios'].items():
+        _line(name, entry)
+        for step, s in entry['steps'].items():
+            _line(f"  · {step}", s)
+    print("-" * 96)
+    _line('TOTAL', report['total'])
+    print("=" * 96)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Test de charge Manga Store')
+    p.add_argument('--base-url', default='http://127.0.0.1:8080', help="URL de l'instance ciblée")
+    p.add_argument('--serve', action='store_true', help="Démarrer l'app (gunicorn eventlet, 1 worker) pour le test")
+    p.add_argument('--database-url', help='DATABASE_URL utilisée avec --serve (SQLite ou PostgreSQL)')
+    p.add_argument('--port', type=int, help='Port du serveur lancé avec --serve (libre par défaut)')
+    p.add_argument('--users', type=int, default=10, help='Utilisateurs virtuels simultanés')
+    p.add_argument('--duration', type=float, default=30.0, help='Durée du test en secondes')
+    p.add_argument('--ramp-up', type=float, default=5.0, help='Montée en charge (secondes)')
+    p.add_argument('--think-time', type=float, default=0.0, help='Pause aléatoire max entre itérations (s)')
+    p.add_argument('--timeout', type=float, default=15.0, help='Timeout HTTP par requête (s)')
+    p.add_argument('--scenarios', help='Pondérations, ex: browse=6,guest_checkout=2,admin_pages=1')
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--output', help='Fichier JSON de résultats (comparable entre commits)')
+    for kind in ('client', 'admin', 'deliverer'):
+        p.add_argument(f'--{kind}-email', default=os.getenv(f'LOADTEST_{kind.upper()}_EMAIL'))
+        p.add_argument(f'--{kind}-password', default=os.getenv(f'LOADTEST_{kind.upper()}_PASSWORD'))
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+
+    credentials = {}
+    for kind in ('client', 'admin', 'deliverer'):
+        email = getattr(args, f'{kind}_email')
+        password = getattr(args, f'{kind}_password')
+        if email and password:
+            credentials[kind] = (email, password)
+    weights = _parse_weights(args.scenarios, credentials)
+
+    server_proc = None
+    stub_server = None
+    base_url = args.base_url
+    if args.serve:
+        stub_server, geocoder_url = _start_geocoder_stub()
+        server_proc, base_url = _serve_app(args, geocoder_url)
+        print(f"🚀 Serveur de test: {base_url} (géocodeur stub: {geocoder_url})")
+
+    try:
+        product_ids = _discover_products(base_url, args.timeout)
+        if 'guest_checkout' in weights and not product_ids:
+            print("⚠️ Aucun produit actif trouvé: scénario guest_checkout ignoré")
+            weights.pop('guest_checkout')
+            if not weights:
+                raise SystemExit("Aucun scénario exécutable.")
+
+        ctx = {
+            'base_url': base_url,
+            'timeout': args.timeout,
+            'think_time': args.think_time,
+            'seed': args.seed,
+            'credentials': credentials,
+            'product_ids': product_ids,
+            'search_terms': ['manga', 'a', 'pack', 'vol', 'the', 'zz-aucun-resultat'],
+        }
+        metrics = Metrics()
+        metrics.started_at = time.time()
+        deadline = metrics.started_at + args.duration
+        threads = []
+        print(f"⏱️ {args.users} utilisateurs, {args.duration:.0f}s, scénarios: {weights}")
+        for i in range(args.users):
+            t = threading.Thread(target=_user_loop, args=(i, ctx, metrics, weights, deadline), daemon=True)
+            t.start()
+            threads.append(t)
+            if args.ramp_up and args.users > 1:
+                time.sleep(args.ramp_up / args.users)
+        for t in threads:
+            t.join(timeout=max(0.0, deadline - time.time()) + args.timeout + 5)
+        metrics.finished_at = time.time()
+
+        report = build_report(metrics, args, weights, base_url)
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+            print(f"💾 Résultats: {args.output}")
+    finally:
+        if server_proc:
+            server_proc.send_signal(signal.SIGTERM)
+            try:
+                server_proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server_proc.kill()
+        if stub_server:
+            stub_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks des helpers et générateurs sensibles (PDF, imports, commissions...).
+
+Usage:
+  - mesurer et afficher: `./scripts/microbench.py`
+  - enregistrer une référence: `./scripts/microbench.py --save bench-baseline.json`
+  - comparer à la référence: `./scripts/microbench.py --compare bench-baseline.json`
+  - limiter aux benchmarks dont le nom contient un motif: `--filter import`
+
+Chaque benchmark utilise des entrées fixes (base SQLite temporaire, fichiers générés
+en mémoire), un échauffement, puis `--repeat` échantillons de `number` appels chacun.
+Le pic mémoire est mesuré à part avec tracemalloc (un appel), pour ne pas fausser
+les temps. En mode comparaison, un test de Mann-Whitney (unilatéral) signale les
+ralentissements significatifs (p < --alpha et médiane plus lente de --threshold %);
+le code de sortie vaut 1 dans ce cas.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from io import BytesIO
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from statistics import median
+
+# ajouter le dossier principal au PYTHONPATH
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+_tmpdir = tempfile.mkdtemp(prefix='mangastore-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('MAIL_SUPPRESS_SEND', 'True')
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(_tmpdir, 'uploads'))
+
+from werkzeug.datastructures import FileStorage  # noqa: E402
+
+from backend.apps import create_app  # noqa: E402
+from backend.models import db, User, Category, Product, Order, OrderItem, ShopSettings  # noqa: E402
+from backend.utils import generate_invoice_pdf, generate_products_pdf  # noqa: E402
+from backend.utils.helpers import get_first_image_url  # noqa: E402
+from backend.utils.importers import read_rows_from_file  # noqa: E402
+from backend.utils.commissions import assignment_commission, weekly_bonus_total  # noqa: E402
+
+IMPORT_HEADERS = ['name', 'category', 'price', 'compare_price', 'quantity', 'description', 'is_active']
+IMPORT_ROWS = 300
+
+
+# === FIXTURES ===
+
+def _import_rows():
+    return [[f"Manga {i}", f"Catégorie {i % 12}", f"{5 + i % 40}.99", '', str(i % 90),
+             f"Description du tome {i}", 'oui'] for i in range(IMPORT_ROWS)]
+
+
+def _fixture_files():
+    """Fichiers d'import (octets) identiques d'une exécution à l'autre, un par format."""
+    rows = _import_rows()
+    files = {}
+    files['csv'] = ('\n'.join(';'.join(r) for r in [IMPORT_HEADERS] + rows)).encode('utf-8')
+    files['tsv'] = ('\n'.join('|'.join(r) for r in [IMPORT_HEADERS] + rows)).encode('utf-8')
+
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.append(IMPORT_HEADERS)
+    for r in rows:
+        ws.append(r)
+    buf = BytesIO()
+    wb.save(buf)
+    files['xlsx'] = buf.getvalue()
+
+    from docx import Document
+    doc = Document()
+    table = doc.add_table(rows=1, cols=len(IMPORT_HEADERS))
+    for idx, h in enumerate(IMPORT_HEADERS):
+        table.rows[0].cells[idx].text = h
+    for r in rows[:100]:  # python-docx est lent à construire de grandes tables
+        cells = table.add_row().cells
+        for idx, v in enumerate(r):
+            cells[idx].text = v
+    buf = BytesIO()
+    doc.save(buf)
+    files['docx'] = buf.getvalue()
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    y = 800
+    for line in [IMPORT_HEADERS] + rows[:150]:
+        c.drawString(30, y, ';'.join(line))
+        y -= 14
+        if y < 40:
+            c.showPage()
+            y = 800
+    c.save()
+    files['pdf'] = buf.getvalue()
+    return files
+
+
+def _seed_db():
+    """Boutique minimale: 1 client, 200 produits, 1 commande de 15 lignes."""
+    db.create_all()
+    settings = ShopSettings(shop_name='Manga Store', currency='USD', shipping_cost=2.0)
+    db.session.add(settings)
+    cats = [Category(name=f"Catégorie {i}") for i in range(12)]
+    db.session.add_all(cats)
+    db.session.flush()
+    products = []
+    for i in range(200):
+        products.append(Product(name=f"Manga {i}", description=f"Description du tome {i}",
+                                price=5 + (i % 40) + 0.99, quantity=i % 90,
+                                images=json.dumps([f"products/cover-{i}.png"]),
+                                category_id=cats[i % len(cats)].id))
+    db.session.add_all(products)
+    user = User(email='bench@example.com', first_name='Bench', last_name='Client',
+                phone='+243000000000', address='1 avenue du Commerce, Gombe')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.flush()
+    order = Order(order_number='BENCH-000001', user_id=user.id, total_amount=0,
+                  shipping_address='1 avenue du Commerce, Gombe, Kinshasa', status='confirmed')
+    db.session.add(order)
+    db.session.flush()
+    total = 0.0
+    for p in products[:15]:
+        db.session.add(OrderItem(order_id=order.id, product_id=p.id, quantity=2, price=p.price))
+        total += 2 * p.price
+    order.total_amount = round(total + 2.0, 2)
+    db.session.commit()
+    return order.id
+
+
+def _assignments(n=2000):
+    """Affectations livrées synthétiques (objets simples, sans base)."""
+    base = datetime(2024, 1, 1, 9, 0)
+    items = []
+    for i in range(n):
+        completed = base + timedelta(hours=7 * i)
+        order = SimpleNamespace(total_amount=10 + (i * 7) % 150, delivered_at=completed)
+        items.append(SimpleNamespace(order=order, completed_at=completed))
+    return items
+
+
+def build_benchmarks(app):
+    """Retourne {nom: callable sans argument}; chaque callable tourne dans un contexte prêt."""
+    benches = {}
+    with app.app_context():
+        order_id = _seed_db()
+    files = _fixture_files()
+
+    def _in_request(fn):
+        def run():
+            with app.test_request_context('/'):
+                return fn()
+        return run
+
+    def _pdf_invoice():
+        order = db.session.get(Order, order_id)
+        return generate_invoice_pdf(order, 'USD')
+
+    def _pdf_products():
+        products = Product.query.order_by(Product.id).all()
+        return generate_products_pdf(products, 'USD')
+
+    benches['pdf.invoice'] = _in_request(_pdf_invoice)
+    benches['pdf.products_200'] = _in_request(_pdf_products)
+
+    image_products = [
+        SimpleNamespace(images=json.dumps(['products/a.png', 'products/b.png'])),
+        SimpleNamespace(images='uploads/products/a.png|uploads/products/b.png'),
+        SimpleNamespace(images='https://cdn.example.com/a.png'),
+        SimpleNamespace(images=None),
+    ]
+
+    def _images():
+        for p in image_products * 25:
+            get_first_image_url(p)
+
+    benches['helpers.get_first_image_url_x100'] = _in_request(_images)
+
+    for fmt, payload in files.items():
+        def _reader(payload=payload, fmt=fmt):
+            return read_rows_from_file(FileStorage(stream=BytesIO(payload), filename=f"catalogue.{fmt}"))
+        benches[f'import.read_rows.{fmt}'] = _reader
+
+    inject = next(fn for fn in app.template_context_processors[None]
+                  if getattr(fn, '__name__', '') == 'inject_global_vars')
+    benches['context.inject_global_vars'] = _in_request(inject)
+
+    assignments = _assignments()
+
+    def _commissions():
+        return sum(assignment_commission(a) for a in assignments)
+
+    benches['commissions.assignment_commission_x2000'] = _commissions
+    benches['commissions.weekly_bonus_total_x2000'] = lambda: weekly_bonus_total(assignments)
+    return benches
+
+
+# === MESURE ===
+
+def _calibrate(fn, target=0.02):
+    """Nombre d'appels par échantillon pour qu'un échantillon dure au moins `target` secondes."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or number >= 10000:
+            return number
+        number *= 2 if elapsed > target / 10 else 10
+
+
+def measure(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    number = _calibrate(fn)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'number': number,
+        'samples': samples,
+        'median_s': median(samples),
+        'min_s': min(samples),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def mann_whitney_greater(current, baseline):
+    """Test U unilatéral (current > baseline), approximation normale avec correction des ex aequo.
+
+    Retourne la p-valeur; assez précis dès ~10 échantillons par groupe.
+    """
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    pooled = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(pooled)
+    tie_term = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg_rank
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, group) in zip(ranks, pooled) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2.0
+    mu = n1 * n2 / 2.0
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))) if n > 1 else 0.0
+    if sigma == 0:
+        return 1.0
+    z = (u1 - mu - 0.5) / sigma  # correction de continuité
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _fmt_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Microbenchmarks Manga Store')
+    p.add_argument('--repeat', type=int, default=20, help="Nombre d'échantillons par benchmark")
+    p.add_argument('--warmup', type=int, default=3, help="Appels d'échauffement")
+    p.add_argument('--filter', help='Ne lancer que les benchmarks contenant ce motif')
+    p.add_argument('--save', help='Enregistrer les résultats (JSON) comme référence')
+    p.add_argument('--compare', help='Comparer à une référence JSON enregistrée avec --save')
+    p.add_argument('--alpha', type=float, default=0.01, help='Seuil de significativité')
+    p.add_argument('--threshold', type=float, default=5.0, help='Ralentissement minimal signalé (%%)')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    benches = build_benchmarks(app)
+    if args.filter:
+        benches = {k: v for k, v in benches.items() if args.filter in k}
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh).get('results', {})
+
+    results = {}
+    regressions = []
+    print(f"{'Benchmark':44} {'médiane':>12} {'min':>12} {'pic mém.':>11}  comparaison")
+    print('-' * 100)
+    for name, fn in benches.items():
+        res = measure(fn, args.repeat, args.warmup)
+        results[name] = res
+        note = ''
+        ref = baseline.get(name)
+        if ref:
+            ratio = res['median_s'] / ref['median_s'] if ref['median_s'] else 1.0
+            p_value = mann_whitney_greater(res['samples'], ref['samples'])
+            note = f"{(ratio - 1) * 100:+6.1f}% (p={p_value:.3g})"
+            if p_value < args.alpha and (ratio - 1) * 100 >= args.threshold:
+                note += '  ⚠️ RALENTISSEMENT'
+                regressions.append(name)
+        print(f"{name:44} {_fmt_time(res['median_s']):>12} {_fmt_time(res['min_s']):>12} "
+              f"{res['peak_kib']:8.1f} KiB  {note}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump({
+                'meta': {
+                    'revision': _git_revision(),
+                    'python': sys.version.split()[0],
+                    'created_at': datetime.utcnow().isoformat() + 'Z',
+                    'repeat': args.repeat,
+                },
+                'results': results,
+            }, fh, indent=2, sort_keys=True)
+        print(f"💾 Référence enregistrée: {args.save}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} ralentissement(s) significatif(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
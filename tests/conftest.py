@@ -0,0 +1,115 @@
+"""Application de test : base SQLite jetable, tâches de fond désactivées, CSRF coupé."""
+import os
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix='mangastore-tests-')
+
+# Avant l'import de `config` : les réglages sont lus à l'import
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_TMP, 'test.db')}",
+    MAIL_SUPPRESS_SEND='True',
+    STATIC_PRECOMPRESS_ON_START='False',
+    STATS_SWEEP_INTERVAL='0',
+    STATS_RECONCILE_INTERVAL='0',
+    ANALYTICS_ROLLUP_INTERVAL='0',
+    ANALYTICS_REBUILD_INTERVAL='0',
+    COMMISSION_SNAPSHOT_INTERVAL='0',
+    ACTIVITY_LOG_FLUSH_INTERVAL='0',
+    ACTIVITY_LOG_SPILL_PATH=os.path.join(_TMP, 'activity_spill.jsonl'),
+    SESSION_GC_INTERVAL='86400',
+    EXCHANGE_RATE_REFRESH_SECONDS='0',
+    AUTO_DISPATCH_ENABLED='False',
+    GEOCODER_URL='http://127.0.0.1:9/',
+)
+
+from backend.apps import create_app  # noqa: E402
+from backend.models import db as _db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SESSION_COOKIE_SECURE=False,
+                      REMEMBER_COOKIE_SECURE=False)
+    with app.app_context():
+        _db.create_all()
+    yield app
+
+
+@pytest.fixture
+def db(app):
+    """Contexte applicatif ouvert pendant le test : à ne pas combiner avec `client` (Flask réutilise
+    ce contexte, donc `g` et l'utilisateur connecté, pour chaque requête)."""
+    with app.app_context():
+        yield _db
+        _db.session.rollback()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def customer(app):
+    """Client enregistré ; créé dans son propre contexte (les requêtes du client de test ne partagent pas `g`)."""
+    from backend.models import User
+    with app.app_context():
+        user = User(email=f"client-{uuid.uuid4().hex[:10]}@example.com", first_name='Test', last_name='Client')
+        user.set_password('password')
+        _db.session.add(user)
+        _db.session.commit()
+        return SimpleNamespace(id=user.id, email=user.email)
+
+
+@pytest.fixture
+def admin(app):
+    from backend.models import User
+    with app.app_context():
+        user = User(email=f"admin-{uuid.uuid4().hex[:10]}@example.com", first_name='Test', last_name='Admin',
+                    is_admin=True, is_super_admin=True)
+        user.set_password('password')
+        _db.session.add(user)
+        _db.session.commit()
+        return SimpleNamespace(id=user.id, email=user.email)
+
+
+def login_admin(client, user, password='password'):
+    return client.post('/admin/login', data={'email': user.email, 'password': password})
+
+
+def login(client, user, password='password'):
+    return client.post('/login', data={'email': user.email, 'password': password})
+
+
+def login_deliverer(client, courier, password='password'):
+    return client.post('/livreur/login', data={'email': courier.email, 'password': password})
+
+
+@pytest.fixture
+def deliverer(app):
+    from backend.models import Deliverer
+    with app.app_context():
+        courier = Deliverer(email=f"livreur-{uuid.uuid4().hex[:10]}@example.com", first_name='Test',
+                            last_name='Livreur', status='available')
+        courier.set_password('password')
+        _db.session.add(courier)
+        _db.session.commit()
+        return SimpleNamespace(id=courier.id, email=courier.email)
+
+
+@pytest.fixture
+def make_order(db, customer):
+    from backend.models import Order
+
+    def _make(total=50.0, status='pending', **fields):
+        order = Order(order_number=f"T{uuid.uuid4().hex[:12].upper()}", user_id=customer.id, total_amount=total,
+                      status=status, shipping_address='Avenue du Test, Kinshasa', **fields)
+        db.session.add(order)
+        db.session.commit()
+        return order
+    return _make
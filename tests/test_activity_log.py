@@ -0,0 +1,73 @@
+import os
+import threading
+import uuid
+
+from sqlalchemy import func, select
+
+from backend.models import ActivityLog
+from backend.utils import activity_log
+
+
+def _count(db, prefix):
+    return db.session.execute(
+        select(func.count(ActivityLog.id)).where(ActivityLog.action.like(f"{prefix}%"))
+    ).scalar()
+
+
+def test_concurrent_replays_insert_once(app, db, tmp_path, monkeypatch):
+    prefix = f"rejeu-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setitem(activity_log._config, 'spill_path', str(tmp_path / 'spill.jsonl'))
+    activity_log._spill([activity_log._entry(f"{prefix}-{i}") for i in range(30)])
+
+    insert = activity_log._insert
+    inserting, resume = threading.Event(), threading.Event()
+
+    def slow_insert(entries):
+        inserting.set()
+        resume.wait(5)
+        insert(entries)
+
+    monkeypatch.setattr(activity_log, '_insert', slow_insert)
+    errors = []
+
+    def worker_pass():
+        try:
+            with app.app_context():
+                activity_log._replay_spill()
+        except Exception as exc:
+            errors.append(exc)
+
+    worker = threading.Thread(target=worker_pass)
+    worker.start()
+    assert inserting.wait(5)
+    # Pendant le rejeu du fil de fond : nouveau débordement puis `flush` depuis une requête
+    activity_log._spill([activity_log._entry(f"{prefix}-late")])
+    assert activity_log._replay_spill() == 0
+    resume.set()
+    worker.join()
+    assert not errors
+
+    monkeypatch.setattr(activity_log, '_insert', insert)
+    assert activity_log._replay_spill() == 1
+    assert _count(db, prefix) == 31
+    assert not list(tmp_path.iterdir())
+
+
+def test_unserialisable_extra_is_dropped_not_raised(db, tmp_path, monkeypatch):
+    prefix = f"extra-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setitem(activity_log._config, 'spill_path', str(tmp_path / 'spill.jsonl'))
+    monkeypatch.setitem(activity_log._config, 'queue_size', 0)
+    # File pleine : `record` passe par le fichier de débordement
+    activity_log.record(f"{prefix}-ok", extra='{"id": 1}')
+    activity_log.record(f"{prefix}-ko", extra={'objet': object()})
+    assert activity_log._replay_spill() == 1
+    assert _count(db, prefix) == 1
+
+
+def test_record_writes_synchronously_when_worker_belongs_to_another_process(db, monkeypatch):
+    prefix = f"fork-{uuid.uuid4().hex[:8]}"
+    # Fil démarré dans le maître gunicorn : absent du worker forké (autre pid)
+    monkeypatch.setattr(activity_log, '_worker_pid', os.getpid() + 1)
+    activity_log.record(f"{prefix}-a")
+    assert activity_log.pending() == 0
+    assert _count(db, prefix) == 1
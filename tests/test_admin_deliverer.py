@@ -0,0 +1,39 @@
+import re
+import uuid
+from datetime import datetime
+
+from backend.models import DeliveryAssignment, Order, db as _db
+from conftest import login_admin
+
+STATES = [('delivered', 'paid'), ('delivered', 'pending'), ('delivered', None), ('assigned', 'pending'),
+          ('cancelled', 'pending')]
+
+
+def _figure(html, label):
+    match = re.search(re.escape(label) + r'</p>\s*<p[^>]*>\s*(\d+)\s*</p>', html)
+    return int(match.group(1)) if match else None
+
+
+def test_deliverer_view_counts_and_paginates(app, client, admin, customer, deliverer, monkeypatch):
+    with app.app_context():
+        for status, payout in STATES:
+            order = Order(order_number=f"T{uuid.uuid4().hex[:12].upper()}", user_id=customer.id, total_amount=20.0,
+                          status='delivered' if status == 'delivered' else 'pending',
+                          shipping_address='Avenue du Test, Kinshasa')
+            _db.session.add(order)
+            _db.session.flush()
+            _db.session.add(DeliveryAssignment(order_id=order.id, deliverer_id=deliverer.id, status=status,
+                                               payout_status=payout, completed_at=datetime.utcnow()))
+        _db.session.commit()
+
+    monkeypatch.setitem(app.config, 'ADMIN_DELIVERER_ASSIGNMENTS_PER_PAGE', 2)
+    login_admin(client, admin)
+    html = client.get(f'/admin/deliverers/{deliverer.id}').get_data(as_text=True)
+    assert _figure(html, 'Livraisons (total)') == 5
+    assert _figure(html, 'Livraisons livrées') == 3
+    assert _figure(html, 'Payout en attente') == 2
+    assert 'page 1 / 3' in html
+
+    last = client.get(f'/admin/deliverers/{deliverer.id}?page=3').get_data(as_text=True)
+    assert 'page 3 / 3' in last
+    assert last.count('<tr class="hover:bg-gray-50">') == 1
@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from backend.models import DeliveriesDaily, DeliveryAssignment
+from backend.utils import analytics
+
+DAY = date(2025, 3, 4)
+
+
+def _deliveries(db, day):
+    rows = db.session.execute(
+        select(DeliveriesDaily.deliverer_id, DeliveriesDaily.deliveries, DeliveriesDaily.revenue)
+        .where(DeliveriesDaily.day == day).order_by(DeliveriesDaily.deliverer_id)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def test_assignment_change_recomputes_delivery_day(db, deliverer, make_order):
+    from backend.models import Deliverer
+    other = Deliverer(email=f"autre-{deliverer.id}@example.com", first_name='Autre', last_name='Livreur')
+    other.set_password('password')
+    db.session.add(other)
+    order = make_order(64.5, status='delivered', delivered_at=datetime(DAY.year, DAY.month, DAY.day, 14, 30))
+    assignment = DeliveryAssignment(order_id=order.id, deliverer_id=deliverer.id, status='delivered')
+    db.session.add(assignment)
+    db.session.commit()
+    analytics.rebuild(db)
+    assert (deliverer.id, 1, 64.5) in _deliveries(db, DAY)
+
+    # Réaffectation à un autre livreur (formulaire livreur, /livreur/api/sync, affectation auto)
+    assignment.deliverer_id = other.id
+    db.session.commit()
+    incremental = _deliveries(db, DAY)
+    assert (other.id, 1, 64.5) in incremental
+    assert all(row[0] != deliverer.id for row in incremental)
+
+    # Statut de l'affectation modifié : la livraison sort du cumul du livreur
+    assignment.status = 'cancelled'
+    db.session.commit()
+    incremental = _deliveries(db, DAY)
+    assert all(row[0] != other.id for row in incremental)
+
+    analytics.rebuild(db)
+    assert _deliveries(db, DAY) == incremental
+
+
+@pytest.mark.parametrize('precision', [1, 3, 7])
+def test_demand_zones_precision_bounds(db, precision):
+    with pytest.raises(ValueError):
+        analytics.demand_zones(db, DAY, DAY, precision=precision)
+
+
+def test_demand_zones_accepts_documented_precisions(db):
+    for precision in range(analytics.ZONE_MIN_PRECISION, analytics.ZONE_PRECISION + 1):
+        assert isinstance(analytics.demand_zones(db, DAY, DAY, precision=precision), list)
@@ -0,0 +1,32 @@
+import os
+
+from backend.utils import assets
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def test_uploads_and_large_files_are_never_read(tmp_path, monkeypatch):
+    _write(tmp_path / 'js' / 'app.js', b'console.log(1);')
+    _write(tmp_path / 'video' / 'intro.mp4', b'x' * 2048)
+    _write(tmp_path / 'uploads' / 'products' / 'cover.jpg', b'jpeg')
+    hashed = []
+    real_hash = assets._file_hash
+    monkeypatch.setattr(assets, '_file_hash', lambda path: hashed.append(path) or real_hash(path))
+
+    manifest = assets.AssetManifest(str(tmp_path), check_interval=0, hash_max_size=1024)
+    assert manifest.build() == 2
+    assert manifest.digest('uploads/products/cover.jpg')
+    assert [os.path.basename(p) for p in hashed] == ['app.js']
+    assert 'uploads/products/cover.jpg' in manifest.as_dict()
+
+
+def test_stat_fingerprint_follows_changes(tmp_path):
+    _write(tmp_path / 'uploads' / 'a.png', b'one')
+    manifest = assets.AssetManifest(str(tmp_path), check_interval=0)
+    first = manifest.digest('uploads/a.png')
+    _write(tmp_path / 'uploads' / 'a.png', b'three')
+    assert manifest.digest('uploads/a.png') != first
@@ -0,0 +1,60 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from backend.models import Cart, Category, Product, db as _db
+from conftest import login, login_admin
+
+
+def _product(app, price=10.0, quantity=5):
+    with app.app_context():
+        category = Category(name=f"Panier {uuid.uuid4().hex[:6]}")
+        _db.session.add(category)
+        _db.session.flush()
+        item = Product(name=f"Tome {uuid.uuid4().hex[:6]}", price=price, quantity=quantity, category_id=category.id)
+        _db.session.add(item)
+        _db.session.commit()
+        return SimpleNamespace(id=item.id, category_id=item.category_id)
+
+
+@pytest.fixture
+def products(app):
+    return [_product(app), _product(app)]
+
+
+def _guest_entries(client):
+    return {item['product_id']: item['quantity'] for item in client.get('/api/cart').get_json()['cart']['items']}
+
+
+def test_guest_write_drops_inactive_and_caps_stock(app, client, products):
+    first, second = products
+    assert client.post(f'/add_to_cart/{first.id}', data={'quantity': 4}).status_code in (200, 302)
+    with app.app_context():
+        _db.session.get(Product, first.id).quantity = 2
+        _db.session.commit()
+    client.post(f'/add_to_cart/{second.id}', data={'quantity': 1})
+    assert _guest_entries(client) == {first.id: 2, second.id: 1}
+
+    with app.app_context():
+        _db.session.get(Product, first.id).is_active = False
+        _db.session.commit()
+    client.post(f'/add_to_cart/{second.id}', data={'quantity': 1})
+    assert _guest_entries(client) == {second.id: 2}
+
+
+def test_price_edit_refreshes_cart_subtotal(app, client, customer, admin, products):
+    product = products[0]
+    login(client, customer)
+    client.post(f'/add_to_cart/{product.id}', data={'quantity': 3})
+    client.get('/logout')
+
+    login_admin(client, admin)
+    client.post(f'/admin/products/edit/{product.id}', data={
+        'name': f"Tome {uuid.uuid4().hex[:6]}", 'price': '12.5', 'quantity': '5',
+        'category_id': str(product.category_id), 'is_active': 'on',
+    })
+    with app.app_context():
+        assert _db.session.get(Product, product.id).price == 12.5
+        cart = Cart.query.filter_by(user_id=customer.id).one()
+        assert cart.subtotal == pytest.approx(37.5)
@@ -0,0 +1,17 @@
+from backend.models import ExchangeRate
+
+
+def test_unchanged_rate_does_not_touch_row_or_page_cache(app, db, monkeypatch):
+    engine = app.extensions['currency']
+    assert engine.set_rates({('USD', 'EUR'): 0.91}) == 1
+    stamp = ExchangeRate.query.filter_by(base='USD', quote='EUR').one().updated_at
+
+    invalidated = []
+    monkeypatch.setattr(app.extensions['page_cache'], 'invalidate_tags', lambda *tags: invalidated.extend(tags))
+    assert engine.set_rates({('USD', 'EUR'): 0.91}) == 0
+    assert invalidated == []
+    assert ExchangeRate.query.filter_by(base='USD', quote='EUR').one().updated_at == stamp
+
+    assert engine.set_rates({('USD', 'EUR'): 0.93}) == 1
+    assert invalidated == ['settings']
+    assert engine.snapshot().rate('USD', 'EUR') == 0.93
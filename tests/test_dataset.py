@@ -0,0 +1,23 @@
+from sqlalchemy import func, select
+
+from backend.models import CommissionEntry, Deliverer, Product
+from backend.utils.dataset import generate_dataset
+
+
+def test_seeded_ledger_matches_commission_due(db, tmp_path):
+    counts = generate_dataset(seed=7, categories=2, products=20, clients=30, deliverers=3, orders=400,
+                              forum_messages=0, activity_logs=0, days=60, cover_folder=str(tmp_path))
+    assert counts['commission_ledger'] > 0
+    # Couvertures dans le dossier dédié, jamais parmi les uploads réels
+    assert sorted(p.name for p in tmp_path.iterdir())[0] == 'seed-cover-00.svg'
+    images = db.session.execute(select(Product.images).where(Product.images.like('["seed/%'))).scalars().all()
+    assert len(images) >= 20
+    sums = dict(db.session.execute(
+        select(CommissionEntry.deliverer_id, func.sum(CommissionEntry.amount)).group_by(CommissionEntry.deliverer_id)
+    ).all())
+    seeded = db.session.execute(
+        select(Deliverer.id, Deliverer.commission_due).where(Deliverer.email.like('seed7.livreur%'))
+    ).all()
+    assert len(seeded) == 3
+    for deliverer_id, due in seeded:
+        assert round(sums.get(deliverer_id, 0.0), 2) == round(due, 2)
@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.models import CommissionEntry, DeliveryAssignment, Order, db as _db
+from conftest import login_deliverer
+
+
+@pytest.fixture
+def assignment(app, customer, deliverer):
+    with app.app_context():
+        order = Order(order_number=f"T{uuid.uuid4().hex[:12].upper()}", user_id=customer.id, total_amount=90.0,
+                      status='delivered', delivered_at=datetime.utcnow() - timedelta(minutes=10),
+                      shipping_address='Avenue du Test, Kinshasa')
+        _db.session.add(order)
+        _db.session.flush()
+        item = DeliveryAssignment(order_id=order.id, deliverer_id=deliverer.id, status='in_progress')
+        _db.session.add(item)
+        _db.session.commit()
+        return item.id
+
+
+def _change(assignment_id, status, minutes_ago, note='Frais de livraison perçus'):
+    recorded = (datetime.utcnow() - timedelta(minutes=minutes_ago)).isoformat() + 'Z'
+    return {'id': f"sync-{uuid.uuid4()}", 'type': 'assignment', 'assignment_id': assignment_id,
+            'status': status, 'note': note, 'recorded_at': recorded}
+
+
+def _assignment_status(app, assignment_id):
+    with app.app_context():
+        return _db.session.get(DeliveryAssignment, assignment_id).status
+
+
+def test_sync_batch_replayed_once(app, client, deliverer, assignment):
+    login_deliverer(client, deliverer)
+    batch = {'changes': [_change(assignment, 'delivered', 5)]}
+
+    first = client.post('/livreur/api/sync', json=batch).get_json()
+    assert first['results'][0]['outcome'] == 'applied'
+    assert not first['results'][0]['duplicate']
+    # Lot renvoyé après une coupure réseau : rien n'est réappliqué
+    replay = client.post('/livreur/api/sync', json=batch).get_json()
+    assert replay['results'][0]['outcome'] == 'applied'
+    assert replay['results'][0]['duplicate']
+
+    with app.app_context():
+        credits = _db.session.execute(
+            select(func.count(CommissionEntry.id))
+            .where(CommissionEntry.assignment_id == assignment, CommissionEntry.kind == 'credit')
+        ).scalar()
+        assert credits == 1
+    assert _assignment_status(app, assignment) == 'delivered'
+
+
+def test_older_change_conflicts_after_newer_one(app, client, deliverer, assignment):
+    login_deliverer(client, deliverer)
+    newer = client.post('/livreur/api/sync', json={'changes': [_change(assignment, 'postponed', 2)]}).get_json()
+    assert newer['results'][0]['outcome'] == 'applied'
+
+    # Téléphone resté hors ligne plus longtemps : son changement date d'avant
+    older = client.post('/livreur/api/sync', json={'changes': [_change(assignment, 'in_progress', 8)]}).get_json()
+    assert older['results'][0]['outcome'] == 'conflict'
+    assert _assignment_status(app, assignment) == 'postponed'
+
+
+def test_batch_applied_in_recorded_order(app, client, deliverer, assignment):
+    login_deliverer(client, deliverer)
+    changes = [_change(assignment, 'postponed', 1), _change(assignment, 'assigned', 6),
+               _change(assignment, 'in_progress', 3, note='')]
+    results = client.post('/livreur/api/sync', json={'changes': changes}).get_json()['results']
+    # Résultats dans l'ordre reçu, application dans l'ordre des heures d'enregistrement
+    assert [r['outcome'] for r in results] == ['applied', 'applied', 'rejected']
+    assert _assignment_status(app, assignment) == 'postponed'
@@ -0,0 +1,43 @@
+import pytest
+
+from backend.utils import dispatch
+from backend.utils.geo import DelivererGrid
+
+ORIGIN = (-4.3000, 15.3000)
+KM = 1 / 111.2  # ~1 km en latitude
+NEAR, FAR = 1, 2
+
+
+@pytest.fixture
+def grid(monkeypatch):
+    fresh = DelivererGrid()
+    monkeypatch.setattr(dispatch, 'grid', fresh)
+    monkeypatch.setitem(dispatch._config, 'max_km', 15.0)
+    fresh.update(NEAR, ORIGIN[0] + 1.0 * KM, ORIGIN[1])
+    fresh.update(FAR, ORIGIN[0] - 2.5 * KM, ORIGIN[1])
+    return fresh
+
+
+def _chosen(orders, loads):
+    return [deliverer_id for _, deliverer_id, _ in dispatch.plan(orders, loads)]
+
+
+def test_load_penalty_prefers_idle_deliverer(grid, monkeypatch):
+    order = [(100, ORIGIN[0], ORIGIN[1])]
+    monkeypatch.setitem(dispatch._config, 'max_active', 5)
+    monkeypatch.setitem(dispatch._config, 'load_penalty_km', 0.0)
+    assert _chosen(order, {NEAR: 2, FAR: 0}) == [NEAR]
+    # 1 km + 2 missions × 2 km > 2,5 km : le livreur libre l'emporte
+    monkeypatch.setitem(dispatch._config, 'load_penalty_km', 2.0)
+    assert _chosen(order, {NEAR: 2, FAR: 0}) == [FAR]
+
+
+def test_max_active_caps_assignments_within_a_pass(grid, monkeypatch):
+    monkeypatch.setitem(dispatch._config, 'max_active', 1)
+    monkeypatch.setitem(dispatch._config, 'load_penalty_km', 0.0)
+    orders = [(101, ORIGIN[0], ORIGIN[1]), (102, ORIGIN[0], ORIGIN[1]), (103, ORIGIN[0], ORIGIN[1])]
+    # Le plus proche prend la première commande, la charge mise à jour l'écarte ensuite
+    assert _chosen(orders, {NEAR: 0, FAR: 0}) == [NEAR, FAR]
+    # Déjà à la limite : jamais candidat ; livreur indisponible (absent des charges) non plus
+    assert _chosen(orders[:1], {NEAR: 1, FAR: 0}) == [FAR]
+    assert _chosen(orders[:1], {NEAR: 1}) == []
@@ -0,0 +1,51 @@
+import uuid
+
+import pytest
+
+from backend.models import Category, Product, db as _db
+from backend.utils import currency
+
+
+@pytest.fixture
+def product(app):
+    with app.app_context():
+        category = Category(name=f"ETag {uuid.uuid4().hex[:6]}")
+        _db.session.add(category)
+        _db.session.flush()
+        item = Product(name='Tome ETag', price=12.0, quantity=5, category_id=category.id)
+        _db.session.add(item)
+        _db.session.commit()
+        return item.id
+
+
+def _etag(client, product_id):
+    resp = client.get(f'/product/{product_id}')
+    assert resp.status_code == 200
+    return resp.headers['ETag']
+
+
+def test_product_etag_follows_category_name(app, client, product):
+    etag = _etag(client, product)
+    assert client.get(f'/product/{product}', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        category = _db.session.get(Product, product).category
+        category.name = f"Renommée {uuid.uuid4().hex[:6]}"
+        _db.session.commit()
+    assert client.get(f'/product/{product}', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_product_etag_follows_exchange_rates(app, client, product):
+    etag = _etag(client, product)
+    with app.app_context():
+        current = currency.snapshot().rate('USD', 'CDF')
+        app.extensions['currency'].set_rates({('USD', 'CDF'): current + 1.5})
+    assert client.get(f'/product/{product}', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_product_etag_follows_csrf_secret(app, product):
+    first, second = app.test_client(), app.test_client()
+    etag = _etag(first, product)
+    assert first.get(f'/product/{product}', headers={'If-None-Match': etag}).status_code == 304
+    # Autre session (autre secret CSRF) : la copie d'un autre navigateur n'est pas validée
+    assert _etag(second, product) != etag
@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.models import Category, Order, Product, db as _db
+from conftest import login
+
+
+@pytest.fixture
+def product(app):
+    with app.app_context():
+        category = Category(name=f"Idempotence {uuid.uuid4().hex[:6]}")
+        _db.session.add(category)
+        _db.session.flush()
+        item = Product(name='Tome idempotent', price=7.5, quantity=50, category_id=category.id)
+        _db.session.add(item)
+        _db.session.commit()
+        return item.id
+
+
+def _cart_quantity(client, product_id):
+    items = client.get('/api/cart').get_json()['cart']['items']
+    return sum(item['quantity'] for item in items if item['product_id'] == product_id)
+
+
+def test_cart_add_replayed_once(client, customer, product):
+    login(client, customer)
+    headers = {'Idempotency-Key': f"cart-{uuid.uuid4()}"}
+    body = {'product_id': product, 'quantity': 2}
+
+    first = client.post('/api/cart/items', json=body, headers=headers)
+    assert first.status_code == 200
+    replay = client.post('/api/cart/items', json=body, headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.get_json() == first.get_json()
+    assert _cart_quantity(client, product) == 2
+
+    reused = client.post('/api/cart/items', json={'product_id': product, 'quantity': 5}, headers=headers)
+    assert reused.status_code == 422
+    assert _cart_quantity(client, product) == 2
+
+
+def test_checkout_replayed_once(app, client, customer, product):
+    login(client, customer)
+    client.post('/api/cart/items', json={'product_id': product, 'quantity': 1})
+    headers = {'Idempotency-Key': f"checkout-{uuid.uuid4()}"}
+    details = {'first_name': 'Test', 'last_name': 'Client', 'email': customer.email, 'phone': '+243000000000',
+               'shipping_address': 'Avenue du Test, Kinshasa'}
+
+    first = client.post('/api/checkout', json=details, headers=headers)
+    assert first.status_code == 201
+    # Double clic / nouvel envoi après une coupure : même réponse, aucune seconde commande
+    replay = client.post('/api/checkout', json=details, headers=headers)
+    assert replay.status_code == 201
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.get_json()['order_id'] == first.get_json()['order_id']
+    with app.app_context():
+        orders = _db.session.execute(select(func.count(Order.id)).where(Order.user_id == customer.id)).scalar()
+        assert orders == 1
+
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from backend.models import CommissionEntry, Deliverer, DeliveryAssignment
+from backend.utils import ledger
+
+
+def _ledger_sum(db, deliverer_id):
+    return db.session.execute(
+        select(func.coalesce(func.sum(CommissionEntry.amount), 0)).where(CommissionEntry.deliverer_id == deliverer_id)
+    ).scalar()
+
+
+def _deliver(db, deliverer, order, completed_at):
+    assignment = DeliveryAssignment(order_id=order.id, deliverer_id=deliverer.id, status='delivered',
+                                    completed_at=completed_at)
+    db.session.add(assignment)
+    db.session.flush()
+    ledger.credit_assignment(assignment)
+    db.session.commit()
+    return assignment
+
+
+def test_ledger_sum_matches_balance(db, deliverer, make_order):
+    # Montants à trois décimales et livraisons du dimanche (bonus 5 %) : arrondis à chaque écriture
+    sunday = datetime(2026, 10, 18, 15, 0)
+    for total in (83.337, 126.125, 19.99, 250.333, 81.005):
+        _deliver(db, deliverer, make_order(total, status='delivered'), sunday)
+    ledger.record(deliverer.id, 'weekly_bonus', 5.0 / 3)
+    db.session.commit()
+
+    due = db.session.get(Deliverer, deliverer.id).commission_due
+    assert round(_ledger_sum(db, deliverer.id), 2) == round(due, 2)
+    last = db.session.execute(
+        select(CommissionEntry.balance).where(CommissionEntry.deliverer_id == deliverer.id)
+        .order_by(CommissionEntry.id.desc()).limit(1)
+    ).scalar()
+    assert last == round(due, 2)
+
+    ledger.pay_out(deliverer.id)
+    db.session.commit()
+    assert round(db.session.get(Deliverer, deliverer.id).commission_due, 2) == 0
+    assert round(_ledger_sum(db, deliverer.id), 2) == 0
+
+
+def test_credit_is_recorded_once(db, deliverer, make_order):
+    assignment = _deliver(db, deliverer, make_order(40.0, status='delivered'), datetime(2026, 10, 14, 10, 0))
+    assert ledger.credit_assignment(assignment) == 0.0
+    assert _ledger_sum(db, deliverer.id) == 4.0
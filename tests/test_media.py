@@ -0,0 +1,53 @@
+import pytest
+
+from backend.utils import media
+from conftest import login
+
+PATH_FORMS = [
+    '/static/uploads/forum/x.txt',
+    '/static/uploads/./forum/x.txt',
+    '/static/uploads//forum/x.txt',
+    '/static/./uploads/forum/x.txt',
+    '/static/uploads/products/../forum/x.txt',
+]
+
+
+@pytest.fixture
+def static_dir(app, tmp_path, monkeypatch):
+    (tmp_path / 'uploads' / 'forum').mkdir(parents=True)
+    (tmp_path / 'uploads' / 'products').mkdir()
+    (tmp_path / 'uploads' / 'forum' / 'x.txt').write_text('pièce jointe')
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    return tmp_path
+
+
+def test_normalize():
+    assert media.normalize('uploads/./forum//x.txt') == 'uploads/forum/x.txt'
+    assert media.normalize('/uploads/forum/x.txt') == 'uploads/forum/x.txt'
+    assert media.normalize('uploads/products/../forum/x.txt') is None
+    assert media.normalize('./') is None
+
+
+def test_is_protected_after_normalisation(app):
+    with app.app_context():
+        for path in PATH_FORMS:
+            assert media.is_protected(path[len('/static/'):]), path
+        assert not media.is_protected('uploads/products/cover.svg')
+
+
+@pytest.mark.parametrize('path', PATH_FORMS)
+def test_anonymous_cannot_read_protected_media(client, static_dir, path):
+    response = client.get(path)
+    assert response.status_code in (302, 401, 404), response.status_code
+    assert b'pi\xc3\xa8ce jointe' not in response.data
+
+
+@pytest.mark.parametrize('path', PATH_FORMS)
+def test_protected_media_is_private(client, static_dir, customer, path):
+    login(client, customer)
+    response = client.get(path)
+    if response.status_code == 200:
+        assert response.cache_control.private
+        assert not response.cache_control.public
+    else:
+        assert response.status_code == 404
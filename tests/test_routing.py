@@ -0,0 +1,44 @@
+from backend.utils import routing
+
+STOPS = [(1, -4.3000, 15.2500), (2, -4.3500, 15.3000), (3, -4.4000, 15.3500)]
+
+
+def test_plan_route_starts_from_origin():
+    assert routing.plan_route(STOPS)['order'] in ([1, 2, 3], [3, 2, 1])
+    assert routing.plan_route(STOPS, (-4.41, 15.36))['order'] == [3, 2, 1]
+    assert routing.plan_route(STOPS, (-4.29, 15.24))['order'] == [1, 2, 3]
+
+
+def test_route_cache_invalidated_when_origin_changes():
+    first = routing.route_for(7001, STOPS, None)
+    assert first['origin'] is None
+    moved = routing.route_for(7001, STOPS, (-4.41, 15.36))
+    assert moved['origin'] == (-4.41, 15.36)
+    assert moved['order'] == [3, 2, 1]
+    back = routing.route_for(7001, STOPS, (-4.29, 15.24))
+    assert back['order'] == [1, 2, 3]
+
+
+def test_route_cache_reused_within_origin_cell():
+    first = routing.route_for(7002, STOPS, (-4.41001, 15.36001))
+    assert routing.route_for(7002, STOPS, (-4.41002, 15.36002)) is first
+    assert routing.route_for(7002, STOPS[:2], (-4.41002, 15.36002)) is not first
+
+
+def test_dashboard_etag_follows_position(app, client, deliverer):
+    from backend.utils import dispatch
+    from conftest import login_deliverer
+
+    login_deliverer(client, deliverer)
+    client.get('/livreur/dashboard')  # consomme le message flash de connexion
+    first = client.get('/livreur/dashboard')
+    etag = first.headers['ETag']
+    assert client.get('/livreur/dashboard', headers={'If-None-Match': etag}).status_code == 304
+
+    dispatch.grid.update(deliverer.id, -4.41, 15.36)
+    try:
+        moved = client.get('/livreur/dashboard', headers={'If-None-Match': etag})
+        assert moved.status_code == 200
+        assert moved.headers['ETag'] != etag
+    finally:
+        dispatch.grid.remove(deliverer.id)
@@ -0,0 +1,74 @@
+from conftest import login
+
+
+def _stored(app, sid):
+    with app.app_context():
+        return app.session_interface.store.load(sid)
+
+
+def _sid(app, client):
+    cookie = client.get_cookie(app.session_interface.get_cookie_name(app))
+    return cookie.value if cookie else None
+
+
+def test_session_id_rotated_on_login(app, client, customer):
+    # Identifiant obtenu avant la connexion (ce qu'un tiers pourrait imposer à la victime)
+    with client.session_transaction() as sess:
+        sess['guest_note'] = 'avant connexion'
+    planted = _sid(app, client)
+    assert planted
+
+    login(client, customer)
+    rotated = _sid(app, client)
+    assert rotated and rotated != planted
+    assert _stored(app, planted) is None
+    # Le contenu de la session anonyme est repris sous le nouvel identifiant
+    data = app.session_interface.serializer.loads(_stored(app, rotated)[0])
+    assert data['guest_note'] == 'avant connexion'
+    assert data['_user_id'] == str(customer.id)
+
+    attacker = app.test_client()
+    attacker.set_cookie(app.session_interface.get_cookie_name(app), planted)
+    response = attacker.get('/profile')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_session_id_rotated_on_logout(app, client, customer):
+    login(client, customer)
+    before = _sid(app, client)
+    client.get('/logout')
+    after = _sid(app, client)
+    assert after != before
+    assert _stored(app, before) is None
+
+
+def test_unchanged_user_keeps_session_id(app, client, customer):
+    login(client, customer)
+    before = _sid(app, client)
+    client.get('/profile')
+    assert _sid(app, client) == before
+
+
+def _row_count(app):
+    from sqlalchemy import func, select
+    from backend.models import ServerSession, db
+    with app.app_context():
+        return db.session.execute(select(func.count()).select_from(ServerSession)).scalar()
+
+
+def test_anonymous_browsing_creates_no_server_session(app, client):
+    before = _row_count(app)
+    for url in ('/about', '/login', '/cart', '/api/cart'):
+        assert client.get(url).status_code == 200
+    assert _row_count(app) == before
+    # Le secret CSRF voyage dans le cookie signé et reste stable d'une page à l'autre
+    cookie = _sid(app, client)
+    assert cookie and _stored(app, cookie) is None
+    client.get('/login')
+    assert _sid(app, client) == cookie
+
+    # Contenu réel (note invité) : la session passe côté serveur
+    with client.session_transaction() as sess:
+        sess['guest_note'] = 'panier'
+    assert _row_count(app) == before + 1
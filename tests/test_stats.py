@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from backend.models import Category, Order, Product, StatsSnapshot
+from backend.utils import stats
+
+COUNTERS = ('total_products', 'total_orders', 'total_users', 'pending_orders')
+
+
+def _assert_matches_full_recompute(db):
+    row = db.session.get(StatsSnapshot, stats.SNAPSHOT_ID)
+    db.session.refresh(row)
+    # Ligne tenue par les deltas, pas recalculée (`dirty` forcerait une réconciliation)
+    assert not row.dirty
+    expected = stats.compute(db, now=row.revenue_recognized_until + stats.REVENUE_DELAY)
+    for key in COUNTERS:
+        assert getattr(row, key) == expected[key], key
+    assert round(row.recognized_revenue, 2) == round(expected['recognized_revenue'], 2)
+
+
+def test_stats_deltas_match_full_recompute(db, make_order):
+    stats.reconcile(db)
+    category = Category(name='Stats')
+    db.session.add(category)
+    db.session.flush()
+    db.session.add(Product(name='Tome stats', price=9.5, category_id=category.id))
+    pending = make_order(30.0)
+    delivered = make_order(45.25)
+    doomed = make_order(12.0, status='delivered', delivered_at=datetime.utcnow() - timedelta(days=3))
+    _assert_matches_full_recompute(db)
+
+    # Livraison reconnue (plus d'une heure), montant corrigé, annulation et suppression
+    delivered.status = 'delivered'
+    delivered.delivered_at = datetime.utcnow() - timedelta(hours=2)
+    db.session.commit()
+    _assert_matches_full_recompute(db)
+
+    delivered.total_amount = 50.0
+    pending.status = 'cancelled'
+    db.session.commit()
+    _assert_matches_full_recompute(db)
+
+    db.session.delete(db.session.get(Order, doomed.id))
+    db.session.commit()
+    _assert_matches_full_recompute(db)
+
+
+def test_bulk_update_marks_dirty_and_read_reconciles(db, make_order):
+    stats.reconcile(db)
+    order = make_order(20.0)
+    db.session.query(Order).filter(Order.id == order.id).update({'status': 'cancelled'})
+    db.session.commit()
+    row = db.session.get(StatsSnapshot, stats.SNAPSHOT_ID)
+    db.session.refresh(row)
+    assert row.dirty
+    row = stats.read(db)
+    assert not row.dirty
+    assert row.pending_orders == stats.compute(db)['pending_orders']
+
+
+def test_advance_revenue_counts_each_window_once(db, make_order):
+    stats.reconcile(db)
+    recent = datetime.utcnow() - timedelta(minutes=5)
+    make_order(40.0, status='delivered', delivered_at=recent)
+    before = db.session.get(StatsSnapshot, stats.SNAPSHOT_ID).recognized_revenue
+    # Livraison encore sous le délai de reconnaissance
+    assert stats.advance_revenue(db) == 0.0
+    later = recent + stats.REVENUE_DELAY + timedelta(minutes=1)
+    # Livraisons d'autres tests éventuellement dans la même fenêtre
+    added = stats.advance_revenue(db, now=later)
+    assert added >= 40.0
+    assert stats.advance_revenue(db, now=later) == 0.0
+    row = db.session.get(StatsSnapshot, stats.SNAPSHOT_ID)
+    db.session.refresh(row)
+    assert round(row.recognized_revenue - before, 2) == round(added, 2)
+    assert round(row.recognized_revenue, 2) == round(stats.compute(db, now=later)['recognized_revenue'], 2)
@@ -0,0 +1,26 @@
+from backend.utils import workers
+
+
+def test_start_runs_each_starter_once_per_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(workers, '_starters', {})
+    monkeypatch.setattr(workers, '_started_pid', [None])
+    workers.register('a', lambda: calls.append('a'))
+    workers.register('b', lambda: 1 / 0)  # un démarreur en échec n'empêche pas les autres
+    workers.register('c', lambda: calls.append('c'))
+
+    assert workers.start() == 3
+    assert workers.start() == 0
+    assert calls == ['a', 'c']
+
+    # Processus forké : nouveau pid, les fils sont relancés
+    monkeypatch.setattr(workers.os, 'getpid', lambda: -1)
+    workers.start()
+    assert calls == ['a', 'c', 'a', 'c']
+
+
+def test_preload_defers_start(monkeypatch):
+    monkeypatch.setenv('GUNICORN_PRELOAD', 'true')
+    assert workers.deferred()
+    monkeypatch.setenv('GUNICORN_PRELOAD', 'False')
+    assert not workers.deferred()